@@ -0,0 +1,36 @@
+"""Check the maintained demand tables against the students table.
+
+    python -m app.check_demand            # report differences, exit 1 if any
+    python -m app.check_demand --rebuild  # recompute the tables from students
+"""
+
+import asyncio
+import sys
+
+from app.models import async_session, init_db
+from app.solver.demand import check_demand, rebuild_demand
+
+
+async def main(rebuild: bool) -> int:
+    await init_db()
+
+    async with async_session() as session:
+        if rebuild:
+            await rebuild_demand(session)
+            await session.commit()
+            print("Rebuilt school demand tables from students.")
+            return 0
+
+        problems = await check_demand(session)
+        for problem in problems:
+            print(problem)
+        print(
+            f"{len(problems)} difference(s) found — run with --rebuild to fix."
+            if problems
+            else "School demand tables are consistent with students."
+        )
+        return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--rebuild" in sys.argv[1:])))
@@ -0,0 +1,42 @@
+from .compression import Decompressed, content_encoding
+from .reader import (
+    Columns,
+    CSVFormatError,
+    CSVRows,
+    file_chunks,
+    path_chunks,
+    text_chunks,
+    to_columns,
+)
+from .upsert import (
+    BATCH_SIZE,
+    INVENTORY_FIELDS,
+    STUDENT_FIELDS,
+    UpsertResult,
+    delete_missing_inventory,
+    delete_missing_students,
+    row_hash,
+    upsert_inventory,
+    upsert_students,
+)
+
+__all__ = [
+    "Decompressed",
+    "content_encoding",
+    "Columns",
+    "CSVFormatError",
+    "CSVRows",
+    "file_chunks",
+    "path_chunks",
+    "text_chunks",
+    "to_columns",
+    "BATCH_SIZE",
+    "INVENTORY_FIELDS",
+    "STUDENT_FIELDS",
+    "UpsertResult",
+    "delete_missing_inventory",
+    "delete_missing_students",
+    "row_hash",
+    "upsert_inventory",
+    "upsert_students",
+]
@@ -0,0 +1,150 @@
+"""Streaming decompression of gzip and zstd uploads.
+
+A compressed upload is recognised by its magic bytes, or by the
+``Content-Encoding`` header of the file part. It is decompressed chunk by
+chunk on its way into ``CSVRows``, so neither the compressed nor the
+decompressed file is ever held whole in memory or written out again.
+Output is bounded per step: gzip with ``max_length``, zstd by feeding the
+input in small slices. Concatenated gzip members and zstd frames are read
+one after another, as ``gunzip`` and ``zstd -d`` do.
+"""
+
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator
+
+import zstandard
+
+from .reader import CHUNK_SIZE, CSVFormatError
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_SLICE = 1 << 10  # compressed bytes per zstd step
+
+# Content-Encoding value → codec; "identity" means the upload is plain
+ENCODINGS = {"gzip": "gzip", "x-gzip": "gzip", "zstd": "zstd", "identity": "identity"}
+
+
+def content_encoding(value: str | None) -> str | None:
+    """The codec named by a ``Content-Encoding`` header, or None if absent."""
+    if not value or not value.strip():
+        return None
+    name = value.strip().lower()
+    if name not in ENCODINGS:
+        raise CSVFormatError(f"Unsupported Content-Encoding: {value}")
+    return ENCODINGS[name]
+
+
+class Decompressed:
+    """Plain bytes of a possibly compressed upload, read lazily from ``chunks``.
+
+    ``encoding`` is the codec from ``content_encoding``: None to sniff the
+    magic bytes, "identity" to pass the chunks through unchanged. A declared
+    codec must match the magic bytes. ``codec`` is the codec in use once
+    iteration has started, and ``bytes_read`` counts the bytes taken from
+    ``chunks`` (compressed, for progress against the stored file size).
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterable[bytes],
+        encoding: str | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.chunks = chunks
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.codec: str | None = None
+        self.bytes_read = 0
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks = self._counted()
+        head = b""
+        async for chunk in chunks:
+            head += chunk
+            if len(head) >= len(ZSTD_MAGIC):
+                break
+        self.codec = self._codec(head)
+
+        if self.codec == "identity":
+            if head:
+                yield head
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        decompress = _gunzip if self.codec == "gzip" else _unzstd
+        try:
+            async for out in decompress(_prepend(head, chunks), self.chunk_size):
+                yield out
+        except (zlib.error, zstandard.ZstdError) as exc:
+            raise CSVFormatError(f"Upload is not valid {self.codec} ({exc})") from exc
+
+    def _codec(self, head: bytes) -> str:
+        if head.startswith(GZIP_MAGIC):
+            sniffed = "gzip"
+        elif head.startswith(ZSTD_MAGIC):
+            sniffed = "zstd"
+        else:
+            sniffed = "identity"
+        if self.encoding not in (None, "identity", sniffed):
+            raise CSVFormatError(f"Upload is declared {self.encoding} but is not {self.encoding}")
+        return self.encoding or sniffed
+
+    async def _counted(self) -> AsyncIterator[bytes]:
+        async for chunk in self.chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+async def _prepend(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if head:
+        yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+async def _gunzip(chunks: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    d = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    fed = False  # the current member has started
+    async for data in chunks:
+        while True:
+            if not fed:
+                # Zero padding after the last member is ignored, as gunzip does
+                data = data.lstrip(b"\0")
+            fed = fed or bool(data)
+            out = d.decompress(data, chunk_size)
+            if out:
+                yield out
+            if d.eof:
+                # Another member may follow
+                data = d.unused_data
+                d = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                fed = False
+                continue
+            data = d.unconsumed_tail
+            # A full chunk_size of output may leave more buffered in zlib
+            if not data and len(out) < chunk_size:
+                break
+    if fed:
+        raise zlib.error("truncated at the end")
+
+
+async def _unzstd(chunks: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    d = zstandard.ZstdDecompressor().decompressobj(write_size=chunk_size)
+    fed = False  # the current frame has started
+    async for chunk in chunks:
+        for start in range(0, len(chunk), ZSTD_SLICE):
+            data = chunk[start : start + ZSTD_SLICE]
+            while data:
+                fed = True
+                if out := d.decompress(data):
+                    yield out
+                if d.eof:
+                    # Another frame may follow
+                    data = d.unused_data
+                    d = zstandard.ZstdDecompressor().decompressobj(write_size=chunk_size)
+                    fed = False
+                else:
+                    data = b""
+    if fed:
+        raise zstandard.ZstdError("truncated at the end")
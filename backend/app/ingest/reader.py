@@ -0,0 +1,307 @@
+"""Streaming, columnar CSV parsing for uploads.
+
+An upload is read ``CHUNK_SIZE`` bytes at a time and decoded incrementally.
+A UTF-8 BOM is dropped, and a character split across two chunks is
+decoded once the rest arrives. Each chunk is cut at its last record
+boundary: a line break outside quoted fields, so quoted fields can contain
+line breaks. As in ``csv``, only a quote at the start of a field opens one;
+the quote state is carried from chunk to chunk, so each character is
+scanned once, and a record longer than ``MAX_RECORD_CHARS`` is refused
+rather than buffered.
+
+``parse_chunk`` parses and validates the complete records of a chunk into
+one list per required column, not a dict per row. Plain chunks (no quotes,
+the same number of fields on every line) are split with string methods
+over the whole chunk. Others go through ``csv.reader``. When an upload spans
+several chunks, chunks are parsed side by side on a process pool of
+``PARSE_WORKERS`` and their results are consumed in file order. Column
+batches of a bounded size go straight to the bulk writer. Memory therefore
+depends on the chunk size, batch size and worker count, not on the size of
+the upload.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import os
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from operator import methodcaller
+from pathlib import Path
+
+from fastapi import UploadFile
+
+CHUNK_SIZE = 1 << 20  # bytes read from the upload at a time
+# Longest record kept waiting for its end, e.g. behind an unclosed quote
+MAX_RECORD_CHARS = 4 * CHUNK_SIZE
+PARSE_WORKERS = int(os.environ.get("EQUIPROUTE_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+# column name → values, all of the same length
+Columns = dict[str, list[str]]
+
+
+class CSVFormatError(ValueError):
+    """The upload cannot be read as CSV (no header, missing columns, bad encoding)."""
+
+
+async def file_chunks(file: UploadFile, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+async def path_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Chunks of a spooled upload on disk."""
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+
+
+async def text_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Chunks of CSV text that is already in memory (JSON body uploads)."""
+    for start in range(0, len(text), chunk_size):
+        yield text[start : start + chunk_size].encode()
+
+
+def to_columns(rows: Iterable[dict], names: Iterable[str]) -> Columns:
+    """Columns of ``names`` from row dicts (JSON uploads)."""
+    rows = list(rows)
+    return {name: [row[name] for row in rows] for name in names}
+
+
+def column_len(columns: Columns) -> int:
+    return len(next(iter(columns.values()), ()))
+
+
+def take(columns: Columns, start: int, stop: int) -> Columns:
+    return {name: values[start:stop] for name, values in columns.items()}
+
+
+@dataclass
+class ParsedChunk:
+    columns: Columns
+    rows: int  # data rows in the chunk, including rejected ones
+    # (index of the row within the chunk, required columns left blank)
+    blank: list[tuple[int, list[str]]] = field(default_factory=list)
+
+
+def parse_chunk(text: str, fieldnames: list[str], required: list[str]) -> ParsedChunk:
+    """Parse complete CSV records into stripped ``required`` columns.
+
+    ``required`` is sorted and present in ``fieldnames``. Rows with a blank
+    required value are left out of ``columns`` and listed in ``blank``.
+    Blank lines are skipped without counting as rows.
+    """
+    width = len(fieldnames)
+    fields = _split_plain(text, width)
+    if fields is None:
+        records = list(filter(None, csv.reader(io.StringIO(text, newline=""))))
+        if set(map(len, records)) - {width}:
+            records = [(r + [""] * width)[:width] for r in records]
+        fields = list(zip(*records)) or [()] * width
+    n_rows = len(fields[0])
+    if not n_rows:
+        return ParsedChunk({name: [] for name in required}, 0)
+
+    by_name = dict(zip(fieldnames, fields))
+    columns = {name: list(map(str.strip, by_name[name])) for name in required}
+
+    bad: dict[int, list[str]] = {}
+    for name in required:
+        values = columns[name]
+        if "" in values:
+            for i, value in enumerate(values):
+                if not value:
+                    bad.setdefault(i, []).append(name)
+    if bad:
+        keep = [i for i in range(n_rows) if i not in bad]
+        columns = {name: [values[i] for i in keep] for name, values in columns.items()}
+    return ParsedChunk(columns, n_rows, sorted(bad.items()))
+
+
+def _split_plain(text: str, width: int) -> list[list[str]] | None:
+    """Fields of ``text`` by column, if it is plain CSV with ``width`` fields per line.
+
+    Text without quotes or bare carriage returns, where every non-blank line
+    has exactly ``width`` fields, parses the same with string splits. Those
+    run in C over the whole chunk. Anything else returns None and goes
+    through ``csv.reader``.
+    """
+    if '"' in text:
+        return None
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+        if "\r" in text:
+            return None
+    lines = list(filter(None, text.split("\n")))
+    if not lines:
+        return [[] for _ in range(width)]
+    if set(map(methodcaller("count", ","), lines)) - {width - 1}:
+        return None
+    flat = ",".join(lines).split(",")
+    return [flat[k::width] for k in range(width)]
+
+
+class CSVRows:
+    """Validated rows of a CSV upload, read lazily from byte chunks.
+
+    Iterate ``batches`` once. It yields ``Columns`` restricted to the
+    required columns. Rows with blank required values are skipped and
+    reported in ``errors`` as ``Row <n>: ...``, where row 1 is the header.
+    ``rows_read`` counts the data rows parsed so far, and ``bytes_read``
+    the bytes taken from ``chunks``.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterable[bytes],
+        required_columns: set[str],
+        workers: int = PARSE_WORKERS,
+    ):
+        self.chunks = chunks
+        self.required_columns = required_columns
+        self.workers = workers
+        self.errors: list[str] = []
+        self.rows_read = 0
+        self.bytes_read = 0
+        self._fieldnames: list[str] | None = None
+
+    async def batches(self, size: int) -> AsyncIterator[Columns]:
+        pending: Columns = {}
+        async for parsed in self._parsed():
+            for i, names in parsed.blank:
+                # row 1 is the header
+                self.errors.append(
+                    f"Row {self.rows_read + i + 2}: blank value(s) for {', '.join(names)}"
+                )
+            self.rows_read += parsed.rows
+            if not pending:
+                pending = parsed.columns
+            else:
+                for name, values in parsed.columns.items():
+                    pending[name].extend(values)
+
+            n = column_len(pending)
+            for start in range(0, n - n % size, size):
+                yield take(pending, start, start + size)
+            pending = take(pending, n - n % size, n) if n % size else {}
+        if self._fieldnames is None:
+            raise CSVFormatError("CSV is empty or has no header row")
+        if pending:
+            yield pending
+
+    async def _parsed(self) -> AsyncIterator[ParsedChunk]:
+        """Parsed chunks in file order; on a process pool when there are several."""
+        texts = self._texts()
+        first = await anext(texts, None)
+        second = await anext(texts, None) if first is not None else None
+        required = sorted(self.required_columns)
+        if second is None or self.workers <= 1:
+            for text in (first, second):
+                if text is not None:
+                    yield parse_chunk(text, self._fieldnames, required)
+            async for text in texts:
+                yield parse_chunk(text, self._fieldnames, required)
+            return
+
+        loop = asyncio.get_running_loop()
+        inflight: deque[asyncio.Future] = deque()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+
+            def submit(text: str) -> None:
+                inflight.append(
+                    loop.run_in_executor(pool, parse_chunk, text, self._fieldnames, required)
+                )
+
+            submit(first)
+            submit(second)
+            async for text in texts:
+                submit(text)
+                if len(inflight) >= 2 * self.workers:
+                    yield await inflight.popleft()
+            while inflight:
+                yield await inflight.popleft()
+
+    async def _texts(self) -> AsyncIterator[str]:
+        """Text of complete records, one piece per chunk, without the header."""
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        records = _Records(MAX_RECORD_CHARS)
+        async for chunk in self.chunks:
+            self.bytes_read += len(chunk)
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError as exc:
+                offset = self.bytes_read - len(chunk) + exc.start
+                raise CSVFormatError(f"CSV is not valid UTF-8 (near byte {offset})") from exc
+            if complete := self._after_header(records.feed(text)):
+                yield complete
+        try:
+            rest = records.pending + decoder.decode(b"", final=True)
+        except UnicodeDecodeError as exc:
+            raise CSVFormatError("CSV is not valid UTF-8 (truncated at the end)") from exc
+        if rest := self._after_header(rest):
+            yield rest
+
+    def _after_header(self, text: str) -> str:
+        """``text`` minus the header record, which is read and checked first."""
+        if self._fieldnames is not None or not text:
+            return text
+        buffer = io.StringIO(text, newline="")
+        for record in csv.reader(buffer):
+            if not record:  # blank line
+                continue
+            self._fieldnames = [f.strip() for f in record]
+            missing = self.required_columns - set(self._fieldnames)
+            if missing:
+                raise CSVFormatError(f"Missing required columns: {', '.join(sorted(missing))}")
+            return buffer.read()
+        return ""
+
+
+class _Records:
+    """Cuts decoded text into runs of complete records.
+
+    ``feed`` returns the text up to the last line break outside a quoted
+    field and keeps the rest in ``pending``. A quote opens a quoted field
+    only at the start of a field, and ``""`` inside one is an escaped
+    quote, as ``csv.reader`` reads them. Only the text after what was
+    scanned before is scanned again.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending = ""
+        self._scanned = 0
+        self._quoted = False
+
+    def feed(self, text: str) -> str:
+        p = self.pending + text
+        pos, cut = self._scanned, 0
+        while True:
+            q = p.find('"', pos)
+            if not self._quoted:
+                end = len(p) if q == -1 else q
+                if (brk := max(p.rfind("\n", pos, end), p.rfind("\r", pos, end))) != -1:
+                    cut = brk + 1
+            if q == -1:
+                pos = len(p)
+                break
+            if self._quoted:
+                if q + 1 == len(p):  # maybe the first half of ""
+                    pos = q
+                    break
+                if p[q + 1] == '"':
+                    pos = q + 2
+                    continue
+                self._quoted = False
+            elif q == 0 or p[q - 1] in ",\r\n":
+                self._quoted = True
+            pos = q + 1
+        self.pending, self._scanned = p[cut:], pos - cut
+        if len(self.pending) > self.max_pending:
+            raise CSVFormatError(
+                f"CSV record longer than {self.max_pending} characters (unclosed quote?)"
+            )
+        return p[:cut]
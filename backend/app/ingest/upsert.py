@@ -0,0 +1,319 @@
+"""Bulk upserts for inventory and student uploads.
+
+Rows arrive as ``Columns`` (one list per field) and are written
+``BATCH_SIZE`` at a time with one ``INSERT ... ON CONFLICT DO UPDATE``
+executemany per batch, instead of a ``db.get`` round trip per row. Before
+each batch, one ``SELECT ... IN`` finds the rows that already exist. That
+gives the inserted/updated split, and for students it also gives the old
+values the ``DemandDelta`` needs.
+
+Each row also stores ``row_hash``, a hash of its uploaded values. The
+existence check reads the stored hashes, and rows whose hash matches are
+counted as unchanged and not written at all, so re-uploading a file that
+has barely changed is mostly reads. Rows written before the hash existed
+have none and are rewritten once.
+
+A key that appears twice in one upload is written once, with the last
+values, and counted as an update, as if the rows had been applied one
+after another. Writes that change anything bump the table's data version
+(``app.solver.versions``). The caller commits.
+
+For a full snapshot, pass a ``seen`` set to the upserts and then call
+``delete_missing_students`` / ``delete_missing_inventory`` with it to drop
+the rows the upload no longer lists. Their ``on_batch`` hook runs after
+each batch of deletes, which leaves every batch consistent with the demand
+tables, so a long delete can be committed batch by batch.
+"""
+
+import os
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from hashlib import blake2b
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.inventory import Inventory
+from app.models.student import Student
+from app.solver.catalog import sku_keys
+from app.solver.demand import DemandDelta
+from app.solver.versions import INVENTORY, STUDENTS, bump_data_version
+
+from .reader import Columns, column_len, take
+
+# Rows per executemany; also bounds the IN (...) list of the existence check
+BATCH_SIZE = int(os.environ.get("EQUIPROUTE_INGEST_BATCH_SIZE", "5000"))
+
+INVENTORY_FIELDS = ("sku_id", "description", "total_stock_available")
+STUDENT_FIELDS = ("student_id", "school_id", "shirt_sku", "pants_sku", "shoe_size_sku")
+SKU_COLUMNS = ("shirt_sku", "pants_sku", "shoe_size_sku")
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0  # rows identical to the stored ones, not written
+    deleted: int = 0  # rows missing from a full snapshot
+
+    @property
+    def upserted(self) -> int:
+        return self.inserted + self.updated
+
+    def __iadd__(self, other: "UpsertResult") -> "UpsertResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.deleted += other.deleted
+        return self
+
+
+def row_hash(*values) -> int:
+    """Signed 64-bit hash of a row's values, the same in every process."""
+    digest = blake2b("\x1f".join(map(str, values)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+async def upsert_inventory(
+    session: AsyncSession,
+    columns: Columns,
+    batch_size: int = BATCH_SIZE,
+    seen: set[str] | None = None,
+) -> UpsertResult:
+    """Insert or update inventory rows (``INVENTORY_FIELDS``, stock as int).
+
+    The SKU ids are added to ``seen`` when it is given.
+    """
+    stmt = sqlite_insert(Inventory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Inventory.sku_id],
+        set_={
+            "description": stmt.excluded.description,
+            "total_stock_available": stmt.excluded.total_stock_available,
+            "row_hash": stmt.excluded.row_hash,
+        },
+    )
+    result = UpsertResult()
+    written = False
+    for batch in _batches(columns, batch_size):
+        sku_ids = batch["sku_id"]
+        latest = {sku_id: i for i, sku_id in enumerate(sku_ids)}
+        if seen is not None:
+            seen.update(latest)
+        rows = list(latest.values())
+        description = [batch["description"][i] for i in rows]
+        stock = [batch["total_stock_available"][i] for i in rows]
+        hashes = list(map(row_hash, description, stock))
+
+        stored = dict(
+            (
+                await session.execute(
+                    select(Inventory.sku_id, Inventory.row_hash).where(
+                        Inventory.sku_id.in_(latest)
+                    )
+                )
+            ).all()
+        )
+        changed = _changed(latest, hashes, stored)
+        if changed:
+            written = True
+            await session.execute(
+                stmt,
+                [
+                    {
+                        "sku_id": sku_id,
+                        "description": description[j],
+                        "total_stock_available": stock[j],
+                        "row_hash": hashes[j],
+                    }
+                    for j, sku_id in changed
+                ],
+            )
+        result += _counts(len(sku_ids), len(latest), len(stored), len(changed))
+    if written:
+        await bump_data_version(session, INVENTORY)
+    return result
+
+
+async def upsert_students(
+    session: AsyncSession,
+    columns: Columns,
+    batch_size: int = BATCH_SIZE,
+    seen: set[str] | None = None,
+) -> UpsertResult:
+    """Insert or update students and keep the demand tables in step.
+
+    ``columns`` holds ``STUDENT_FIELDS`` with SKU strings; new SKUs are
+    added to the catalog. The student ids are added to ``seen`` when it
+    is given.
+    """
+    stmt = sqlite_insert(Student)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Student.student_id],
+        set_={
+            "school_id": stmt.excluded.school_id,
+            "shirt_sku_key": stmt.excluded.shirt_sku_key,
+            "pants_sku_key": stmt.excluded.pants_sku_key,
+            "shoe_sku_key": stmt.excluded.shoe_sku_key,
+            "row_hash": stmt.excluded.row_hash,
+        },
+    )
+    result = UpsertResult()
+    written = False
+    keys: dict[str, int] = {}
+    delta = DemandDelta()
+    for batch in _batches(columns, batch_size):
+        student_ids = batch["student_id"]
+        latest = {student_id: i for i, student_id in enumerate(student_ids)}
+        if seen is not None:
+            seen.update(latest)
+        rows = list(latest.values())
+        school_ids = [batch["school_id"][i] for i in rows]
+        skus = [[batch[c][i] for i in rows] for c in SKU_COLUMNS]
+        hashes = list(map(row_hash, school_ids, *skus))
+
+        stored = {
+            student_id: old
+            for student_id, *old in (
+                await session.execute(
+                    select(
+                        Student.student_id,
+                        Student.row_hash,
+                        Student.school_id,
+                        Student.shirt_sku_key,
+                        Student.pants_sku_key,
+                        Student.shoe_sku_key,
+                    ).where(Student.student_id.in_(latest))
+                )
+            ).all()
+        }
+        changed = _changed(latest, hashes, {k: old[0] for k, old in stored.items()})
+        result += _counts(len(student_ids), len(latest), len(stored), len(changed))
+        if not changed:
+            continue
+        written = True
+
+        old = [stored[student_id][1:] for _, student_id in changed if student_id in stored]
+        if old:
+            old_school_ids, *old_keys = zip(*old)
+            delta.add_many(old_school_ids, old_keys, sign=-1)
+
+        unseen = {column[j] for column in skus for j, _ in changed} - keys.keys()
+        if unseen:
+            keys.update(await sku_keys(session, unseen))
+        new_school_ids = [school_ids[j] for j, _ in changed]
+        shirt, pants, shoes = ([keys[column[j]] for j, _ in changed] for column in skus)
+        delta.add_many(new_school_ids, (shirt, pants, shoes))
+        await session.execute(
+            stmt,
+            [
+                {
+                    "student_id": student_id,
+                    "school_id": school_id,
+                    "shirt_sku_key": shirt_key,
+                    "pants_sku_key": pants_key,
+                    "shoe_sku_key": shoe_key,
+                    "row_hash": hashes[j],
+                }
+                for (j, student_id), school_id, shirt_key, pants_key, shoe_key in zip(
+                    changed, new_school_ids, shirt, pants, shoes
+                )
+            ],
+        )
+
+    await delta.apply(session)
+    if written:
+        await bump_data_version(session, STUDENTS)
+    return result
+
+
+async def delete_missing_inventory(
+    session: AsyncSession,
+    seen: set[str],
+    batch_size: int = BATCH_SIZE,
+    on_batch: Callable[[int], Awaitable[None]] | None = None,
+) -> int:
+    """Delete inventory rows whose SKU id is not in ``seen``; returns the count.
+
+    ``on_batch`` is awaited after each batch with the number deleted so far.
+    """
+    missing = await _missing(session, Inventory.sku_id, seen, batch_size)
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start : start + batch_size]
+        await session.execute(delete(Inventory).where(Inventory.sku_id.in_(chunk)))
+        await bump_data_version(session, INVENTORY)
+        if on_batch is not None:
+            await on_batch(start + len(chunk))
+    return len(missing)
+
+
+async def delete_missing_students(
+    session: AsyncSession,
+    seen: set[str],
+    batch_size: int = BATCH_SIZE,
+    on_batch: Callable[[int], Awaitable[None]] | None = None,
+) -> int:
+    """Delete students whose id is not in ``seen``, and their demand; returns the count.
+
+    ``on_batch`` is awaited after each batch with the number deleted so far.
+    """
+    missing = await _missing(session, Student.student_id, seen, batch_size)
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start : start + batch_size]
+        delta = DemandDelta()
+        old = (
+            await session.execute(
+                select(
+                    Student.school_id,
+                    Student.shirt_sku_key,
+                    Student.pants_sku_key,
+                    Student.shoe_sku_key,
+                ).where(Student.student_id.in_(chunk))
+            )
+        ).all()
+        if old:
+            school_ids, *old_keys = zip(*old)
+            delta.add_many(school_ids, old_keys, sign=-1)
+        await session.execute(delete(Student).where(Student.student_id.in_(chunk)))
+        await delta.apply(session)
+        await bump_data_version(session, STUDENTS)
+        if on_batch is not None:
+            await on_batch(start + len(chunk))
+    return len(missing)
+
+
+def _changed(
+    latest: dict[str, int], hashes: Sequence[int], stored: dict[str, int | None]
+) -> list[tuple[int, str]]:
+    """(position in ``latest``, key) of the rows that are new or differ from ``stored``."""
+    return [
+        (j, key)
+        for j, (key, new_hash) in enumerate(zip(latest, hashes))
+        if key not in stored or stored[key] != new_hash
+    ]
+
+
+def _counts(n_rows: int, n_keys: int, n_stored: int, n_changed: int) -> UpsertResult:
+    inserted = n_keys - n_stored
+    return UpsertResult(
+        inserted=inserted,
+        # Repeated keys count as updates of the first occurrence
+        updated=n_rows - n_keys + n_changed - inserted,
+        unchanged=n_keys - n_changed,
+    )
+
+
+async def _missing(session: AsyncSession, key, seen: set[str], batch_size: int) -> list[str]:
+    """Stored values of ``key`` that are not in ``seen``, read in partitions."""
+    missing: list[str] = []
+    result = await session.stream_scalars(select(key))
+    async for part in result.partitions(batch_size):
+        missing.extend(k for k in part if k not in seen)
+    return missing
+
+
+def _batches(columns: Columns, size: int):
+    n = column_len(columns)
+    for start in range(0, n, size):
+        yield take(columns, start, start + size)
@@ -0,0 +1,79 @@
+from .hub import KEEPALIVE_SECONDS, WATCH_SECONDS, JobEvent, JobHub, job_changed, job_status
+from .pool import SOLVER_WORKERS, SolverPool
+from .queue import (
+    FINISHED,
+    HEARTBEAT_SECONDS,
+    LEASE_SECONDS,
+    MAX_ATTEMPTS,
+    SOLVER_KINDS,
+    SOLVER_QUEUE_SIZE,
+    Claim,
+    QueueFull,
+    cancel,
+    claim,
+    enqueue,
+    finish,
+    heartbeat,
+    lease_deadline,
+    new_worker_id,
+    queue_position,
+    recover_expired,
+    release,
+    request_stop,
+)
+from .runner import (
+    OptimizeInputs,
+    cacheable,
+    cached_job,
+    load_inventory,
+    optimize_inputs,
+    run_job,
+)
+from .worker import EMBEDDED_WORKER, POLL_SECONDS, Worker, wake_workers
+
+# Runs the jobs of the worker embedded in this API process
+solver_pool = SolverPool()
+# Wakes this process's long-polls and event streams
+job_hub = JobHub()
+
+__all__ = [
+    "KEEPALIVE_SECONDS",
+    "WATCH_SECONDS",
+    "JobEvent",
+    "JobHub",
+    "job_changed",
+    "job_status",
+    "SOLVER_WORKERS",
+    "SolverPool",
+    "FINISHED",
+    "HEARTBEAT_SECONDS",
+    "LEASE_SECONDS",
+    "MAX_ATTEMPTS",
+    "SOLVER_KINDS",
+    "SOLVER_QUEUE_SIZE",
+    "Claim",
+    "QueueFull",
+    "cancel",
+    "claim",
+    "enqueue",
+    "finish",
+    "heartbeat",
+    "lease_deadline",
+    "new_worker_id",
+    "queue_position",
+    "recover_expired",
+    "release",
+    "request_stop",
+    "OptimizeInputs",
+    "cacheable",
+    "cached_job",
+    "load_inventory",
+    "optimize_inputs",
+    "run_job",
+    "EMBEDDED_WORKER",
+    "POLL_SECONDS",
+    "Worker",
+    "wake_workers",
+    "solver_pool",
+    "job_hub",
+]
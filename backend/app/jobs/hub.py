@@ -0,0 +1,241 @@
+"""In-process notification hub for clients waiting on jobs.
+
+Long-polls (``GET /jobs/{id}?wait=``) and event streams
+(``GET /jobs/{id}/events``) wait here instead of querying the database.
+While any client waits, one poller per process reads the ``revision`` of
+the watched jobs every ``WATCH_SECONDS``: one small query however many
+clients wait, whichever process changed the jobs. Writes made in this
+process wake the poller at once (``job_changed``). When a job's revision
+moves, its snapshot (``job_status``) is read once and shared by all of
+its waiters.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import async_session
+from app.models.job import Job, JobStatus
+from app.schemas.job import JobStatus as JobStatusSchema
+
+from .queue import FINISHED, queue_position
+
+WATCH_SECONDS = float(os.environ.get("EQUIPROUTE_JOB_WATCH_SECONDS", "0.5"))
+# Comment line sent on idle event streams, so proxies keep them open
+KEEPALIVE_SECONDS = 15.0
+
+logger = logging.getLogger(__name__)
+
+_local_hubs: set["JobHub"] = set()
+
+
+def job_changed() -> None:
+    """Tell the hubs of this process that a job was written; others poll."""
+    for hub in _local_hubs:
+        hub.poke()
+
+
+async def job_status(db: AsyncSession, job: Job) -> JobStatusSchema:
+    """What ``GET /jobs/{job_id}`` returns for ``job``."""
+    return JobStatusSchema(
+        job_id=job.job_id,
+        kind=job.kind.value,
+        status=job.status.value,
+        created_at=job.created_at,
+        cache_hit=job.cache_hit,
+        queue_position=await queue_position(db, job),
+        requests=job.requests,
+        revision=job.revision,
+        result=job.result_json,
+    )
+
+
+def finished(snapshot: JobStatusSchema) -> bool:
+    return JobStatus(snapshot.status) in FINISHED
+
+
+@dataclass
+class JobEvent:
+    """One server-sent event: ``status``, ``progress`` or ``result``."""
+
+    kind: str
+    revision: int
+    data: dict
+
+
+class JobHub:
+    """Wakes the clients waiting on jobs when the jobs change.
+
+    ``sessions`` opens the database sessions of the poller and of the
+    snapshot reads.
+    """
+
+    def __init__(self, sessions: sessionmaker = async_session, poll_seconds: float = WATCH_SECONDS):
+        self.sessions = sessions
+        self.poll_seconds = poll_seconds
+        self._watchers: Counter[int] = Counter()
+        self._revisions: dict[int, int] = {}  # last seen by the poller
+        self._changed: dict[int, asyncio.Event] = {}
+        self._snapshots: dict[int, asyncio.Future] = {}
+        self._poller: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def poke(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @asynccontextmanager
+    async def watching(self, job_id: int):
+        """Keep ``job_id`` polled (and its snapshot cached) for the block."""
+        self._watchers[job_id] += 1
+        if self._poller is None or self._poller.done():
+            self._wakeup = asyncio.Event()
+            self._poller = asyncio.ensure_future(self._poll())
+        try:
+            yield
+        finally:
+            self._watchers[job_id] -= 1
+            if not self._watchers[job_id]:
+                del self._watchers[job_id]
+                self._revisions.pop(job_id, None)
+                self._changed.pop(job_id, None)
+                self._snapshots.pop(job_id, None)
+                if not self._watchers:
+                    self.poke()  # lets the poller end
+
+    async def wait(self, job_id: int, revision: int, timeout: float) -> bool:
+        """Wait until the job is past ``revision``; False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with self.watching(job_id):
+            while self._revisions.get(job_id, revision) <= revision:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                changed = self._changed.setdefault(job_id, asyncio.Event())
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(changed.wait(), remaining)
+        return True
+
+    async def snapshot(self, job_id: int) -> JobStatusSchema | None:
+        """The job as ``GET /jobs/{job_id}`` shows it; None if there is none.
+
+        While the job is watched, all callers share one read per revision.
+        """
+        loading = self._snapshots.get(job_id)
+        if loading is None or not self._fresh(loading, job_id):
+            loading = asyncio.ensure_future(self._load(job_id))
+            if job_id in self._watchers:
+                self._snapshots[job_id] = loading
+        return await asyncio.shield(loading)
+
+    async def next(
+        self, job_id: int, since: int | None, timeout: float
+    ) -> JobStatusSchema | None:
+        """Long-poll: the job once it is past revision ``since`` or finished.
+
+        Without ``since``, waits for the next change. After ``timeout`` the
+        job is returned as it is.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with self.watching(job_id):
+            current = await self.snapshot(job_id)
+            if current is None:
+                return None
+            since = current.revision if since is None else since
+            while current.revision <= since and not finished(current):
+                if not await self.wait(job_id, current.revision, deadline - loop.time()):
+                    break
+                current = await self.snapshot(job_id)
+        return current
+
+    async def events(
+        self, job_id: int, last_revision: int | None = None, keepalive: float = KEEPALIVE_SECONDS
+    ) -> AsyncIterator[JobEvent | None]:
+        """Event stream of a job; ends after its ``result``.
+
+        ``status`` carries the job without its result, when the status,
+        queue position or number of requests changes. ``progress`` carries
+        a new incumbent or ingest progress, and ``result`` the finished job,
+        sent once. A stream resumed at ``last_revision`` skips what the
+        client already has. None is yielded after ``keepalive`` seconds
+        without events.
+        """
+        async with self.watching(job_id):
+            sent: JobStatusSchema | None = None
+            revision = last_revision
+            while True:
+                current = await self.snapshot(job_id)
+                if current is None:
+                    return
+                if revision is None or current.revision > revision:
+                    revision = current.revision
+                    if finished(current):
+                        yield JobEvent("result", revision, current.model_dump(mode="json"))
+                        return
+                    if sent is None or _state(sent) != _state(current):
+                        data = current.model_dump(mode="json", exclude={"result"})
+                        yield JobEvent("status", revision, data)
+                    if current.result is not None and (
+                        sent is None or sent.result != current.result
+                    ):
+                        data = {"job_id": job_id, "result": current.result}
+                        yield JobEvent("progress", revision, data)
+                    sent = current
+                elif finished(current):
+                    return
+                if not await self.wait(job_id, revision, keepalive):
+                    yield None
+
+    def _fresh(self, loading: asyncio.Future, job_id: int) -> bool:
+        if not loading.done():
+            return True
+        if loading.cancelled() or loading.exception() is not None or loading.result() is None:
+            return False
+        loaded = loading.result().revision
+        return loaded >= self._revisions.get(job_id, loaded + 1)
+
+    async def _load(self, job_id: int) -> JobStatusSchema | None:
+        async with self.sessions() as db:
+            job = await db.get(Job, job_id)
+            return None if job is None else await job_status(db, job)
+
+    async def _poll(self) -> None:
+        _local_hubs.add(self)
+        try:
+            while self._watchers:
+                try:
+                    async with self.sessions() as db:
+                        rows = (
+                            await db.execute(
+                                select(Job.job_id, Job.revision).where(
+                                    Job.job_id.in_(list(self._watchers))
+                                )
+                            )
+                        ).all()
+                except Exception:
+                    logger.exception("polling job revisions failed")
+                    rows = []
+                for job_id, revision in rows:
+                    if job_id in self._watchers and self._revisions.get(job_id) != revision:
+                        self._revisions[job_id] = revision
+                        if changed := self._changed.pop(job_id, None):
+                            changed.set()
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                self._wakeup.clear()
+        finally:
+            _local_hubs.discard(self)
+
+
+def _state(snapshot: JobStatusSchema) -> tuple:
+    return snapshot.status, snapshot.queue_position, snapshot.requests
@@ -0,0 +1,213 @@
+"""Bounded process pool for solver jobs.
+
+Solver runs are CPU-bound and spend much of their time in Python (matrix
+building, presolve, heuristics), so running them in a thread still holds
+the GIL against the event loop. Here they run in ``SOLVER_WORKERS`` worker
+processes instead, and the API process only awaits their results.
+
+At most ``SOLVER_WORKERS`` jobs run at a time, each holding one of the
+worker slots. Waiting is left to the durable queue (``queue``, ``worker``),
+which claims no more jobs than the pool has slots for.
+
+Each slot has a stop flag in shared memory, which the solver polls
+through ``should_stop``. Incumbents travel back over a multiprocessing
+queue and are handed to the job's ``on_incumbent`` coroutine in order,
+before ``run`` returns the final result.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any
+
+SOLVER_WORKERS = int(os.environ.get("EQUIPROUTE_SOLVER_WORKERS", "2"))
+
+_DONE = "done"  # last message of a job on the incumbent queue
+
+# Set in each worker process by _init_worker
+_stop_flags = None
+_incumbents = None
+
+
+def _init_worker(stop_flags, incumbents) -> None:
+    global _stop_flags, _incumbents
+    _stop_flags, _incumbents = stop_flags, incumbents
+
+
+def _call(job_id: int, slot: int, fn: Callable, args: tuple, kwargs: dict, hooks: bool):
+    """Worker side of ``run``: call ``fn`` with the slot's stop flag and incumbent feed."""
+    try:
+        if hooks:
+            kwargs = {
+                **kwargs,
+                "on_incumbent": lambda partial: _incumbents.put((job_id, partial)),
+                "should_stop": lambda: bool(_stop_flags[slot]),
+            }
+        return fn(*args, **kwargs)
+    finally:
+        _incumbents.put((job_id, _DONE))
+
+
+class SolverPool:
+    """Worker slots and processes for solver jobs.
+
+    Run a job inside a ``slot``::
+
+        async with pool.slot(job_id) as slot:
+            result = await pool.run(job_id, slot, solve, profiles, inv)
+    """
+
+    def __init__(self, workers: int = SOLVER_WORKERS):
+        self.workers = max(workers, 1)
+        self._running: dict[int, int] = {}  # job_id → slot
+        self._free: asyncio.Queue[int] = asyncio.Queue()
+        for slot in range(self.workers):
+            self._free.put_nowait(slot)
+        self._cancelled: set[int] = set()
+        self._feeds: dict[int, asyncio.Queue] = {}
+        self._executor: ProcessPoolExecutor | None = None
+        self._stop_flags = multiprocessing.Array("b", self.workers, lock=False)
+        self._incumbents: multiprocessing.Queue | None = None
+        self._forwarder: threading.Thread | None = None
+
+    # ── Slots ──
+
+    @asynccontextmanager
+    async def slot(self, job_id: int):
+        """Wait for a free worker slot; yields its index and frees it on exit."""
+        slot = await self._free.get()
+        self._running[job_id] = slot
+        self._stop_flags[slot] = 0
+        try:
+            yield slot
+        finally:
+            del self._running[job_id]
+            self._cancelled.discard(job_id)
+            self._free.put_nowait(slot)
+
+    # ── Control ──
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a running job; False if it is not running here.
+
+        The solve is asked to stop through its stop flag; the caller checks
+        ``cancelled`` and discards the result.
+        """
+        if job_id in self._running:
+            self._cancelled.add(job_id)
+            self._stop_flags[self._running[job_id]] = 1
+            return True
+        return False
+
+    def cancelled(self, job_id: int) -> bool:
+        return job_id in self._cancelled
+
+    def stop(self, job_id: int) -> bool:
+        """Ask a running solve to finish now with its incumbent; False if not running."""
+        slot = self._running.get(job_id)
+        if slot is None:
+            return False
+        self._stop_flags[slot] = 1
+        return True
+
+    def stopped(self, job_id: int) -> bool:
+        """Whether the running job's stop flag is set (by ``stop`` or ``cancel``)."""
+        slot = self._running.get(job_id)
+        return slot is not None and bool(self._stop_flags[slot])
+
+    # ── Execution ──
+
+    async def run(
+        self,
+        job_id: int,
+        slot: int,
+        fn: Callable,
+        *args,
+        on_incumbent: Callable[[Any], Awaitable[None]] | None = None,
+        **kwargs,
+    ) -> Any:
+        """Run ``fn(*args, **kwargs)`` in a worker process and return its result.
+
+        With ``on_incumbent``, ``fn`` is also passed ``on_incumbent`` and
+        ``should_stop`` hooks in the style of ``solve``. Each incumbent it
+        reports is awaited with ``on_incumbent`` in order, all before this
+        returns.
+        """
+        executor = self._ensure_executor()
+        feed = self._feeds[job_id] = asyncio.Queue()
+        future = asyncio.wrap_future(
+            executor.submit(_call, job_id, slot, fn, args, kwargs, on_incumbent is not None)
+        )
+        try:
+            while (partial := await self._next(feed, future)) != _DONE:
+                if on_incumbent is not None:
+                    await on_incumbent(partial)
+            return await future
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory); start afresh for the next job
+            self._executor = None
+            raise
+        finally:
+            self._feeds.pop(job_id, None)
+            if not future.done():
+                future.cancel()
+
+    @staticmethod
+    async def _next(feed: asyncio.Queue, future: asyncio.Future) -> Any:
+        """Next message for the job; raises if its worker died before sending _DONE."""
+        while not future.done():
+            get = asyncio.ensure_future(feed.get())
+            await asyncio.wait({get, future}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                return get.result()
+            get.cancel()
+        if isinstance(future.exception(), BrokenProcessPool):
+            raise future.exception()
+        # Finished normally or with an error: _DONE is on its way
+        return await feed.get()
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            if self._incumbents is None:
+                self._incumbents = multiprocessing.Queue()
+                self._forwarder = threading.Thread(
+                    target=self._forward, args=(asyncio.get_running_loop(),), daemon=True
+                )
+                self._forwarder.start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._stop_flags, self._incumbents),
+            )
+        return self._executor
+
+    def _forward(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Thread: move incumbent messages from the workers onto the event loop."""
+        while (message := self._incumbents.get()) is not None:
+            loop.call_soon_threadsafe(self._deliver, *message)
+
+    def _deliver(self, job_id: int, partial: Any) -> None:
+        feed = self._feeds.get(job_id)
+        if feed is not None:
+            feed.put_nowait(partial)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, abandoning any solve still running."""
+        processes = []
+        if self._executor is not None:
+            processes = list((self._executor._processes or {}).values())
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._incumbents is not None:
+            self._incumbents.put(None)
+            self._forwarder.join()
+            self._incumbents = None
+        # Otherwise the interpreter waits for running solves on exit; SCIP
+        # handles SIGTERM itself, hence kill
+        for process in processes:
+            process.kill()
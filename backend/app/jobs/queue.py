@@ -0,0 +1,396 @@
+"""Durable job queue on the ``jobs`` table.
+
+Solver jobs are rows. The API inserts them PENDING with their request in
+``payload``, and worker processes claim them oldest first: the worker
+embedded in the API process, or any number of ``python -m app.worker``
+processes on hosts that share the database. A claim is a single
+conditional UPDATE, so no two workers ever get the same job.
+
+A claim is a lease (``worker_id``, ``lease_expires_at``) that the worker
+renews with ``heartbeat`` while the job runs. Its writes to the job
+(incumbents, the final result) only land while it still holds the lease.
+When a worker dies its leases run out and ``recover_expired`` puts the
+jobs back in the queue, until a job has been tried ``MAX_ATTEMPTS`` times
+and ends FAILED. Background ingest jobs hold a lease too, renewed per
+batch, but are failed rather than retried: their spooled upload only
+exists on the API host that received it.
+
+Identical requests share a job while it is waiting or running
+(``enqueue``). Cancel and stop also go through the row, so they reach the
+job wherever it runs. A cancelled job is CANCELLED at once, which its
+worker finds out as a lost lease at the next heartbeat; ``stop_requested``
+asks the worker to finish early with its incumbent.
+
+Every write that changes what a client sees of a job (status, result,
+requests) bumps its ``revision``, which ``app.jobs.hub`` watches. That
+includes the waiting jobs whose place in line moves when a job ahead of
+them leaves the queue or comes back to it.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import LIVE_INPUT_WHERE, Job, JobKind, JobStatus
+from app.solver.versions import data_versions
+
+LEASE_SECONDS = float(os.environ.get("EQUIPROUTE_JOB_LEASE_SECONDS", "30"))
+HEARTBEAT_SECONDS = float(os.environ.get("EQUIPROUTE_JOB_HEARTBEAT_SECONDS", "2"))
+MAX_ATTEMPTS = int(os.environ.get("EQUIPROUTE_JOB_MAX_ATTEMPTS", "3"))
+# Solver jobs that may wait for a worker; enqueue refuses more
+SOLVER_QUEUE_SIZE = int(os.environ.get("EQUIPROUTE_SOLVER_QUEUE_SIZE", "16"))
+
+SOLVER_KINDS = (JobKind.OPTIMIZE, JobKind.SCENARIOS)
+FINISHED = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class QueueFull(Exception):
+    """``SOLVER_QUEUE_SIZE`` solver jobs are already waiting."""
+
+    def __init__(self, waiting: int):
+        super().__init__(f"Solver queue is full ({waiting} jobs waiting)")
+        self.waiting = waiting
+
+
+@dataclass
+class Claim:
+    """A job leased to ``worker_id``."""
+
+    job_id: int
+    kind: JobKind
+    payload: dict | None
+    attempts: int
+    worker_id: str
+
+
+def new_worker_id() -> str:
+    """Unique name of a worker, for ``Job.worker_id``: host, pid and a random tag."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def lease_deadline(seconds: float = LEASE_SECONDS) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def _owned(claim: Claim):
+    return (
+        Job.job_id == claim.job_id,
+        Job.worker_id == claim.worker_id,
+        Job.status == JobStatus.PROCESSING,
+    )
+
+
+# ── API side ──
+
+
+def input_key(kind: JobKind, payload: dict, versions: dict[str, int]) -> str:
+    """Hash of what a solver job computes from: its request and the data versions."""
+    canonical = json.dumps(
+        {"kind": kind.value, "request": payload, "data": versions}, sort_keys=True
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def enqueue(
+    db: AsyncSession, kind: JobKind, payload: dict, max_waiting: int = SOLVER_QUEUE_SIZE
+) -> tuple[Job, int]:
+    """Queue a solver job; returns it with its place in line (0 once running).
+
+    While a job with the same ``input_key`` is PENDING or PROCESSING, the
+    request joins it (``requests`` + 1) instead of queueing another run of
+    the same solve; ``job.requests > 1`` tells the caller so. Otherwise
+    a new PENDING job is inserted, or ``QueueFull`` raised when
+    ``max_waiting`` jobs are already waiting. A unique index on the live
+    jobs' ``input_key`` settles simultaneous requests from several API
+    processes.
+    """
+    key = input_key(kind, payload, await data_versions(db))
+    job_id = await db.scalar(
+        update(Job)
+        .where(Job.input_key == key, text(LIVE_INPUT_WHERE))
+        .values(requests=Job.requests + 1, revision=Job.revision + 1)
+        .returning(Job.job_id)
+        .execution_options(synchronize_session=False)
+    )
+    if job_id is None:
+        waiting = await _waiting(db)
+        if waiting >= max_waiting:
+            await db.rollback()
+            raise QueueFull(waiting)
+        stmt = sqlite_insert(Job).values(kind=kind, payload=payload, input_key=key)
+        job_id = await db.scalar(
+            stmt.on_conflict_do_update(
+                index_elements=[Job.input_key],
+                index_where=text(LIVE_INPUT_WHERE),
+                set_={"requests": Job.requests + 1, "revision": Job.revision + 1},
+            ).returning(Job.job_id)
+        )
+    await db.commit()
+    job = await db.get(Job, job_id, populate_existing=True)
+    return job, await queue_position(db, job) or 0
+
+
+async def queue_position(db: AsyncSession, job: Job) -> int | None:
+    """1-based place of a waiting solver job in line; None once it is claimed."""
+    if job.status != JobStatus.PENDING or job.kind not in SOLVER_KINDS:
+        return None
+    return await _waiting(db, up_to=job.job_id)
+
+
+async def _waiting(db: AsyncSession, up_to: int | None = None) -> int:
+    query = select(func.count()).where(
+        Job.status == JobStatus.PENDING, Job.kind.in_(SOLVER_KINDS)
+    )
+    if up_to is not None:
+        query = query.where(Job.job_id <= up_to)
+    return (await db.execute(query)).scalar_one()
+
+
+async def _moved_up_behind(db: AsyncSession, job_id: int) -> None:
+    """Bump the waiting solver jobs behind ``job_id``: their queue position changed."""
+    await db.execute(
+        update(Job)
+        .where(
+            Job.status == JobStatus.PENDING,
+            Job.kind.in_(SOLVER_KINDS),
+            Job.job_id > job_id,
+        )
+        .values(revision=Job.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def cancel(db: AsyncSession, job_id: int) -> int | None:
+    """Withdraw one request from a waiting or running job.
+
+    Returns how many requests still share the job; at 0 it is CANCELLED.
+    None if the job has already finished.
+    """
+    live = (Job.job_id == job_id, Job.status.not_in(FINISHED))
+    remaining = await db.scalar(
+        update(Job)
+        .where(*live, Job.requests > 1)
+        .values(requests=Job.requests - 1, revision=Job.revision + 1)
+        .returning(Job.requests)
+        .execution_options(synchronize_session=False)
+    )
+    if remaining is None:
+        was = await db.scalar(select(Job.status).where(Job.job_id == job_id))
+        cancelled = await db.execute(
+            update(Job)
+            .where(*live)
+            .values(
+                status=JobStatus.CANCELLED, lease_expires_at=None, revision=Job.revision + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        remaining = 0 if cancelled.rowcount else None
+        if cancelled.rowcount and was == JobStatus.PENDING:
+            await _moved_up_behind(db, job_id)
+    await db.commit()
+    return remaining
+
+
+async def request_stop(db: AsyncSession, job_id: int) -> bool:
+    """Ask the worker running a solver job to finish now; False if it is not running.
+
+    New requests no longer join the job: its result is not the full solve.
+    """
+    stopping = await db.execute(
+        update(Job)
+        .where(
+            Job.job_id == job_id,
+            Job.status == JobStatus.PROCESSING,
+            Job.kind.in_(SOLVER_KINDS),
+        )
+        .values(stop_requested=True, input_key=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return stopping.rowcount > 0
+
+
+# ── Worker side ──
+
+
+async def claim(
+    db: AsyncSession, worker_id: str, lease_seconds: float = LEASE_SECONDS
+) -> Claim | None:
+    """Lease the oldest waiting solver job to ``worker_id``; None if there is none."""
+    oldest = (
+        select(Job.job_id)
+        .where(Job.status == JobStatus.PENDING, Job.kind.in_(SOLVER_KINDS))
+        .order_by(Job.job_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    row = (
+        await db.execute(
+            update(Job)
+            .where(Job.job_id == oldest, Job.status == JobStatus.PENDING)
+            .values(
+                status=JobStatus.PROCESSING,
+                worker_id=worker_id,
+                lease_expires_at=lease_deadline(lease_seconds),
+                attempts=Job.attempts + 1,
+                stop_requested=False,
+                revision=Job.revision + 1,
+            )
+            .returning(Job.job_id, Job.kind, Job.payload, Job.attempts)
+            .execution_options(synchronize_session=False)
+        )
+    ).one_or_none()
+    if row is not None:
+        await _moved_up_behind(db, row.job_id)
+    await db.commit()
+    if row is None:
+        return None
+    return Claim(row.job_id, row.kind, row.payload, row.attempts, worker_id)
+
+
+async def heartbeat(
+    db: AsyncSession, claim: Claim, lease_seconds: float = LEASE_SECONDS
+) -> bool | None:
+    """Renew the lease on a running job.
+
+    Returns whether a stop was requested, or None if the worker no longer
+    holds the job (cancelled, or recovered after the lease ran out).
+    """
+    stop_requested = (
+        await db.execute(
+            update(Job)
+            .where(*_owned(claim))
+            .values(lease_expires_at=lease_deadline(lease_seconds))
+            .returning(Job.stop_requested)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+    await db.commit()
+    return stop_requested
+
+
+async def save_progress(db: AsyncSession, claim: Claim, result: dict) -> bool:
+    """Store an intermediate result while the worker holds the job."""
+    return await _update_owned(db, claim, result_json=result)
+
+
+async def finish(db: AsyncSession, claim: Claim, status: JobStatus, **values) -> bool:
+    """End a job the worker holds with ``status`` (and column ``values``).
+
+    False if the lease was lost: the result is not stored.
+    """
+    return await _update_owned(db, claim, status=status, lease_expires_at=None, **values)
+
+
+async def fail(db: AsyncSession, claim: Claim, error: str) -> bool:
+    """End a job FAILED, adding ``error`` to the incumbent it may have stored."""
+    result = await db.scalar(select(Job.result_json).where(Job.job_id == claim.job_id))
+    return await finish(db, claim, JobStatus.FAILED, result_json={**(result or {}), "error": error})
+
+
+async def _update_owned(db: AsyncSession, claim: Claim, **values) -> bool:
+    updated = await db.execute(
+        update(Job)
+        .where(*_owned(claim))
+        .values(revision=Job.revision + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return updated.rowcount > 0
+
+
+async def release(db: AsyncSession, worker_id: str) -> int:
+    """Put the solver jobs of a worker that is shutting down back in the queue.
+
+    The interrupted run does not count as an attempt. Returns the number
+    of jobs released.
+    """
+    released = await db.execute(
+        update(Job)
+        .where(
+            Job.worker_id == worker_id,
+            Job.status == JobStatus.PROCESSING,
+            Job.kind.in_(SOLVER_KINDS),
+        )
+        .values(
+            status=JobStatus.PENDING,
+            worker_id=None,
+            lease_expires_at=None,
+            attempts=Job.attempts - 1,
+            stop_requested=False,
+            revision=Job.revision + 1,
+        )
+        .returning(Job.job_id)
+        .execution_options(synchronize_session=False)
+    )
+    released = released.scalars().all()
+    if released:
+        await _moved_up_behind(db, min(released))
+    await db.commit()
+    return len(released)
+
+
+async def recover_expired(db: AsyncSession, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Requeue or fail the jobs whose worker stopped renewing its lease.
+
+    Jobs left PROCESSING without a lease, by versions before leases, count
+    as expired. Returns the number of jobs recovered.
+    """
+    expired = or_(
+        Job.lease_expires_at < datetime.now(timezone.utc), Job.lease_expires_at.is_(None)
+    )
+    rows = (
+        await db.execute(
+            select(Job.job_id, Job.kind, Job.status, Job.attempts, Job.lease_expires_at).where(
+                expired,
+                or_(
+                    Job.status == JobStatus.PROCESSING,
+                    (Job.status == JobStatus.PENDING) & (Job.kind == JobKind.INGEST),
+                ),
+            )
+        )
+    ).all()
+
+    recovered = 0
+    requeued: list[int] = []
+    for row in rows:
+        if row.kind == JobKind.INGEST:
+            values = {"status": JobStatus.FAILED}
+            error = "Ingest interrupted: the API process handling the upload stopped"
+        elif row.attempts < max_attempts:
+            values = {"status": JobStatus.PENDING, "worker_id": None, "stop_requested": False}
+            error = None
+        else:
+            values = {"status": JobStatus.FAILED}
+            error = f"Worker lost: the job was interrupted {row.attempts} times"
+        if error is not None:
+            current = await db.scalar(select(Job.result_json).where(Job.job_id == row.job_id))
+            values["result_json"] = {**(current or {}), "error": error}
+
+        # Only if no heartbeat renewed the lease since it was read
+        lease = (
+            Job.lease_expires_at.is_(None)
+            if row.lease_expires_at is None
+            else Job.lease_expires_at == row.lease_expires_at
+        )
+        updated = await db.execute(
+            update(Job)
+            .where(Job.job_id == row.job_id, Job.status == row.status, lease)
+            .values(lease_expires_at=None, revision=Job.revision + 1, **values)
+            .execution_options(synchronize_session=False)
+        )
+        recovered += updated.rowcount
+        if updated.rowcount and values["status"] == JobStatus.PENDING:
+            requeued.append(row.job_id)
+    if requeued:
+        await _moved_up_behind(db, min(requeued))
+    await db.commit()
+    return recovered
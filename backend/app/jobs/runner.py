@@ -0,0 +1,258 @@
+"""What a worker does with a claimed solver job.
+
+The job's request comes from its ``payload``; the demand and inventory are
+read fresh from the database when the job starts. Each body returns once
+the outcome is stored. An exception propagates to the worker, which ends
+the job FAILED. A job whose lease was lost meanwhile (cancelled, or taken
+back after a missed heartbeat) stores nothing.
+
+``cached_job`` is the API's side: an optimize request whose result is
+already cached is answered without queueing.
+"""
+
+import asyncio
+import dataclasses
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.inventory import Inventory
+from app.models.job import Job, JobKind, JobStatus
+from app.schemas.job import OptimizeOptions
+from app.schemas.scenario import ScenarioBatchRequest
+from app.solver import cache as solver_cache
+from app.solver.decompose import SolveLimits
+from app.solver.demand import SchoolDemandProfile, aggregate_demand
+from app.solver.engines import SolverEngine, get_engine
+from app.solver.optimizer import SAFETY_FACTOR, SHORTAGE_SCHOOLS, SolverResult, solve
+from app.solver.scenarios import Scenario, solve_scenarios
+
+from .hub import job_changed
+from .pool import SolverPool
+from .queue import Claim, finish, save_progress
+
+
+async def load_inventory(db: AsyncSession) -> dict[str, int]:
+    rows = (await db.execute(select(Inventory))).scalars().all()
+    return {r.sku_id: r.total_stock_available for r in rows}
+
+
+async def latest_completed_job(db: AsyncSession) -> Job | None:
+    return (
+        await db.execute(
+            select(Job)
+            .where(Job.kind == JobKind.OPTIMIZE, Job.status == JobStatus.COMPLETED)
+            .order_by(Job.created_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+
+async def solve_baseline(db: AsyncSession, cache_key: str) -> Job | None:
+    """Latest OPTIMIZE job that solved the same inputs in full and cold.
+
+    ``cache_key`` covers the demand, the inventory, the engine, the limits
+    and the options, so the baseline solved the same problem. Cache hits and
+    runs stopped by hand took no real solve time, and a run that was itself
+    warm-started would measure one hint against another, so they are no
+    baseline.
+    """
+    warm = func.json_extract(Job.result_json, "$.warm_start.used")
+    return (
+        await db.execute(
+            select(Job)
+            .where(
+                Job.kind == JobKind.OPTIMIZE,
+                Job.status == JobStatus.COMPLETED,
+                Job.cache_key == cache_key,
+                Job.cache_hit.is_(False),
+                Job.stop_requested.is_(False),
+                func.coalesce(warm, 0) == 0,
+            )
+            .order_by(Job.created_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+
+@dataclasses.dataclass
+class OptimizeInputs:
+    """What an optimize request solves, as the database holds it now."""
+
+    profiles: dict[str, SchoolDemandProfile]
+    inventory: dict[str, int]
+    engine: SolverEngine
+    limits: SolveLimits
+    shortage_schools: int
+    cache_key: str
+
+
+async def optimize_inputs(db: AsyncSession, options: OptimizeOptions) -> OptimizeInputs:
+    profiles = await aggregate_demand(db)
+    inv = await load_inventory(db)
+    engine = get_engine(options.engine, options.num_workers)
+    shortage_schools = (
+        SHORTAGE_SCHOOLS if options.shortage_schools is None else options.shortage_schools
+    )
+    limits = SolveLimits(
+        time_limit_seconds=options.time_limit_seconds,
+        gap_limit=options.gap_limit,
+    )
+    key = await asyncio.to_thread(
+        solver_cache.cache_key,
+        profiles,
+        inv,
+        SAFETY_FACTOR,
+        engine,
+        limits,
+        shortage_schools=shortage_schools,
+        sensitivity=options.sensitivity,
+    )
+    return OptimizeInputs(profiles, inv, engine, limits, shortage_schools, key)
+
+
+async def cached_job(db: AsyncSession, options: OptimizeOptions) -> Job | None:
+    """A COMPLETED job holding the cached result of ``options``; None on a miss.
+
+    Called by the API before queueing, so that a cache hit takes neither a
+    place in the queue nor a solver slot.
+    """
+    if not options.use_cache:
+        return None
+    inputs = await optimize_inputs(db, options)
+    cached = await solver_cache.lookup(db, inputs.cache_key)
+    if cached is None:
+        return None
+    job = Job(
+        kind=JobKind.OPTIMIZE,
+        status=JobStatus.COMPLETED,
+        payload=options.model_dump(),
+        result_json=cached,
+        cache_key=inputs.cache_key,
+        cache_hit=True,
+    )
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def run_job(claim: Claim, slot: int, pool: SolverPool, sessions: sessionmaker) -> None:
+    """Run a claimed job in ``slot`` of ``pool``; ``sessions`` opens database sessions."""
+    if claim.kind == JobKind.SCENARIOS:
+        await _run_scenarios(claim, slot, pool, sessions)
+    else:
+        await _run_optimize(claim, slot, pool, sessions)
+
+
+async def _run_optimize(claim: Claim, slot: int, pool: SolverPool, sessions: sessionmaker) -> None:
+    """Run the ILP solver and store the result.
+
+    Requests with a cached result are normally answered by the API
+    (``cached_job``); one queued before an identical job finished is still
+    answered from the cache here. Otherwise every improved incumbent is
+    written to the job row while it is PROCESSING.
+    """
+    options = OptimizeOptions.model_validate(claim.payload or {})
+    async with sessions() as db:
+        inputs = await optimize_inputs(db, options)
+        key = inputs.cache_key
+
+        # Unchanged inputs → return the stored result without solving
+        cached = await solver_cache.lookup(db, key) if options.use_cache else None
+        if cached is not None:
+            await finish(
+                db, claim, JobStatus.COMPLETED, result_json=cached, cache_key=key, cache_hit=True
+            )
+            return
+
+        # Warm start from the latest completed job, if any
+        previous = await latest_completed_job(db)
+        warm_start = (
+            previous.result_json["selection"]["selected_school_ids"]
+            if previous and previous.result_json and "selection" in previous.result_json
+            else None
+        )
+        baseline = await solve_baseline(db, key) if warm_start else None
+
+    async def on_incumbent(partial: SolverResult) -> None:
+        async with sessions() as db:
+            await save_progress(db, claim, dataclasses.asdict(partial))
+        job_changed()
+
+    result = await pool.run(
+        claim.job_id,
+        slot,
+        solve,
+        inputs.profiles,
+        inputs.inventory,
+        on_incumbent=on_incumbent,
+        warm_start=warm_start,
+        limits=inputs.limits,
+        engine=inputs.engine,
+        shortage_schools=inputs.shortage_schools,
+        sensitivity=options.sensitivity,
+    )
+    if pool.cancelled(claim.job_id):
+        return
+
+    if result.warm_start is not None:
+        result.warm_start.source_job_id = previous.job_id
+        if baseline is not None:
+            prev_seconds = baseline.result_json.get("solve_seconds")
+            result.warm_start.baseline_job_id = baseline.job_id
+            result.warm_start.previous_solve_seconds = prev_seconds
+            if prev_seconds and result.solve_seconds > 0:
+                result.warm_start.speedup = round(prev_seconds / result.solve_seconds, 2)
+
+    result_json = dataclasses.asdict(result)
+    async with sessions() as db:
+        stored = await finish(
+            db, claim, JobStatus.COMPLETED, result_json=result_json, cache_key=key, cache_hit=False
+        )
+        # A run stopped by hand is not what the same inputs would produce
+        if stored and not pool.stopped(claim.job_id) and cacheable(result, inputs.limits):
+            await solver_cache.store(db, key, result_json, claim.job_id)
+
+
+def cacheable(result: SolverResult, limits: SolveLimits) -> bool:
+    """Whether the solve finished by itself: optimal, or within the gap limit.
+
+    A result cut short by the time limit depends on how far the search got,
+    and the next run of the same request may do better.
+    """
+    if result.status == "OPTIMAL":
+        return True
+    return (
+        result.status == "FEASIBLE"
+        and limits.gap_limit is not None
+        and result.progress.gap <= limits.gap_limit
+    )
+
+
+async def _run_scenarios(claim: Claim, slot: int, pool: SolverPool, sessions: sessionmaker) -> None:
+    """Solve a batch of what-if scenarios over one demand snapshot."""
+    request = ScenarioBatchRequest.model_validate(claim.payload or {})
+    async with sessions() as db:
+        profiles = await aggregate_demand(db)
+        inv = await load_inventory(db)
+
+    batch = await pool.run(
+        claim.job_id,
+        slot,
+        solve_scenarios,
+        profiles,
+        inv,
+        [Scenario(**item.model_dump()) for item in request.scenarios],
+        limits=SolveLimits(
+            time_limit_seconds=request.time_limit_seconds,
+            gap_limit=request.gap_limit,
+        ),
+        engine=get_engine(request.engine),
+    )
+    # Scenario batches cannot stop early; a cancelled one is discarded
+    if pool.cancelled(claim.job_id):
+        return
+
+    async with sessions() as db:
+        await finish(db, claim, JobStatus.COMPLETED, result_json=dataclasses.asdict(batch))
@@ -0,0 +1,160 @@
+"""Worker loop: claims solver jobs from the queue and runs them.
+
+A ``Worker`` keeps one claim loop per slot of its ``SolverPool``, so it
+never holds more jobs than it can run. Idle loops poll the queue every
+``POLL_SECONDS``; jobs queued by the same process wake them at once
+(``wake_workers``). While a job runs, its lease is renewed every
+``HEARTBEAT_SECONDS``, and the heartbeat also carries cancel and stop
+requests to the pool. One more loop recovers the jobs of dead workers.
+
+When ``run`` is cancelled (shutdown), the jobs still running go back to
+the queue for another worker.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import suppress
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import async_session
+
+from .hub import job_changed
+from .pool import SolverPool
+from .queue import (
+    HEARTBEAT_SECONDS,
+    LEASE_SECONDS,
+    Claim,
+    claim,
+    fail,
+    heartbeat,
+    new_worker_id,
+    recover_expired,
+    release,
+)
+from .runner import run_job
+
+POLL_SECONDS = float(os.environ.get("EQUIPROUTE_WORKER_POLL_SECONDS", "1"))
+# Whether the API process runs a worker too; off when dedicated workers do
+EMBEDDED_WORKER = os.environ.get("EQUIPROUTE_EMBEDDED_WORKER", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+_local_workers: set["Worker"] = set()
+
+
+def wake_workers() -> None:
+    """Tell the workers of this process that a job was queued; others poll."""
+    for worker in _local_workers:
+        worker.wake()
+
+
+class Worker:
+    """Claims jobs for ``pool`` until cancelled.
+
+    ``sessions`` opens database sessions; the queue and the jobs' data are
+    read and written through it.
+    """
+
+    def __init__(
+        self,
+        pool: SolverPool | None = None,
+        sessions: sessionmaker = async_session,
+        worker_id: str | None = None,
+        poll_seconds: float = POLL_SECONDS,
+        lease_seconds: float = LEASE_SECONDS,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    ):
+        self.pool = pool or SolverPool()
+        self.sessions = sessions
+        self.worker_id = worker_id or new_worker_id()
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._wakeup: asyncio.Event | None = None
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """Claim and run jobs until cancelled, then release the running ones."""
+        self._wakeup = asyncio.Event()
+        _local_workers.add(self)
+        tasks = [asyncio.ensure_future(self._claim_loop()) for _ in range(self.pool.workers)]
+        tasks.append(asyncio.ensure_future(self._recover_loop()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            _local_workers.discard(self)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            async with self.sessions() as db:
+                if released := await release(db, self.worker_id):
+                    job_changed()
+                    logger.info("%s: released %d running job(s)", self.worker_id, released)
+
+    async def _claim_loop(self) -> None:
+        while True:
+            try:
+                async with self.sessions() as db:
+                    job = await claim(db, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("%s: claiming a job failed", self.worker_id)
+                job = None
+            if job is None:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            job_changed()
+            await self._process(job)
+
+    async def _process(self, job: Claim) -> None:
+        logger.info(
+            "%s: job %d (%s), attempt %d",
+            self.worker_id, job.job_id, job.kind.value, job.attempts,
+        )
+        async with self.pool.slot(job.job_id) as slot:
+            beating = asyncio.ensure_future(self._heartbeat(job))
+            try:
+                await run_job(job, slot, self.pool, self.sessions)
+            except Exception as exc:
+                logger.exception("%s: job %d failed", self.worker_id, job.job_id)
+                if not self.pool.cancelled(job.job_id):
+                    async with self.sessions() as db:
+                        await fail(db, job, f"{type(exc).__name__}: {exc}")
+            finally:
+                beating.cancel()
+                job_changed()
+
+    async def _heartbeat(self, job: Claim) -> None:
+        """Renew the lease; pass on cancel (lease lost) and stop requests."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                async with self.sessions() as db:
+                    stop_requested = await heartbeat(db, job, self.lease_seconds)
+            except Exception:
+                # e.g. the database is busy; the lease outlasts a few misses
+                logger.exception("%s: heartbeat for job %d failed", self.worker_id, job.job_id)
+                continue
+            if stop_requested is None:
+                self.pool.cancel(job.job_id)
+                return
+            if stop_requested:
+                self.pool.stop(job.job_id)
+
+    async def _recover_loop(self) -> None:
+        while True:
+            try:
+                async with self.sessions() as db:
+                    if recovered := await recover_expired(db):
+                        job_changed()
+                        logger.info("%s: recovered %d expired job(s)", self.worker_id, recovered)
+                        self.wake()
+            except Exception:
+                logger.exception("%s: recovering expired jobs failed", self.worker_id)
+            await asyncio.sleep(self.lease_seconds / 3)
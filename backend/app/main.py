@@ -1,16 +1,27 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.models import init_db
+from app.jobs import EMBEDDED_WORKER, Worker, solver_pool
+from app.models import async_session, init_db
+from app.solver.demand import ensure_demand
 from app.routes import inventory_router, students_router, schools_router, optimize_router, upload_router, picking_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    async with async_session() as db:
+        await ensure_demand(db)
+    worker = asyncio.ensure_future(Worker(solver_pool).run()) if EMBEDDED_WORKER else None
     yield
+    if worker is not None:
+        worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await worker
+    solver_pool.shutdown()
 
 
 app = FastAPI(title="EquipRoute", version="0.1.0", lifespan=lifespan)
@@ -1,7 +1,11 @@
 from .base import Base, engine, async_session, init_db
 from .inventory import Inventory
+from .sku import Sku
 from .student import Student
-from .job import Job, JobStatus
+from .demand import SchoolSkuDemand, SchoolStudentCount
+from .job import Job, JobKind, JobStatus
+from .solver_cache import SolverCacheEntry
+from .data_version import DataVersion
 
 __all__ = [
     "Base",
@@ -9,7 +13,13 @@ __all__ = [
     "async_session",
     "init_db",
     "Inventory",
+    "Sku",
     "Student",
+    "SchoolSkuDemand",
+    "SchoolStudentCount",
     "Job",
+    "JobKind",
     "JobStatus",
+    "SolverCacheEntry",
+    "DataVersion",
 ]
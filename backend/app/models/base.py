@@ -3,10 +3,14 @@ from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
+from . import migrations
+
 _DB_PATH = Path(__file__).resolve().parent.parent.parent / "equiproute.db"
 DATABASE_URL = f"sqlite+aiosqlite:///{_DB_PATH}"
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# The API and any number of worker processes (python -m app.worker) share
+# the file: wait for each other's write locks rather than fail at once
+engine = create_async_engine(DATABASE_URL, echo=False, connect_args={"timeout": 30})
 
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -17,7 +21,11 @@ class Base(DeclarativeBase):
 
 async def init_db() -> None:
     async with engine.begin() as conn:
+        # Readers do not block the writer, nor the writer the readers
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.run_sync(migrations.before_create)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrations.after_create)
 
 
 async def get_db():
@@ -0,0 +1,23 @@
+from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SchoolSkuDemand(Base):
+    """Units of one SKU needed by one school, kept in step with ``students``."""
+
+    __tablename__ = "school_sku_demand"
+
+    school_id: Mapped[str] = mapped_column(String, primary_key=True)
+    sku_key: Mapped[int] = mapped_column(Integer, ForeignKey("skus.sku_key"), primary_key=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class SchoolStudentCount(Base):
+    """Number of students per school, kept in step with ``students``."""
+
+    __tablename__ = "school_student_counts"
+
+    school_id: Mapped[str] = mapped_column(String, primary_key=True)
+    total_students: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -10,3 +10,6 @@ class Inventory(Base):
     sku_id: Mapped[str] = mapped_column(String, primary_key=True)
     description: Mapped[str] = mapped_column(String, nullable=False)
     total_stock_available: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Hash of the uploaded values (app.ingest.upsert.row_hash); NULL until
+    # the row is first written by an upload
+    row_hash: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime, timezone
 
-from sqlalchemy import String, Enum, JSON, DateTime, Integer
+from sqlalchemy import String, Enum, JSON, DateTime, Integer, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -11,18 +11,57 @@ class JobStatus(str, enum.Enum):
     PENDING = "PENDING"
     PROCESSING = "PROCESSING"
     COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class JobKind(str, enum.Enum):
+    OPTIMIZE = "OPTIMIZE"
+    SCENARIOS = "SCENARIOS"
+    INGEST = "INGEST"
+
+
+# At most one waiting or running job per input; see app.jobs.queue.enqueue
+LIVE_INPUT_WHERE = "status IN ('PENDING', 'PROCESSING')"
 
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index(
+            "ix_jobs_live_input_key",
+            "input_key",
+            unique=True,
+            sqlite_where=text(LIVE_INPUT_WHERE),
+        ),
+    )
 
     job_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[JobKind] = mapped_column(
+        Enum(JobKind), nullable=False, default=JobKind.OPTIMIZE
+    )
     status: Mapped[JobStatus] = mapped_column(
         Enum(JobStatus), nullable=False, default=JobStatus.PENDING
     )
     result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    cache_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    cache_hit: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
         default=lambda: datetime.now(timezone.utc),
     )
+    # Request of a solver job, so that any worker process can run it
+    payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Lease of the worker running the job, renewed by its heartbeats
+    worker_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stop_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Data versions and request of a solver job; identical requests share the job
+    input_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    requests: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # Bumped by every change clients can see; app.jobs.hub watches it
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
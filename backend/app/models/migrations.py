@@ -0,0 +1,82 @@
+"""In-place upgrades for databases created by earlier versions.
+
+There is no migration framework: ``init_db`` runs ``before_create`` and
+``after_create`` around ``create_all``, and each step checks for the old
+layout itself, so both are no-ops on an up-to-date database.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def before_create(conn: Connection) -> None:
+    """Move tables whose layout changed out of the way of create_all."""
+    # students with SKU strings → integer keys into the SKU catalog
+    if _columns(conn, "students") & {"shirt_sku", "pants_sku", "shoe_size_sku"}:
+        conn.execute(text("DROP INDEX IF EXISTS ix_students_school_id"))
+        conn.execute(text("ALTER TABLE students RENAME TO legacy_students"))
+        # Keyed on SKU strings too; rebuilt from students on startup
+        conn.execute(text("DROP TABLE IF EXISTS school_sku_demand"))
+        conn.execute(text("DROP TABLE IF EXISTS school_student_counts"))
+
+
+def after_create(conn: Connection) -> None:
+    """Copy data from moved tables into their new layout and add new columns."""
+    # Columns added to jobs after it was first created; old rows are all solver runs
+    columns = _columns(conn, "jobs")
+    for name, ddl in (
+        ("kind", "VARCHAR(9) NOT NULL DEFAULT 'OPTIMIZE'"),
+        ("cache_key", "VARCHAR(64)"),
+        ("cache_hit", "BOOLEAN"),
+        ("payload", "JSON"),
+        ("worker_id", "VARCHAR(64)"),
+        ("lease_expires_at", "DATETIME"),
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("stop_requested", "BOOLEAN NOT NULL DEFAULT 0"),
+        ("input_key", "VARCHAR(64)"),
+        ("requests", "INTEGER NOT NULL DEFAULT 1"),
+        ("revision", "INTEGER NOT NULL DEFAULT 0"),
+    ):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {name} {ddl}"))
+    # Job's partial index; create_all only creates indexes along with their table
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_jobs_live_input_key ON jobs (input_key) "
+            "WHERE status IN ('PENDING', 'PROCESSING')"
+        )
+    )
+
+    # Content hashes for change detection; NULL until a row is next uploaded
+    for table in ("students", "inventory"):
+        if "row_hash" not in _columns(conn, table):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN row_hash INTEGER"))
+
+    if inspect(conn).has_table("legacy_students"):
+        conn.execute(
+            text(
+                "INSERT OR IGNORE INTO skus (sku_id) "
+                "SELECT shirt_sku FROM legacy_students "
+                "UNION SELECT pants_sku FROM legacy_students "
+                "UNION SELECT shoe_size_sku FROM legacy_students"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO students "
+                "(student_id, school_id, shirt_sku_key, pants_sku_key, shoe_sku_key) "
+                "SELECT s.student_id, s.school_id, a.sku_key, b.sku_key, c.sku_key "
+                "FROM legacy_students s "
+                "JOIN skus a ON a.sku_id = s.shirt_sku "
+                "JOIN skus b ON b.sku_id = s.pants_sku "
+                "JOIN skus c ON c.sku_id = s.shoe_size_sku"
+            )
+        )
+        conn.execute(text("DROP TABLE legacy_students"))
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return set()
+    return {column["name"] for column in inspector.get_columns(table)}
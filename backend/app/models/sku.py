@@ -0,0 +1,13 @@
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Sku(Base):
+    """SKU catalog: compact integer key for each SKU string."""
+
+    __tablename__ = "skus"
+
+    sku_key: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    sku_id: Mapped[str] = mapped_column(String, nullable=False, unique=True)
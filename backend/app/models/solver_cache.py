@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import String, JSON, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SolverCacheEntry(Base):
+    __tablename__ = "solver_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    result_json: Mapped[dict] = mapped_column(JSON, nullable=False)
+    source_job_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import String, Integer, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -9,6 +9,10 @@ class Student(Base):
 
     student_id: Mapped[str] = mapped_column(String, primary_key=True)
     school_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
-    shirt_sku: Mapped[str] = mapped_column(String, nullable=False)
-    pants_sku: Mapped[str] = mapped_column(String, nullable=False)
-    shoe_size_sku: Mapped[str] = mapped_column(String, nullable=False)
+    # Integer keys into the SKU catalog (skus.sku_key)
+    shirt_sku_key: Mapped[int] = mapped_column(Integer, ForeignKey("skus.sku_key"), nullable=False)
+    pants_sku_key: Mapped[int] = mapped_column(Integer, ForeignKey("skus.sku_key"), nullable=False)
+    shoe_sku_key: Mapped[int] = mapped_column(Integer, ForeignKey("skus.sku_key"), nullable=False)
+    # Hash of the uploaded values (app.ingest.upsert.row_hash); NULL until
+    # the row is first written by an upload
+    row_hash: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -2,9 +2,15 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.ingest import (
+    INVENTORY_FIELDS,
+    delete_missing_inventory,
+    to_columns,
+    upsert_inventory as bulk_upsert_inventory,
+)
 from app.models.base import get_db
 from app.models.inventory import Inventory
-from app.models.job import Job, JobStatus
+from app.models.job import Job, JobKind, JobStatus
 from app.schemas.inventory import InventoryItem, InventoryListItem
 
 router = APIRouter(tags=["inventory"])
@@ -13,24 +19,27 @@ router = APIRouter(tags=["inventory"])
 @router.post("/inventory", status_code=201)
 async def upsert_inventory(
     items: list[InventoryItem],
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
-    """Upload/upsert inventory data."""
-    for item in items:
-        existing = await db.get(Inventory, item.sku_id)
-        if existing:
-            existing.description = item.description
-            existing.total_stock_available = item.total_stock_available
-        else:
-            db.add(
-                Inventory(
-                    sku_id=item.sku_id,
-                    description=item.description,
-                    total_stock_available=item.total_stock_available,
-                )
-            )
+    """Upload/upsert inventory data.
+
+    With ``?snapshot=true`` the list is the full inventory and SKUs not in
+    it are deleted.
+    """
+    columns = to_columns((item.model_dump() for item in items), INVENTORY_FIELDS)
+    seen: set[str] | None = set() if snapshot else None
+    result = await bulk_upsert_inventory(db, columns, seen=seen)
+    if seen is not None:
+        result.deleted = await delete_missing_inventory(db, seen)
     await db.commit()
-    return {"upserted": len(items)}
+    return {
+        "upserted": result.upserted,
+        "inserted": result.inserted,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "deleted": result.deleted,
+    }
 
 
 @router.get("/inventory", response_model=list[InventoryListItem])
@@ -43,7 +52,7 @@ async def list_inventory(db: AsyncSession = Depends(get_db)):
     latest_job = (
         await db.execute(
             select(Job)
-            .where(Job.status == JobStatus.COMPLETED)
+            .where(Job.kind == JobKind.OPTIMIZE, Job.status == JobStatus.COMPLETED)
             .order_by(Job.created_at.desc())
             .limit(1)
         )
@@ -1,65 +1,214 @@
+import asyncio
 import dataclasses
+import json
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import get_db, async_session
-from app.models.inventory import Inventory
-from app.models.job import Job, JobStatus
-from app.schemas.job import JobCreated, JobStatus as JobStatusSchema
+from app.jobs import (
+    FINISHED,
+    JobEvent,
+    QueueFull,
+    cached_job,
+    cancel,
+    enqueue,
+    job_changed,
+    job_hub,
+    job_status,
+    load_inventory,
+    request_stop,
+    wake_workers,
+)
+from app.models.base import get_db
+from app.models.job import Job, JobKind
+from app.schemas.job import (
+    JobCreated,
+    JobStatus as JobStatusSchema,
+    OptimizeOptions,
+    PreviewRequest,
+)
+from app.schemas.scenario import ScenarioBatchRequest
 from app.solver.demand import aggregate_demand
-from app.solver.optimizer import solve
+from app.solver.optimizer import SHORTAGE_SCHOOLS, preview
 
 router = APIRouter(tags=["optimize"])
 
+# Longest a long-poll is held; clients poll again with the revision they got
+MAX_WAIT_SECONDS = 60.0
 
-async def _run_solver(job_id: int) -> None:
-    """Background task: run the ILP solver and persist the result."""
-    async with async_session() as db:
-        job = await db.get(Job, job_id)
-        if job is None:
-            return
 
-        job.status = JobStatus.PROCESSING
-        await db.commit()
+async def _enqueue(db: AsyncSession, kind: JobKind, payload: dict) -> JobCreated:
+    """Queue a solver job for the workers, or join an identical live one; 429 when full."""
+    try:
+        job, position = await enqueue(db, kind, payload)
+    except QueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    wake_workers()
+    job_changed()
+    return JobCreated(job_id=job.job_id, queue_position=position, coalesced=job.requests > 1)
 
-        profiles = await aggregate_demand(db)
-        rows = (await db.execute(select(Inventory))).scalars().all()
-        inv = {r.sku_id: r.total_stock_available for r in rows}
 
-        result = solve(profiles, inv)
+@router.post("/optimize", response_model=JobCreated, status_code=202)
+async def trigger_optimize(
+    options: OptimizeOptions | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Queue a solver run. Returns the job_id immediately.
 
-        job.status = JobStatus.COMPLETED
-        job.result_json = dataclasses.asdict(result)
-        await db.commit()
+    Unchanged inputs with a cached result are answered at once: the job is
+    created COMPLETED (``cache_hit``) without queueing. Otherwise the job
+    waits in the job queue (``queue_position``) until a worker claims it.
+    When the queue is full the request is refused with 429. While a job
+    for the same options and unchanged students and inventory is waiting
+    or running, the request joins that job instead (``coalesced``), so
+    simultaneous taps on "Optimize" cost one solve.
+    """
+    options = options or OptimizeOptions()
+    job = await cached_job(db, options)
+    if job is not None:
+        return JobCreated(job_id=job.job_id, cache_hit=True)
+    return await _enqueue(db, JobKind.OPTIMIZE, options.model_dump())
 
 
-@router.post("/optimize", response_model=JobCreated, status_code=202)
-async def trigger_optimize(
-    background_tasks: BackgroundTasks,
+@router.post("/optimize/scenarios", response_model=JobCreated, status_code=202)
+async def trigger_scenarios(
+    request: ScenarioBatchRequest,
     db: AsyncSession = Depends(get_db),
 ):
-    """Trigger the solver as a background task. Returns the job_id immediately."""
-    job = Job()
-    db.add(job)
-    await db.commit()
-    await db.refresh(job)
+    """Solve several what-if scenarios as one queued job.
 
-    background_tasks.add_task(_run_solver, job.job_id)
-    return JobCreated(job_id=job.job_id)
+    The job result holds a ``comparison`` table (one row per scenario) and
+    each scenario's full solver result under ``scenarios``.
+    """
+    return await _enqueue(db, JobKind.SCENARIOS, request.model_dump())
+
+
+@router.post("/optimize/preview")
+async def preview_optimize(
+    request: PreviewRequest | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Sub-second heuristic answer (greedy + LP bound), returned synchronously.
+
+    ``inventory`` in the body overrides stock per SKU without saving it, so
+    the app can preview edits before committing them. The heuristic runs
+    in a thread, off the event loop.
+    """
+    profiles = await aggregate_demand(db)
+    inv = await load_inventory(db)
+    shortage_schools = SHORTAGE_SCHOOLS
+    if request is not None:
+        inv.update(request.inventory)
+        if request.shortage_schools is not None:
+            shortage_schools = request.shortage_schools
+
+    result = await asyncio.to_thread(preview, profiles, inv, shortage_schools)
+    return dataclasses.asdict(result)
 
 
 @router.get("/jobs/{job_id}", response_model=JobStatusSchema)
-async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
-    """Return job status and results when completed."""
-    job = await db.get(Job, job_id)
-    if job is None:
+async def get_job(
+    job_id: int,
+    wait: float = Query(default=0, ge=0, le=MAX_WAIT_SECONDS),
+    since: int | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Return job status and results.
+
+    ``cache_hit`` tells whether the result came from the solver cache, and
+    ``queue_position`` where a PENDING solver job stands in the queue. A
+    job whose worker died is queued again, and ends FAILED with
+    ``result.error`` after too many attempts.
+    While an OPTIMIZE job runs on CP-SAT, ``result`` holds the best
+    incumbent found so far (``result.status == "FEASIBLE"``, with objective,
+    bound and gap under ``result.progress``); SCIP has no result until it
+    ends. A run whose time limit came before the
+    engine beat its starting selection, the greedy of the preview, ends
+    with ``result.status == "HEURISTIC"``. INGEST jobs
+    (``/upload/*?background=true``) report rows processed, rows/sec,
+    percent done and the errors so far, and end FAILED with
+    ``result.error`` if the file cannot be read.
+
+    Long-poll: with ``wait`` (seconds), the answer is held until the job
+    is past revision ``since`` (by default, until its next change) or has
+    finished, and after ``wait`` seconds returned as it is. Pass the
+    ``revision`` you got as the next ``since``.
+    """
+    if wait:
+        # Answered by the hub: waiting clients do not query the database
+        status = await job_hub.next(job_id, since, wait)
+    else:
+        job = await db.get(Job, job_id)
+        status = None if job is None else await job_status(db, job)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+def _sse(event: JobEvent | None) -> str:
+    if event is None:
+        return ": keepalive\n\n"
+    return f"id: {event.revision}\nevent: {event.kind}\ndata: {json.dumps(event.data)}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: int, last_event_id: int | None = Header(default=None)):
+    """Server-sent events for a job, until it finishes.
+
+    ``status`` events carry the job without its result on every status,
+    queue position or requests change; ``progress`` events carry each new
+    incumbent (or ingest progress); the finished job comes once as
+    ``result``, and the stream ends. Event ids are job revisions, so a
+    client that reconnects with ``Last-Event-ID`` gets only what it missed.
+    """
+    if await job_hub.snapshot(job_id) is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return JobStatusSchema(
-        job_id=job.job_id,
-        status=job.status.value,
-        created_at=job.created_at,
-        result=job.result_json,
+    async def stream():
+        async for event in job_hub.events(job_id, last_event_id):
+            yield _sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@router.post("/jobs/{job_id}/stop", status_code=202)
+async def stop_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Ask a running solve to finish now with its best incumbent.
+
+    CP-SAT stops within a fraction of a second. SCIP cannot be interrupted:
+    it runs on to its own limits, so solves that may need stopping should
+    use CP-SAT or a ``time_limit_seconds``.
+    """
+    if not await request_stop(db, job_id):
+        raise HTTPException(status_code=400, detail="Job is not running")
+    return {"job_id": job_id, "stopping": True}
+
+
+@router.post("/jobs/{job_id}/cancel", status_code=202)
+async def cancel_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Cancel a solver job.
+
+    The job is CANCELLED at once, and the last incumbent is kept as
+    ``result``. A waiting job never runs. The worker of a running job finds
+    out at its next heartbeat and stops the solve: CP-SAT within a fraction
+    of a second. SCIP runs on to its own limits, and its solver slot stays
+    busy until then. A job shared by
+    coalesced requests runs on until each of them has cancelled;
+    ``requests`` counts the ones left.
+    """
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.kind == JobKind.INGEST:
+        raise HTTPException(status_code=400, detail="Ingest jobs cannot be cancelled")
+    remaining = None if job.status in FINISHED else await cancel(db, job_id)
+    await db.refresh(job)
+    if remaining is None:
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status.value}")
+    job_changed()
+    return {"job_id": job_id, "status": job.status.value, "requests": remaining}
@@ -3,9 +3,11 @@ from collections import defaultdict
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.models.base import get_db
-from app.models.job import Job, JobStatus
+from app.models.job import Job, JobKind, JobStatus
+from app.models.sku import Sku
 from app.models.student import Student
 from app.schemas.picking import PickingItem, PickingList, PickingSchool, PickingStudent
 
@@ -21,6 +23,8 @@ async def get_picking_list(
     job = await db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
+    if job.kind != JobKind.OPTIMIZE:
+        raise HTTPException(status_code=400, detail="Job is not an optimization run")
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Job is not completed yet")
     if not job.result_json:
@@ -28,33 +32,37 @@ async def get_picking_list(
 
     selected_ids = set(job.result_json["selection"]["selected_school_ids"])
 
-    # Query students belonging to selected schools
+    # Query students belonging to selected schools, with SKU keys resolved
+    shirt, pants, shoes = aliased(Sku), aliased(Sku), aliased(Sku)
     rows = (
         await db.execute(
-            select(Student)
+            select(Student.school_id, Student.student_id, shirt.sku_id, pants.sku_id, shoes.sku_id)
+            .join(shirt, shirt.sku_key == Student.shirt_sku_key)
+            .join(pants, pants.sku_key == Student.pants_sku_key)
+            .join(shoes, shoes.sku_key == Student.shoe_sku_key)
             .where(Student.school_id.in_(selected_ids))
             .order_by(Student.school_id, Student.student_id)
         )
-    ).scalars().all()
+    ).all()
 
     # Group by school
-    by_school: dict[str, list[Student]] = defaultdict(list)
-    for student in rows:
-        by_school[student.school_id].append(student)
+    by_school: dict[str, list[tuple[str, str, str, str]]] = defaultdict(list)
+    for school_id, *student in rows:
+        by_school[school_id].append(tuple(student))
 
     schools = []
     for school_id in sorted(by_school.keys()):
         students = by_school[school_id]
         picking_students = [
             PickingStudent(
-                student_id=s.student_id,
+                student_id=student_id,
                 items=[
-                    PickingItem(sku_id=s.shirt_sku, type="shirt"),
-                    PickingItem(sku_id=s.pants_sku, type="pants"),
-                    PickingItem(sku_id=s.shoe_size_sku, type="shoes"),
+                    PickingItem(sku_id=shirt_sku, type="shirt"),
+                    PickingItem(sku_id=pants_sku, type="pants"),
+                    PickingItem(sku_id=shoe_sku, type="shoes"),
                 ],
             )
-            for s in students
+            for student_id, shirt_sku, pants_sku, shoe_sku in students
         ]
         schools.append(PickingSchool(
             school_id=school_id,
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.ingest import (
+    STUDENT_FIELDS,
+    delete_missing_students,
+    to_columns,
+    upsert_students as bulk_upsert_students,
+)
 from app.models.base import get_db
-from app.models.student import Student
 from app.schemas.student import StudentItem
 
 router = APIRouter(tags=["students"])
@@ -11,25 +16,24 @@ router = APIRouter(tags=["students"])
 @router.post("/students", status_code=201)
 async def upsert_students(
     items: list[StudentItem],
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
-    """Upload/upsert student enrollment data."""
-    for item in items:
-        existing = await db.get(Student, item.student_id)
-        if existing:
-            existing.school_id = item.school_id
-            existing.shirt_sku = item.shirt_sku
-            existing.pants_sku = item.pants_sku
-            existing.shoe_size_sku = item.shoe_size_sku
-        else:
-            db.add(
-                Student(
-                    student_id=item.student_id,
-                    school_id=item.school_id,
-                    shirt_sku=item.shirt_sku,
-                    pants_sku=item.pants_sku,
-                    shoe_size_sku=item.shoe_size_sku,
-                )
-            )
+    """Upload/upsert student enrollment data.
+
+    With ``?snapshot=true`` the list is the full roster and students not in
+    it are deleted.
+    """
+    columns = to_columns((item.model_dump() for item in items), STUDENT_FIELDS)
+    seen: set[str] | None = set() if snapshot else None
+    result = await bulk_upsert_students(db, columns, seen=seen)
+    if seen is not None:
+        result.deleted = await delete_missing_students(db, seen)
     await db.commit()
-    return {"upserted": len(items)}
+    return {
+        "upserted": result.upserted,
+        "inserted": result.inserted,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "deleted": result.deleted,
+    }
@@ -1,122 +1,314 @@
-import csv
-import io
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterable, Awaitable, Callable
+from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, UploadFile
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import get_db
-from app.models.inventory import Inventory
-from app.models.student import Student
+from app.ingest import (
+    BATCH_SIZE,
+    Columns,
+    CSVFormatError,
+    CSVRows,
+    Decompressed,
+    UpsertResult,
+    content_encoding,
+    delete_missing_inventory,
+    delete_missing_students,
+    file_chunks,
+    path_chunks,
+    text_chunks,
+    upsert_inventory,
+    upsert_students,
+)
+from app.jobs import job_changed, lease_deadline
+from app.models.base import get_db, async_session
+from app.models.job import Job, JobKind, JobStatus
+from app.schemas.job import JobCreated
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
+logger = logging.getLogger(__name__)
+
 INVENTORY_COLUMNS = {"sku_id", "description", "total_stock_available"}
 STUDENT_COLUMNS = {"student_id", "school_id", "shirt_sku", "pants_sku", "shoe_size_sku"}
 
+# Payloads of background uploads wait here until their job has processed them
+UPLOAD_DIR = Path(
+    os.environ.get(
+        "EQUIPROUTE_UPLOAD_DIR",
+        Path(__file__).resolve().parent.parent.parent / "uploads",
+    )
+)
+
 
 class CSVPayload(BaseModel):
     csv_content: str
 
 
-def _parse_csv(text: str, required_columns: set[str]) -> tuple[list[dict], list[str]]:
-    """Parse CSV text, validate columns, return (rows, errors)."""
-    # Strip BOM if present
-    text = text.lstrip("\ufeff")
-    reader = csv.DictReader(io.StringIO(text))
+async def _inventory_batch(
+    db: AsyncSession, batch: Columns, errors: list[str], seen: set[str] | None
+) -> UpsertResult:
+    keep, stock = [], []
+    for i, (sku_id, value) in enumerate(zip(batch["sku_id"], batch["total_stock_available"])):
+        try:
+            stock.append(int(value))
+        except ValueError:
+            errors.append(f"Invalid stock value for SKU {sku_id}: {value}")
+            continue
+        keep.append(i)
+    if len(keep) < len(batch["sku_id"]):
+        batch = {name: [values[i] for i in keep] for name, values in batch.items()}
+    return await upsert_inventory(db, {**batch, "total_stock_available": stock}, seen=seen)
 
-    if reader.fieldnames is None:
-        raise HTTPException(status_code=400, detail="CSV is empty or has no header row")
 
-    actual = {f.strip() for f in reader.fieldnames}
-    missing = required_columns - actual
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Missing required columns: {', '.join(sorted(missing))}",
-        )
+async def _students_batch(
+    db: AsyncSession, batch: Columns, errors: list[str], seen: set[str] | None
+) -> UpsertResult:
+    return await upsert_students(db, batch, seen=seen)
 
-    rows: list[dict] = []
-    errors: list[str] = []
-    for i, raw_row in enumerate(reader, start=2):  # row 1 is header
-        row = {k.strip(): (v.strip() if v else "") for k, v in raw_row.items()}
-        blank = [c for c in required_columns if not row.get(c)]
-        if blank:
-            errors.append(f"Row {i}: blank value(s) for {', '.join(sorted(blank))}")
-            continue
-        rows.append(row)
 
-    return rows, errors
+# target → (required columns, batch writer, snapshot delete)
+TARGETS = {
+    "inventory": (INVENTORY_COLUMNS, _inventory_batch, delete_missing_inventory),
+    "students": (STUDENT_COLUMNS, _students_batch, delete_missing_students),
+}
 
 
-async def _upsert_inventory(rows: list[dict], errors: list[str], db: AsyncSession) -> dict:
-    upserted = 0
-    for row in rows:
-        try:
-            stock = int(row["total_stock_available"])
-        except ValueError:
-            errors.append(f"Invalid stock value for SKU {row['sku_id']}: {row['total_stock_available']}")
-            continue
+async def _ingest(
+    target: str,
+    rows: CSVRows,
+    db: AsyncSession,
+    on_batch: Callable[[UpsertResult], Awaitable[None]] | None = None,
+    snapshot: bool = False,
+) -> dict:
+    """Write ``rows`` batch by batch, committing each one.
 
-        existing = await db.get(Inventory, row["sku_id"])
-        if existing:
-            existing.description = row["description"]
-            existing.total_stock_available = stock
+    ``on_batch`` is awaited with the running totals before every commit. An
+    encoding error part-way through raises ``CSVFormatError`` and keeps the
+    batches committed before it. With ``snapshot`` the upload is the
+    complete table: once every row is written, rows it does not list are
+    deleted, a batch per commit too. That step is skipped if any row was
+    rejected, since a rejected row's key is unknown and deleting it would
+    lose data.
+    """
+    _, write_batch, delete_missing = TARGETS[target]
+    total = UpsertResult()
+    seen: set[str] | None = set() if snapshot else None
+    async for batch in rows.batches(BATCH_SIZE):
+        total += await write_batch(db, batch, rows.errors, seen)
+        if on_batch is not None:
+            await on_batch(total)
+        await db.commit()
+    if seen is not None:
+        if rows.errors:
+            rows.errors.append("Snapshot not applied: no rows deleted because some rows had errors")
         else:
-            db.add(Inventory(
-                sku_id=row["sku_id"],
-                description=row["description"],
-                total_stock_available=stock,
-            ))
-        upserted += 1
+            async def deleted(count: int) -> None:
+                total.deleted = count
+                if on_batch is not None:
+                    await on_batch(total)
+                await db.commit()
+
+            total.deleted = await delete_missing(db, seen, on_batch=deleted)
+            await db.commit()
+    return _summary(total, rows.errors)
+
+
+def _summary(result: UpsertResult, errors: list[str]) -> dict:
+    return {
+        "upserted": result.upserted,
+        "inserted": result.inserted,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "deleted": result.deleted,
+        "errors": errors,
+    }
 
-    await db.commit()
-    return {"upserted": upserted, "errors": errors}
 
+async def _run_ingest(
+    job_id: int, target: str, path: Path, encoding: str | None = None, snapshot: bool = False
+) -> None:
+    """Background task: ingest a spooled upload, reporting progress on the job.
 
-async def _upsert_students(rows: list[dict], errors: list[str], db: AsyncSession) -> dict:
-    for row in rows:
-        existing = await db.get(Student, row["student_id"])
-        if existing:
-            existing.school_id = row["school_id"]
-            existing.shirt_sku = row["shirt_sku"]
-            existing.pants_sku = row["pants_sku"]
-            existing.shoe_size_sku = row["shoe_size_sku"]
+    The upload is stored as it was sent and decompressed while it is read.
+    Each batch, snapshot deletes included, renews the job's lease, so that a
+    job left behind by a dead API process ends FAILED instead of PROCESSING
+    forever. Like a solver worker's, the writes to the job only land while
+    it is still PROCESSING: once ``recover_expired`` has failed it, the
+    ingest finishes without touching the job again. An unreadable file, or
+    any other error, ends the job FAILED with ``result.error``.
+    """
+    async with async_session() as db:
+        started = await _update_job(
+            db, job_id, JobStatus.PENDING,
+            status=JobStatus.PROCESSING, lease_expires_at=lease_deadline(),
+        )
+        await db.commit()
+        if not started:
+            path.unlink(missing_ok=True)
+            return
+        job_changed()
+
+        columns = TARGETS[target][0]
+        source = Decompressed(path_chunks(path), encoding)
+        rows = CSVRows(source, columns)
+        size = path.stat().st_size
+        started_at = time.perf_counter()
+        reported: dict | None = None
+
+        def progress() -> dict:
+            elapsed = time.perf_counter() - started_at
+            return {
+                "target": target,
+                "rows_processed": rows.rows_read,
+                "rows_per_second": round(rows.rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+                "percent_done": round(100 * source.bytes_read / size, 1) if size else 100.0,
+                "elapsed_seconds": round(elapsed, 3),
+            }
+
+        async def on_batch(total: UpsertResult) -> None:
+            nonlocal reported
+            reported = {**progress(), **_summary(total, rows.errors)}
+            await _update_job(
+                db, job_id, JobStatus.PROCESSING,
+                result_json=reported, lease_expires_at=lease_deadline(),
+            )
+
+        try:
+            summary = await _ingest(target, rows, db, on_batch, snapshot)
+        except CSVFormatError as exc:
+            outcome = {
+                "status": JobStatus.FAILED,
+                "result_json": {**(reported or progress()), "error": str(exc)},
+            }
+        except Exception as exc:
+            logger.exception("ingest job %d failed", job_id)
+            await db.rollback()
+            outcome = {
+                "status": JobStatus.FAILED,
+                "result_json": {
+                    **(reported or progress()),
+                    "error": f"{type(exc).__name__}: {exc}",
+                },
+            }
         else:
-            db.add(Student(
-                student_id=row["student_id"],
-                school_id=row["school_id"],
-                shirt_sku=row["shirt_sku"],
-                pants_sku=row["pants_sku"],
-                shoe_size_sku=row["shoe_size_sku"],
-            ))
+            outcome = {"status": JobStatus.COMPLETED, "result_json": {**progress(), **summary}}
+        finally:
+            path.unlink(missing_ok=True)
+        await _update_job(db, job_id, JobStatus.PROCESSING, lease_expires_at=None, **outcome)
+        await db.commit()
+        job_changed()
+
 
+async def _update_job(db: AsyncSession, job_id: int, expected: JobStatus, **values) -> bool:
+    """Write ``values`` to an ingest job that is still ``expected``; False otherwise."""
+    updated = await db.execute(
+        update(Job)
+        .where(Job.job_id == job_id, Job.status == expected)
+        .values(revision=Job.revision + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return updated.rowcount > 0
+
+
+async def _upload(
+    target: str,
+    chunks: AsyncIterable[bytes],
+    background: bool,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: AsyncSession,
+    encoding: str | None = None,
+    snapshot: bool = False,
+):
+    """Ingest ``chunks`` now, or spool them for a background job.
+
+    ``encoding`` is a ``Content-Encoding`` value; compressed uploads are
+    also recognised without one.
+    """
+    try:
+        encoding = content_encoding(encoding)
+        if not background:
+            rows = CSVRows(Decompressed(chunks, encoding), TARGETS[target][0])
+            return await _ingest(target, rows, db, snapshot=snapshot)
+    except CSVFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    # Spool first: the job's lease starts once the upload is complete
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = UPLOAD_DIR / f"upload-{uuid.uuid4().hex}.csv"
+    with open(path, "wb") as f:
+        async for chunk in chunks:
+            await asyncio.to_thread(f.write, chunk)
+
+    # Runs in this process; FAILED by recover_expired if it stops renewing
+    job = Job(kind=JobKind.INGEST, lease_expires_at=lease_deadline())
+    db.add(job)
     await db.commit()
-    return {"upserted": len(rows), "errors": errors}
+    await db.refresh(job)
+
+    background_tasks.add_task(_run_ingest, job.job_id, target, path, encoding, snapshot)
+    response.status_code = 202
+    return JobCreated(job_id=job.job_id)
 
 
 # ── File upload endpoints (curl / Postman) ──
+#
+# With ?background=true the payload is stored and a job id returned at
+# once (202); GET /jobs/{job_id} reports progress and the final counts.
+# Files may be gzip- or zstd-compressed, detected from their first bytes or
+# from the Content-Encoding header of the file part. With ?snapshot=true
+# the upload replaces the table: rows it does not list are deleted.
 
 @router.post("/inventory")
 async def upload_inventory_csv(
     file: UploadFile,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    background: bool = False,
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Upload inventory data from a CSV file."""
-    content = await file.read()
-    rows, errors = _parse_csv(content.decode("utf-8-sig"), INVENTORY_COLUMNS)
-    return await _upsert_inventory(rows, errors, db)
+    return await _upload(
+        "inventory",
+        file_chunks(file),
+        background,
+        background_tasks,
+        response,
+        db,
+        file.headers.get("content-encoding"),
+        snapshot,
+    )
 
 
 @router.post("/students")
 async def upload_students_csv(
     file: UploadFile,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    background: bool = False,
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Upload student enrollment data from a CSV file."""
-    content = await file.read()
-    rows, errors = _parse_csv(content.decode("utf-8-sig"), STUDENT_COLUMNS)
-    return await _upsert_students(rows, errors, db)
+    return await _upload(
+        "students",
+        file_chunks(file),
+        background,
+        background_tasks,
+        response,
+        db,
+        file.headers.get("content-encoding"),
+        snapshot,
+    )
 
 
 # ── JSON body endpoints (mobile app) ──
@@ -124,18 +316,40 @@ async def upload_students_csv(
 @router.post("/inventory/text")
 async def upload_inventory_text(
     payload: CSVPayload,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    background: bool = False,
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Upload inventory data as CSV text in a JSON body."""
-    rows, errors = _parse_csv(payload.csv_content, INVENTORY_COLUMNS)
-    return await _upsert_inventory(rows, errors, db)
+    return await _upload(
+        "inventory",
+        text_chunks(payload.csv_content),
+        background,
+        background_tasks,
+        response,
+        db,
+        snapshot=snapshot,
+    )
 
 
 @router.post("/students/text")
 async def upload_students_text(
     payload: CSVPayload,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    background: bool = False,
+    snapshot: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Upload student enrollment data as CSV text in a JSON body."""
-    rows, errors = _parse_csv(payload.csv_content, STUDENT_COLUMNS)
-    return await _upsert_students(rows, errors, db)
+    return await _upload(
+        "students",
+        text_chunks(payload.csv_content),
+        background,
+        background_tasks,
+        response,
+        db,
+        snapshot=snapshot,
+    )
@@ -1,7 +1,8 @@
 from .inventory import InventoryItem, InventoryListItem
 from .student import StudentItem
 from .school import SchoolProfile
-from .job import JobCreated, JobStatus
+from .job import OptimizeOptions, PreviewRequest, JobCreated, JobStatus
+from .scenario import ScenarioItem, ScenarioBatchRequest
 from .picking import PickingItem, PickingStudent, PickingSchool, PickingList
 
 __all__ = [
@@ -9,8 +10,12 @@ __all__ = [
     "InventoryListItem",
     "StudentItem",
     "SchoolProfile",
+    "OptimizeOptions",
+    "PreviewRequest",
     "JobCreated",
     "JobStatus",
+    "ScenarioItem",
+    "ScenarioBatchRequest",
     "PickingItem",
     "PickingStudent",
     "PickingSchool",
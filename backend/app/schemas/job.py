@@ -1,15 +1,38 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+class OptimizeOptions(BaseModel):
+    time_limit_seconds: float | None = Field(default=None, gt=0)
+    gap_limit: float | None = Field(default=None, ge=0, lt=1)
+    engine: Literal["scip", "cp-sat"] | None = None
+    num_workers: int | None = Field(default=None, ge=1)  # CP-SAT search workers
+    shortage_schools: int | None = Field(default=None, ge=0, le=1000)  # default: EQUIPROUTE_SHORTAGE_SCHOOLS
+    sensitivity: bool = False  # add the marginal-stock report (per binding SKU)
+    use_cache: bool = True  # False forces a fresh solve (the result is still cached)
+
+
+class PreviewRequest(BaseModel):
+    inventory: dict[str, int] = {}  # sku_id → stock overrides, not persisted
+    shortage_schools: int | None = Field(default=None, ge=0, le=1000)
 
 
 class JobCreated(BaseModel):
     job_id: int
+    queue_position: int = 0  # n: n-th in line for a solver worker; 0 once running, and for uploads
+    coalesced: bool = False  # joined a waiting or running job with the same input
+    cache_hit: bool = False  # answered from the result cache; the job is already COMPLETED
 
 
 class JobStatus(BaseModel):
     job_id: int
+    kind: str  # OPTIMIZE, SCENARIOS or INGEST
     status: str
     created_at: datetime
+    cache_hit: bool | None = None  # None when the job did not use the result cache
+    queue_position: int | None = None  # while waiting in the job queue
+    requests: int = 1  # identical requests sharing this job
+    revision: int = 0  # bumped by every change; pass as ``since`` to long-poll
     result: Any | None = None
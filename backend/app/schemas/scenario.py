@@ -0,0 +1,25 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class ScenarioItem(BaseModel):
+    name: str
+    safety_factor: float = Field(default=0.90, gt=0, le=1)
+    inventory: dict[str, int] = {}  # sku_id → absolute stock override
+    shipment: dict[str, int] = {}  # sku_id → units received on top of stock
+
+
+class ScenarioBatchRequest(BaseModel):
+    scenarios: list[ScenarioItem] = Field(min_length=1, max_length=32)
+    time_limit_seconds: float | None = Field(default=None, gt=0)
+    gap_limit: float | None = Field(default=None, ge=0, lt=1)
+    engine: Literal["scip", "cp-sat"] | None = None
+
+    @field_validator("scenarios")
+    @classmethod
+    def _unique_names(cls, scenarios: list[ScenarioItem]) -> list[ScenarioItem]:
+        names = [s.name for s in scenarios]
+        if len(set(names)) != len(names):
+            raise ValueError("Scenario names must be unique")
+        return scenarios
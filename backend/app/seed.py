@@ -5,6 +5,8 @@ import asyncio
 from sqlalchemy import select
 
 from app.models import async_session, init_db, Inventory, Student
+from app.solver.catalog import sku_keys
+from app.solver.demand import rebuild_demand
 
 # ---------------------------------------------------------------------------
 # Shirt SKUs: {type}-{size}  (2 types × 11 sizes = 22 SKUs)
@@ -126,17 +128,20 @@ async def seed() -> None:
                 )
             )
 
+        keys = await sku_keys(session, (sku for row in STUDENTS_SEED for sku in row[2:]))
         for student_id, school_id, shirt, pants, shoes in STUDENTS_SEED:
             session.add(
                 Student(
                     student_id=student_id,
                     school_id=school_id,
-                    shirt_sku=shirt,
-                    pants_sku=pants,
-                    shoe_size_sku=shoes,
+                    shirt_sku_key=keys[shirt],
+                    pants_sku_key=keys[pants],
+                    shoe_sku_key=keys[shoes],
                 )
             )
 
+        await session.flush()
+        await rebuild_demand(session)
         await session.commit()
         print(
             f"Seeded {len(INVENTORY_SEED)} inventory SKUs "
@@ -1,4 +1,12 @@
 from .demand import SchoolDemandProfile, aggregate_demand
+from .matrix import DemandMatrix, build_demand_matrix
 from .optimizer import SolverResult, solve
 
-__all__ = ["SchoolDemandProfile", "aggregate_demand", "SolverResult", "solve"]
+__all__ = [
+    "SchoolDemandProfile",
+    "aggregate_demand",
+    "DemandMatrix",
+    "build_demand_matrix",
+    "SolverResult",
+    "solve",
+]
@@ -0,0 +1,114 @@
+"""Content-addressed cache of solver results.
+
+Identical inputs are common: several people press "Optimize" without any
+data change, and the app re-triggers after reconnecting. Results are stored
+under a SHA-256 of everything that determines them — demand profiles,
+inventory, safety factor, engine and limits — so re-running on unchanged
+data returns the stored result instead of solving again.
+
+Entries older than ``MAX_AGE_SECONDS`` are dropped, and beyond
+``MAX_ENTRIES`` the least recently used ones go first.
+"""
+
+import dataclasses
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.solver_cache import SolverCacheEntry
+
+from .decompose import SolveLimits
+from .demand import SchoolDemandProfile
+from .engines import SolverEngine
+
+MAX_ENTRIES = int(os.environ.get("EQUIPROUTE_CACHE_MAX_ENTRIES", "64"))
+MAX_AGE_SECONDS = float(os.environ.get("EQUIPROUTE_CACHE_MAX_AGE_SECONDS", "86400"))
+
+
+def cache_key(
+    profiles: dict[str, SchoolDemandProfile],
+    inventory: dict[str, int],
+    safety_factor: float,
+    engine: SolverEngine,
+    limits: SolveLimits | None = None,
+    **options,
+) -> str:
+    """Stable hash of the solver inputs (independent of dict ordering).
+
+    ``options`` are any further keyword arguments that shape the result.
+    """
+    h = hashlib.sha256()
+    for sid in sorted(profiles):
+        p = profiles[sid]
+        h.update(f"S\t{sid}\t{p.total_students}\n".encode())
+        for sku in sorted(p.sku_demand):
+            h.update(f"{sku}\t{p.sku_demand[sku]}\n".encode())
+    for sku in sorted(inventory):
+        h.update(f"I\t{sku}\t{inventory[sku]}\n".encode())
+    h.update(f"F\t{safety_factor!r}\n".encode())
+    h.update(f"E\t{engine.name}\t{sorted(dataclasses.asdict(engine).items())}\n".encode())
+    if limits is not None:
+        h.update(f"L\t{limits.time_limit_seconds!r}\t{limits.gap_limit!r}\n".encode())
+    for name in sorted(options):
+        h.update(f"O\t{name}\t{options[name]!r}\n".encode())
+    return h.hexdigest()
+
+
+async def lookup(db: AsyncSession, key: str) -> dict | None:
+    """Stored result for ``key``, or None on a miss or an expired entry."""
+    entry = await db.get(SolverCacheEntry, key)
+    if entry is None:
+        return None
+
+    now = datetime.now(timezone.utc)
+    if _aware(entry.created_at) < now - timedelta(seconds=MAX_AGE_SECONDS):
+        await db.delete(entry)
+        await db.commit()
+        return None
+
+    entry.hits += 1
+    entry.last_used_at = now
+    await db.commit()
+    return entry.result_json
+
+
+async def store(
+    db: AsyncSession, key: str, result: dict, source_job_id: int | None = None
+) -> None:
+    """Save ``result`` under ``key`` and evict by age and size."""
+    now = datetime.now(timezone.utc)
+    entry = await db.get(SolverCacheEntry, key)
+    if entry is None:
+        entry = SolverCacheEntry(cache_key=key)
+        db.add(entry)
+    entry.result_json = result
+    entry.source_job_id = source_job_id
+    entry.hits = 0
+    entry.created_at = entry.last_used_at = now
+    await db.flush()
+
+    await db.execute(
+        delete(SolverCacheEntry).where(
+            SolverCacheEntry.created_at < now - timedelta(seconds=MAX_AGE_SECONDS)
+        )
+    )
+    stale = (
+        await db.execute(
+            select(SolverCacheEntry.cache_key)
+            .order_by(SolverCacheEntry.last_used_at.desc())
+            .offset(MAX_ENTRIES)
+        )
+    ).scalars().all()
+    if stale:
+        await db.execute(
+            delete(SolverCacheEntry).where(SolverCacheEntry.cache_key.in_(stale))
+        )
+    await db.commit()
+
+
+def _aware(ts: datetime) -> datetime:
+    # SQLite drops tzinfo on the way back; stored values are always UTC
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
@@ -0,0 +1,33 @@
+"""SKU catalog: integer keys for SKU strings.
+
+Students and the demand tables store compact integer ``sku_key``s; the SKU
+strings live once in the ``skus`` table and are only looked up when rows
+are written or results leave the API.
+"""
+
+from collections.abc import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sku import Sku
+
+
+async def sku_keys(session: AsyncSession, sku_ids: Iterable[str]) -> dict[str, int]:
+    """Integer key for every SKU in ``sku_ids``, adding new SKUs to the catalog."""
+    wanted = set(sku_ids)
+    if not wanted:
+        return {}
+    await session.execute(
+        sqlite_insert(Sku).on_conflict_do_nothing(index_elements=[Sku.sku_id]),
+        [{"sku_id": sku_id} for sku_id in sorted(wanted)],
+    )
+    keys = await sku_names(session)
+    return {sku_id: key for key, sku_id in keys.items() if sku_id in wanted}
+
+
+async def sku_names(session: AsyncSession) -> dict[int, str]:
+    """The whole catalog as sku_key → SKU string (a few hundred rows)."""
+    rows = await session.execute(select(Sku.sku_key, Sku.sku_id))
+    return {sku_key: sku_id for sku_key, sku_id in rows}
@@ -0,0 +1,251 @@
+"""Independent-component decomposition of the school-selection ILP.
+
+Schools only compete with each other through shared SKUs. Viewing the
+demand matrix as a bipartite School–SKU graph, every connected component is
+an independent ILP: no constraint mentions variables from two components.
+Large instances are split along those components and the pieces are solved
+concurrently on a process pool; the per-component solutions are then
+stitched back into one solution vector for the caller.
+
+Every block is solved once, under the caller's limits. Solving is anytime
+when the engine streams its incumbents (CP-SAT) and the model is solved
+in-process: the current incumbent, proven bound and gap are reported to
+``on_incumbent`` as they improve, so callers can publish a usable partial
+answer long before a hard instance finishes, and ``should_stop`` ends the
+search early. Other engines (SCIP), and blocks solved on the pool, report
+their final result once.
+"""
+
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .engines import BlockSolution, SolverEngine, get_engine
+from .matrix import DemandMatrix
+
+# Below this many variables the process-pool overhead outweighs the gain and
+# the whole model is solved in-process.
+PARALLEL_MIN_VARIABLES = 2_000
+
+
+@dataclass
+class DecompositionStats:
+    components: int
+    largest_component: int
+    workers: int
+
+
+@dataclass
+class SolveLimits:
+    time_limit_seconds: float | None = None
+    gap_limit: float | None = None  # relative, e.g. 0.01 = stop within 1%
+
+
+@dataclass
+class SolveProgress:
+    objective: int  # students served by the incumbent
+    best_bound: int  # proven upper bound on students served
+    gap: float  # (best_bound - objective) / best_bound
+    elapsed_seconds: float
+    rounds: int  # solves of each block, one since solves are not restarted
+
+    def shifted(self, students: int) -> "SolveProgress":
+        """Same progress with ``students`` added to objective and bound."""
+        objective = self.objective + students
+        best_bound = self.best_bound + students
+        return replace(
+            self,
+            objective=objective,
+            best_bound=best_bound,
+            gap=round(_gap(objective, best_bound), 6),
+        )
+
+
+@dataclass
+class Solution:
+    values: np.ndarray
+    progress: SolveProgress
+    # Whether the engine found anything better than the hint it started from
+    improved: bool = False
+
+
+@dataclass
+class Component:
+    rows: np.ndarray
+    cols: np.ndarray
+
+
+def find_components(matrix: DemandMatrix) -> list[Component]:
+    """Connected components of the bipartite School–SKU graph, largest first."""
+    n, m = matrix.n_schools, matrix.n_skus
+    if n == 0:
+        return []
+
+    pattern = matrix.demand.astype(bool)
+    graph = sparse.bmat([[None, pattern], [pattern.T, None]], format="csr")
+    count, labels = csgraph.connected_components(graph, directed=False)
+
+    school_labels, sku_labels = labels[:n], labels[n:]
+    row_order = np.argsort(school_labels, kind="stable")
+    col_order = np.argsort(sku_labels, kind="stable")
+    row_bounds = np.searchsorted(school_labels[row_order], np.arange(count + 1))
+    col_bounds = np.searchsorted(sku_labels[col_order], np.arange(count + 1))
+
+    components = [
+        Component(
+            rows=row_order[row_bounds[c] : row_bounds[c + 1]],
+            cols=col_order[col_bounds[c] : col_bounds[c + 1]],
+        )
+        for c in range(count)
+    ]
+    components.sort(key=lambda comp: len(comp.rows), reverse=True)
+    return components
+
+
+def solve_ilp(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    upper: np.ndarray | None = None,
+    hint: np.ndarray | None = None,
+    time_limit: float | None = None,
+    gap_limit: float | None = None,
+    engine: SolverEngine | None = None,
+) -> BlockSolution:
+    """Solve one ILP within the given limits."""
+    if upper is None:
+        upper = np.ones(matrix.n_schools, dtype=np.int64)
+    return (engine or get_engine()).solve(
+        matrix, caps, upper, hint=hint, time_limit=time_limit, gap_limit=gap_limit
+    )
+
+
+def solve_decomposed(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    upper: np.ndarray | None = None,
+    max_workers: int | None = None,
+    hint: np.ndarray | None = None,
+    limits: SolveLimits | None = None,
+    on_incumbent: Callable[[Solution], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    engine: SolverEngine | None = None,
+    parallel_min_variables: int = PARALLEL_MIN_VARIABLES,
+) -> tuple[Solution, DecompositionStats]:
+    """Solve ``matrix`` component by component, in parallel when worthwhile.
+
+    Every block is solved once under ``limits``, starting from ``hint``.
+    ``on_incumbent`` receives the current solution whenever the incumbent
+    or the bound improves: during the search for an engine that streams
+    incumbents on the in-process model, which also ends early once
+    ``should_stop`` returns True; otherwise once, with the final result.
+    """
+    limits = limits or SolveLimits()
+    started = time.perf_counter()
+    components = find_components(matrix)
+    largest = len(components[0].rows) if components else 0
+    workers = min(len(components), max_workers or os.cpu_count() or 1)
+    parallel = workers > 1 and matrix.n_schools >= parallel_min_variables
+    stats = DecompositionStats(len(components), largest, workers if parallel else 1)
+    engine = engine or get_engine()
+    if parallel:
+        engine = engine.split(workers)
+
+    n = matrix.n_schools
+    if upper is None:
+        upper = np.ones(n, dtype=np.int64)
+    values = np.zeros(n) if hint is None else hint.astype(np.float64)
+    found = False
+    if n == 0:
+        return Solution(values, _progress(values, matrix, 0.0, started, 0)), stats
+
+    if parallel:
+        blocks = components
+        models = [
+            (matrix.take(b.rows, b.cols), caps[b.cols], upper[b.rows]) for b in blocks
+        ]
+    else:
+        blocks = [Component(rows=np.arange(n), cols=np.arange(matrix.n_skus))]
+        models = [(matrix, caps, upper)]
+
+    students = matrix.students.astype(np.float64)
+    objectives = np.array([students[b.rows] @ values[b.rows] for b in blocks])
+    bounds = np.array([students[b.rows] @ upper[b.rows] for b in blocks])
+
+    def hint_for(i: int) -> np.ndarray | None:
+        block_values = values[blocks[i].rows]
+        return block_values if block_values.any() else None
+
+    def merge(i: int, result: BlockSolution) -> bool:
+        """Keep a better incumbent and a tighter bound for block ``i``; True if either."""
+        nonlocal found
+        improved = False
+        bound = np.floor(min(bounds[i], result.best_bound) + 1e-6)
+        if result.values is not None and result.objective > objectives[i]:
+            values[blocks[i].rows] = result.values
+            objectives[i] = result.objective
+            improved = found = True
+        if bound < bounds[i]:
+            bounds[i] = bound
+            improved = True
+        return improved
+
+    def report() -> None:
+        progress = _progress(values, matrix, bounds.sum(), started, 1)
+        on_incumbent(Solution(values.copy(), progress))
+
+    if parallel:
+        calls = [
+            (*models[i], hint_for(i), limits.time_limit_seconds, limits.gap_limit, engine)
+            for i in range(len(blocks))
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(solve_ilp, *zip(*calls)))
+    else:
+        def on_solution(result: BlockSolution) -> None:
+            if merge(0, result):
+                report()
+
+        results = [
+            engine.solve(
+                *models[0],
+                hint=hint_for(0),
+                time_limit=limits.time_limit_seconds,
+                gap_limit=limits.gap_limit,
+                on_solution=None if on_incumbent is None else on_solution,
+                should_stop=should_stop,
+            )
+        ]
+    # Engines that do not stream report here, as does a final result that
+    # improves on the last streamed incumbent
+    if any([merge(i, result) for i, result in enumerate(results)]) and on_incumbent is not None:
+        report()
+    progress = _progress(values, matrix, bounds.sum(), started, 1)
+    return Solution(values, progress, found), stats
+
+
+def _gap(objective: float, bound: float) -> float:
+    return (bound - objective) / bound if bound > 0 else 0.0
+
+
+def _progress(
+    values: np.ndarray,
+    matrix: DemandMatrix,
+    bound: float,
+    started: float,
+    rounds: int,
+) -> SolveProgress:
+    objective = int(round(matrix.students @ np.rint(values)))
+    bound = max(int(bound), objective)
+    return SolveProgress(
+        objective=objective,
+        best_bound=bound,
+        gap=round(_gap(objective, bound), 6),
+        elapsed_seconds=round(time.perf_counter() - started, 4),
+        rounds=rounds,
+    )
@@ -8,16 +8,39 @@ Each student requires:
 The output is a dict keyed by school_id containing:
   - total_students: number of students in the school
   - sku_demand: {sku_id: total_units_needed}
+
+Profiles are read from the ``school_sku_demand`` and
+``school_student_counts`` tables, which every write to ``students`` keeps
+up to date through a ``DemandDelta``. ``rebuild_demand`` and
+``check_demand`` recompute them from ``students`` for recovery (see
+``python -m app.check_demand``).
+
+Deployments whose students are written outside the API, so the tables
+cannot be trusted, set ``EQUIPROUTE_DEMAND_SOURCE=stream``: demand is then
+counted from ``students`` on every call, streamed in fixed-size batches so
+memory stays flat however many students there are.
 """
 
-from collections import defaultdict
+import os
+from collections import Counter
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass, field
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.demand import SchoolSkuDemand, SchoolStudentCount
+from app.models.sku import Sku
 from app.models.student import Student
 
+from .catalog import sku_names
+from .versions import STUDENTS, bump_data_version
+
+# "table": maintained demand tables; "stream": count students on every call
+DEMAND_SOURCE = os.environ.get("EQUIPROUTE_DEMAND_SOURCE", "table")
+STREAM_BATCH_SIZE = 10_000
+
 
 @dataclass
 class SchoolDemandProfile:
@@ -26,26 +49,223 @@ class SchoolDemandProfile:
     sku_demand: dict[str, int] = field(default_factory=dict)
 
 
+@dataclass
+class DemandDelta:
+    """Pending changes to the demand tables from student writes.
+
+    Call ``remove`` with a student's old values before changing it and
+    ``add`` with the new ones afterwards, then ``apply`` in the same
+    transaction as the student writes.
+    """
+
+    students: Counter = field(default_factory=Counter)  # school_id → ±students
+    units: Counter = field(default_factory=Counter)  # (school_id, sku_key) → ±units
+
+    def add(self, student: Student, sign: int = 1) -> None:
+        self.add_many(
+            [student.school_id],
+            [[student.shirt_sku_key], [student.pants_sku_key], [student.shoe_sku_key]],
+            sign,
+        )
+
+    def add_many(
+        self, school_ids: Sequence[str], sku_keys: Iterable[Sequence[int]], sign: int = 1
+    ) -> None:
+        """Like ``add`` for students given as columns: school ids, then one
+        column of SKU keys per garment."""
+        update = Counter.update if sign > 0 else Counter.subtract
+        update(self.students, school_ids)
+        for keys in sku_keys:
+            update(self.units, zip(school_ids, keys))
+
+    def remove(self, student: Student) -> None:
+        self.add(student, sign=-1)
+
+    async def apply(self, session: AsyncSession) -> None:
+        students = [
+            {"school_id": sid, "total_students": n}
+            for sid, n in self.students.items()
+            if n
+        ]
+        units = [
+            {"school_id": sid, "sku_key": key, "quantity": n}
+            for (sid, key), n in self.units.items()
+            if n
+        ]
+        if students:
+            stmt = sqlite_insert(SchoolStudentCount)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[SchoolStudentCount.school_id],
+                    set_={
+                        "total_students": SchoolStudentCount.total_students
+                        + stmt.excluded.total_students
+                    },
+                ),
+                students,
+            )
+            await session.execute(
+                delete(SchoolStudentCount).where(SchoolStudentCount.total_students <= 0)
+            )
+        if units:
+            stmt = sqlite_insert(SchoolSkuDemand)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[SchoolSkuDemand.school_id, SchoolSkuDemand.sku_key],
+                    set_={"quantity": SchoolSkuDemand.quantity + stmt.excluded.quantity},
+                ),
+                units,
+            )
+            await session.execute(
+                delete(SchoolSkuDemand).where(SchoolSkuDemand.quantity <= 0)
+            )
+        self.students.clear()
+        self.units.clear()
+
+
 async def aggregate_demand(session: AsyncSession) -> dict[str, SchoolDemandProfile]:
-    """Query all students and return demand profiles grouped by school."""
-    result = await session.execute(select(Student))
-    students = result.scalars().all()
-
-    profiles: dict[str, SchoolDemandProfile] = {}
-    demand_accum: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    student_counts: dict[str, int] = defaultdict(int)
-
-    for s in students:
-        student_counts[s.school_id] += 1
-        demand_accum[s.school_id][s.shirt_sku] += 1
-        demand_accum[s.school_id][s.pants_sku] += 1
-        demand_accum[s.school_id][s.shoe_size_sku] += 1
-
-    for school_id, sku_demand in demand_accum.items():
-        profiles[school_id] = SchoolDemandProfile(
-            school_id=school_id,
-            total_students=student_counts[school_id],
-            sku_demand=dict(sku_demand),
+    """Return demand profiles grouped by school, ordered by school_id.
+
+    Reads the maintained demand tables: O(schools × SKUs) rows, independent
+    of the number of students. With ``DEMAND_SOURCE == "stream"`` the
+    profiles are counted from ``students`` instead (``stream_demand``).
+    """
+    if DEMAND_SOURCE == "stream":
+        return await stream_demand(session)
+    return await _stored_demand(session)
+
+
+async def aggregate_students(session: AsyncSession) -> dict[str, SchoolDemandProfile]:
+    """Demand profiles computed straight from ``students`` with GROUP BY."""
+    counts = await session.execute(_student_counts().order_by(Student.school_id))
+    items = _sku_counts().subquery()
+    demand = await session.execute(
+        select(items.c.school_id, Sku.sku_id, items.c.quantity)
+        .join(Sku, Sku.sku_key == items.c.sku_key)
+        .order_by(items.c.school_id, Sku.sku_id)
+    )
+    return _profiles(counts, demand)
+
+
+async def stream_demand(
+    session: AsyncSession, batch_size: int = STREAM_BATCH_SIZE
+) -> dict[str, SchoolDemandProfile]:
+    """Demand profiles counted from ``students`` in constant memory.
+
+    Rows come through a server-side cursor ``batch_size`` at a time as plain
+    column tuples (no ORM objects), so peak memory is one batch plus the
+    O(schools × SKUs) counters, whether there are 10k or 10M students. SKU
+    keys are only translated to strings once counting is done.
+    """
+    result = await session.stream(
+        select(
+            Student.school_id,
+            Student.shirt_sku_key,
+            Student.pants_sku_key,
+            Student.shoe_sku_key,
+        ).execution_options(yield_per=batch_size)
+    )
+    students: Counter = Counter()
+    units: Counter = Counter()  # (school_id, sku_key) → units
+    async for batch in result.partitions():
+        schools, shirts, pants, shoes = zip(*batch)
+        students.update(schools)
+        units.update(zip(schools, shirts))
+        units.update(zip(schools, pants))
+        units.update(zip(schools, shoes))
+
+    names = await sku_names(session)
+    profiles = {
+        school_id: SchoolDemandProfile(school_id=school_id, total_students=students[school_id])
+        for school_id in sorted(students)
+    }
+    for school_id, sku_id, qty in sorted(
+        (school_id, names[key], qty) for (school_id, key), qty in units.items()
+    ):
+        profiles[school_id].sku_demand[sku_id] = qty
+    return profiles
+
+
+async def rebuild_demand(session: AsyncSession) -> None:
+    """Recompute the demand tables from ``students`` (caller commits)."""
+    await session.execute(delete(SchoolStudentCount))
+    await session.execute(delete(SchoolSkuDemand))
+    await session.execute(
+        insert(SchoolStudentCount).from_select(
+            ["school_id", "total_students"], _student_counts()
         )
+    )
+    await session.execute(
+        insert(SchoolSkuDemand).from_select(
+            ["school_id", "sku_key", "quantity"], _sku_counts()
+        )
+    )
+    await bump_data_version(session, STUDENTS)
+
+
+async def check_demand(session: AsyncSession) -> list[str]:
+    """Differences between the demand tables and ``students`` (empty if consistent)."""
+    stored = await _stored_demand(session)
+    actual = await aggregate_students(session)
+
+    problems: list[str] = []
+    for sid in sorted(stored.keys() | actual.keys()):
+        have = stored.get(sid, SchoolDemandProfile(sid))
+        want = actual.get(sid, SchoolDemandProfile(sid))
+        if have.total_students != want.total_students:
+            problems.append(
+                f"{sid}: {have.total_students} students stored, {want.total_students} actual"
+            )
+        for sku in sorted(have.sku_demand.keys() | want.sku_demand.keys()):
+            stored_qty = have.sku_demand.get(sku, 0)
+            actual_qty = want.sku_demand.get(sku, 0)
+            if stored_qty != actual_qty:
+                problems.append(f"{sid} / {sku}: {stored_qty} stored, {actual_qty} actual")
+    return problems
+
+
+async def ensure_demand(session: AsyncSession) -> None:
+    """Build the demand tables once for a database that predates them."""
+    has_counts = (await session.execute(select(SchoolStudentCount).limit(1))).first()
+    has_students = (await session.execute(select(Student.student_id).limit(1))).first()
+    if has_students and not has_counts:
+        await rebuild_demand(session)
+        await session.commit()
+
+
+async def _stored_demand(session: AsyncSession) -> dict[str, SchoolDemandProfile]:
+    counts = await session.execute(
+        select(SchoolStudentCount.school_id, SchoolStudentCount.total_students)
+        .order_by(SchoolStudentCount.school_id)
+    )
+    demand = await session.execute(
+        select(SchoolSkuDemand.school_id, Sku.sku_id, SchoolSkuDemand.quantity)
+        .join(Sku, Sku.sku_key == SchoolSkuDemand.sku_key)
+        .order_by(SchoolSkuDemand.school_id, Sku.sku_id)
+    )
+    return _profiles(counts, demand)
+
+
+def _student_counts():
+    return select(Student.school_id, func.count()).group_by(Student.school_id)
+
+
+def _sku_counts():
+    items = union_all(
+        select(Student.school_id, Student.shirt_sku_key.label("sku_key")),
+        select(Student.school_id, Student.pants_sku_key),
+        select(Student.school_id, Student.shoe_sku_key),
+    ).subquery()
+    return select(
+        items.c.school_id, items.c.sku_key, func.count().label("quantity")
+    ).group_by(items.c.school_id, items.c.sku_key)
+
 
+def _profiles(counts, demand) -> dict[str, SchoolDemandProfile]:
+    profiles = {
+        school_id: SchoolDemandProfile(school_id=school_id, total_students=n)
+        for school_id, n in counts
+    }
+    for school_id, sku_id, qty in demand:
+        profiles[school_id].sku_demand[sku_id] = qty
     return profiles
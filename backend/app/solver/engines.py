@@ -0,0 +1,205 @@
+"""Pluggable ILP engines.
+
+Every engine solves the same school-selection model (see ``model.py``) for
+one block of the demand matrix and returns a ``BlockSolution``:
+
+  - ``scip``   — SCIP through OR-Tools' MPSolver (single-threaded)
+  - ``cp-sat`` — OR-Tools CP-SAT with parallel search workers
+
+Engines are small picklable dataclasses so they can be shipped to the
+process pool together with the block they solve. An engine that
+``streams_incumbents`` reports each improved solution to ``on_solution``
+during the search and ends it soon after ``should_stop`` returns True;
+the others ignore both.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from typing import ClassVar
+
+import numpy as np
+from ortools.linear_solver.python import model_builder_helper as mbh
+from ortools.sat.python import cp_model
+
+from .matrix import DemandMatrix
+from .model import build_model
+
+DEFAULT_ENGINE = os.environ.get("EQUIPROUTE_SOLVER_ENGINE", "scip")
+# How often a streaming search checks ``should_stop``
+STOP_POLL_SECONDS = 0.1
+
+
+@dataclass
+class BlockSolution:
+    values: np.ndarray | None
+    objective: float
+    best_bound: float
+
+
+@dataclass
+class SolverEngine(ABC):
+    name: ClassVar[str]
+    streams_incumbents: ClassVar[bool] = False
+
+    @abstractmethod
+    def solve(
+        self,
+        matrix: DemandMatrix,
+        caps: np.ndarray,
+        upper: np.ndarray,
+        hint: np.ndarray | None = None,
+        time_limit: float | None = None,
+        gap_limit: float | None = None,
+        on_solution: Callable[[BlockSolution], None] | None = None,
+        should_stop: Callable[[], bool] | None = None,
+    ) -> BlockSolution:
+        """Solve one block of the model within the given limits."""
+
+    def split(self, blocks: int) -> "SolverEngine":
+        """Engine to use when ``blocks`` blocks are solved side by side."""
+        return self
+
+
+@dataclass
+class ScipEngine(SolverEngine):
+    name: ClassVar[str] = "scip"
+
+    def solve(
+        self,
+        matrix,
+        caps,
+        upper,
+        hint=None,
+        time_limit=None,
+        gap_limit=None,
+        on_solution=None,
+        should_stop=None,
+    ):
+        solver = mbh.ModelSolverHelper("scip")
+        if not solver.solver_is_supported():
+            raise RuntimeError("SCIP solver not available")
+        if time_limit is not None:
+            solver.set_time_limit_in_seconds(time_limit)
+        if gap_limit:
+            solver.set_solver_specific_parameters(f"limits/gap = {gap_limit}")
+
+        solver.solve(build_model(matrix, caps, upper=upper, hint=hint))
+        if solver.status() not in (mbh.SolveStatus.OPTIMAL, mbh.SolveStatus.FEASIBLE):
+            return BlockSolution(values=None, objective=0.0, best_bound=np.inf)
+        return BlockSolution(
+            values=solver.variable_values(),
+            objective=solver.objective_value(),
+            best_bound=solver.best_objective_bound(),
+        )
+
+
+@dataclass
+class CpSatEngine(SolverEngine):
+    name: ClassVar[str] = "cp-sat"
+    streams_incumbents: ClassVar[bool] = True
+    num_workers: int = 0  # 0 = one search worker per core
+
+    def solve(
+        self,
+        matrix,
+        caps,
+        upper,
+        hint=None,
+        time_limit=None,
+        gap_limit=None,
+        on_solution=None,
+        should_stop=None,
+    ):
+        model = cp_model.CpModel()
+        x = [model.new_int_var(0, int(u), f"x{j}") for j, u in enumerate(upper.tolist())]
+
+        by_sku = matrix.demand.T.tocsr()
+        for i, cap in enumerate(caps.tolist()):
+            start, end = by_sku.indptr[i], by_sku.indptr[i + 1]
+            model.add(
+                cp_model.LinearExpr.weighted_sum(
+                    [x[j] for j in by_sku.indices[start:end].tolist()],
+                    by_sku.data[start:end].tolist(),
+                )
+                <= int(cap)
+            )
+        model.maximize(cp_model.LinearExpr.weighted_sum(x, matrix.students.tolist()))
+        if hint is not None:
+            for var, value in zip(x, hint.tolist()):
+                model.add_hint(var, int(round(value)))
+
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = self.num_workers
+        # The hint is a first incumbent to improve on, not a constraint.
+        solver.parameters.fix_variables_to_their_hinted_value = False
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        if gap_limit:
+            solver.parameters.relative_gap_limit = gap_limit
+
+        callback = None if on_solution is None else _Incumbents(x, on_solution)
+        searching = threading.Event()
+        if should_stop is not None:
+            threading.Thread(
+                target=_stop_when, args=(should_stop, solver, searching), daemon=True
+            ).start()
+        try:
+            status = solver.solve(model, callback)
+        finally:
+            searching.set()
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return BlockSolution(values=None, objective=0.0, best_bound=np.inf)
+        return BlockSolution(
+            values=np.array([solver.value(var) for var in x], dtype=np.float64),
+            objective=solver.objective_value,
+            best_bound=solver.best_objective_bound,
+        )
+
+    def split(self, blocks: int) -> "CpSatEngine":
+        cores = self.num_workers or os.cpu_count() or 1
+        return replace(self, num_workers=max(1, cores // blocks))
+
+
+class _Incumbents(cp_model.CpSolverSolutionCallback):
+    """Hands each solution CP-SAT finds to ``on_solution``."""
+
+    def __init__(self, x: list, on_solution: Callable[[BlockSolution], None]):
+        super().__init__()
+        self._x = x
+        self._on_solution = on_solution
+
+    def on_solution_callback(self) -> None:
+        self._on_solution(
+            BlockSolution(
+                values=np.array([self.value(var) for var in self._x], dtype=np.float64),
+                objective=self.objective_value,
+                best_bound=self.best_objective_bound,
+            )
+        )
+
+
+def _stop_when(should_stop: Callable[[], bool], solver: cp_model.CpSolver, done: threading.Event):
+    """Thread: end ``solver``'s search once ``should_stop`` returns True."""
+    while not done.wait(STOP_POLL_SECONDS):
+        if should_stop():
+            solver.stop_search()
+            return
+
+
+ENGINES: dict[str, type[SolverEngine]] = {
+    ScipEngine.name: ScipEngine,
+    CpSatEngine.name: CpSatEngine,
+}
+
+
+def get_engine(name: str | None = None, num_workers: int | None = None) -> SolverEngine:
+    """Engine by name (default: ``EQUIPROUTE_SOLVER_ENGINE`` or ``scip``)."""
+    name = name or DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown solver engine: {name}")
+    if name == CpSatEngine.name and num_workers is not None:
+        return CpSatEngine(num_workers=num_workers)
+    return ENGINES[name]()
@@ -0,0 +1,96 @@
+"""Fast heuristics: first-fit packing, dual-priced greedy and the LP bound.
+
+The preview mode needs an answer in well under a second, so instead of the
+ILP it packs schools greedily and brackets the result with the LP
+relaxation:
+
+  - the LP relaxation (PDLP) gives a proven upper bound on students served,
+    and its SKU duals price how scarce each SKU really is;
+  - schools are ranked by how fully the LP takes them, then by students per
+    unit of priced stock, and packed first-fit, taking as many members of a
+    merged row as still fit.
+"""
+
+import numpy as np
+from ortools.linear_solver.python import model_builder_helper as mbh
+
+from .matrix import DemandMatrix
+from .model import build_model
+
+
+def first_fit(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    order: np.ndarray,
+    upper: np.ndarray | None = None,
+) -> np.ndarray:
+    """Pack rows in ``order``, each as many times (≤ upper) as still fits."""
+    demand = matrix.demand
+    remaining = caps.astype(np.int64).copy()
+    x = np.zeros(matrix.n_schools, dtype=np.int64)
+    for j in order:
+        cols = demand.indices[demand.indptr[j] : demand.indptr[j + 1]]
+        qty = demand.data[demand.indptr[j] : demand.indptr[j + 1]]
+        take = 1 if upper is None else int(upper[j])
+        if len(cols):
+            take = min(take, int((remaining[cols] // qty).min()))
+        if take > 0:
+            remaining[cols] -= take * qty
+            x[j] = take
+    return x
+
+
+def lp_relaxation(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    upper: np.ndarray,
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """Return (upper bound, LP values, SKU prices) of the relaxed model.
+
+    The LP is solved with PDLP, which is approximate, so the bound is not
+    its objective but the Lagrangian dual value at the returned prices λ ≥ 0:
+
+        cap·λ + Σ_j upper_j · max(0, students_j − demand_j·λ)
+
+    which is a valid upper bound for any λ ≥ 0 and equals the LP optimum at
+    the optimal duals.
+    """
+    if matrix.n_schools == 0:
+        return 0.0, np.zeros(0), np.zeros(matrix.n_skus)
+
+    solver = mbh.ModelSolverHelper("pdlp")
+    solver.solve(build_model(matrix, caps, upper=upper, integral=False))
+    if solver.status() not in (mbh.SolveStatus.OPTIMAL, mbh.SolveStatus.FEASIBLE):
+        prices = np.zeros(matrix.n_skus)
+        values = np.zeros(matrix.n_schools)
+    else:
+        prices = np.maximum(solver.dual_values(), 0.0)
+        values = solver.variable_values()
+
+    reduced_profit = np.maximum(matrix.students - matrix.demand @ prices, 0.0)
+    bound = float(caps @ prices + upper @ reduced_profit)
+    return bound, values, prices
+
+
+def greedy_selection(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    upper: np.ndarray,
+    lp_values: np.ndarray,
+    prices: np.ndarray,
+) -> np.ndarray:
+    """LP-guided first-fit.
+
+    Rows are packed by how fully the LP relaxation takes them, ties broken
+    by density: students per unit of priced scarce stock.
+    """
+    if matrix.n_schools == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # 1/cap keeps SKUs with a zero dual from being treated as free
+    weights = prices + 1.0 / np.maximum(caps, 1)
+    cost = matrix.demand @ weights
+    density = matrix.students / np.maximum(cost, 1e-12)
+    taken = np.round(lp_values / np.maximum(upper, 1), 3)
+    order = np.lexsort((-density, -taken))
+    return first_fit(matrix, caps, order, upper)
@@ -0,0 +1,101 @@
+"""Sparse School × SKU demand matrix.
+
+Every student needs exactly one shirt, one pants/skirt and one pair of shoes,
+so a school only ever touches a handful of the ~200 SKUs in the catalog.
+Storing demand as a CSR matrix (one row per school, one column per SKU) keeps
+everything downstream proportional to the number of nonzero demand entries
+instead of schools × SKUs.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from scipy import sparse
+
+from .demand import SchoolDemandProfile
+
+
+@dataclass
+class DemandMatrix:
+    school_ids: list[str]
+    sku_ids: list[str]
+    sku_index: dict[str, int]
+    students: np.ndarray  # (n_schools,) total_students per school
+    demand: sparse.csr_matrix  # (n_schools, n_skus) units needed
+
+    @property
+    def n_schools(self) -> int:
+        return len(self.school_ids)
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.sku_ids)
+
+    @property
+    def nnz(self) -> int:
+        return self.demand.nnz
+
+    def take(self, rows: np.ndarray, cols: np.ndarray) -> "DemandMatrix":
+        """Sub-matrix restricted to the given school rows and SKU columns."""
+        sku_ids = [self.sku_ids[j] for j in cols]
+        return DemandMatrix(
+            school_ids=[self.school_ids[i] for i in rows],
+            sku_ids=sku_ids,
+            sku_index={sku: j for j, sku in enumerate(sku_ids)},
+            students=self.students[rows],
+            demand=self.demand[rows][:, cols].tocsr(),
+        )
+
+    def stock(self, inventory: dict[str, int]) -> np.ndarray:
+        """Stock per SKU column (0 for SKUs missing from inventory)."""
+        return np.array(
+            [inventory.get(sku, 0) for sku in self.sku_ids], dtype=np.int64
+        )
+
+    def caps(self, inventory: dict[str, int], safety_factor: float) -> np.ndarray:
+        """Usable units per SKU column: int(stock × safety_factor)."""
+        return np.array(
+            [int(inventory.get(sku, 0) * safety_factor) for sku in self.sku_ids],
+            dtype=np.int64,
+        )
+
+
+def build_demand_matrix(profiles: dict[str, SchoolDemandProfile]) -> DemandMatrix:
+    """Turn demand profiles into a CSR matrix in a single pass over the nonzeros.
+
+    Rows follow the iteration order of ``profiles``; SKU columns are sorted so
+    the layout is deterministic for a given input.
+    """
+    school_ids = list(profiles.keys())
+    sku_ids = sorted({sku for p in profiles.values() for sku in p.sku_demand})
+    sku_index = {sku: j for j, sku in enumerate(sku_ids)}
+
+    indptr = np.zeros(len(school_ids) + 1, dtype=np.int64)
+    indices: list[int] = []
+    data: list[int] = []
+    for row, sid in enumerate(school_ids):
+        for sku, qty in profiles[sid].sku_demand.items():
+            if qty:
+                indices.append(sku_index[sku])
+                data.append(qty)
+        indptr[row + 1] = len(indices)
+
+    demand = sparse.csr_matrix(
+        (
+            np.asarray(data, dtype=np.int64),
+            np.asarray(indices, dtype=np.int32),
+            indptr,
+        ),
+        shape=(len(school_ids), len(sku_ids)),
+    )
+    students = np.array(
+        [profiles[sid].total_students for sid in school_ids], dtype=np.int64
+    )
+
+    return DemandMatrix(
+        school_ids=school_ids,
+        sku_ids=sku_ids,
+        sku_index=sku_index,
+        students=students,
+        demand=demand,
+    )
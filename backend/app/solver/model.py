@@ -0,0 +1,52 @@
+"""Bulk ILP model construction from a DemandMatrix.
+
+The whole model is loaded in one call to OR-Tools' sparse loader: variable
+bounds, objective and constraint rows are passed as NumPy arrays plus a CSR
+constraint matrix, so only the nonzero demand coefficients are ever emitted.
+
+Model layout:
+  - variable j   → binary "school j is served" (or a count, after presolve)
+  - objective    → maximize Σ students[j] · x[j]
+  - constraint i → Σ demand[j, i] · x[j] ≤ cap[i]   (one row per SKU)
+"""
+
+import numpy as np
+from ortools.linear_solver.python import model_builder_helper as mbh
+
+from .matrix import DemandMatrix
+
+
+def build_model(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    upper: np.ndarray | None = None,
+    hint: np.ndarray | None = None,
+    integral: bool = True,
+) -> mbh.ModelBuilderHelper:
+    """Build the school-selection ILP for ``matrix`` with per-SKU ``caps``.
+
+    ``upper`` gives per-row variable upper bounds (default 1, i.e. binary);
+    presolve uses it for rows that stand for several identical schools.
+    ``hint`` is an optional feasible starting solution passed to the solver.
+    ``integral=False`` builds the LP relaxation instead.
+    """
+    n = matrix.n_schools
+    m = matrix.n_skus
+
+    model = mbh.ModelBuilderHelper()
+    model.fill_model_from_sparse_data(
+        np.zeros(n),
+        np.ones(n) if upper is None else upper.astype(np.float64),
+        matrix.students.astype(np.float64),
+        np.full(m, -np.inf),
+        caps.astype(np.float64),
+        matrix.demand.T.tocsr().astype(np.float64),
+    )
+    if integral:
+        for j in range(n):
+            model.set_var_integrality(j, True)
+    if hint is not None:
+        for j, value in enumerate(hint.tolist()):
+            model.add_hint(j, float(value))
+    model.set_maximize(True)
+    return model
@@ -6,13 +6,31 @@ the total number of students served, subject to:
   - Each school is all-or-nothing (FR3)
 """
 
+import os
+import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 
-from ortools.linear_solver import pywraplp
+import numpy as np
 
 from .demand import SchoolDemandProfile
+from .matrix import DemandMatrix, build_demand_matrix
+from .decompose import (
+    DecompositionStats,
+    Solution,
+    SolveLimits,
+    SolveProgress,
+    solve_decomposed,
+)
+from .engines import SolverEngine, get_engine
+from .heuristic import greedy_selection, lp_relaxation
+from .presolve import PresolveStats, presolve
+from .sensitivity import SensitivityReport, analyze_sensitivity
+from .warmstart import WarmStartReport, repair_selection
 
 SAFETY_FACTOR = 0.90
+# Largest excluded schools covered by the shortage report
+SHORTAGE_SCHOOLS = int(os.environ.get("EQUIPROUTE_SHORTAGE_SCHOOLS", "5"))
 
 
 @dataclass
@@ -44,135 +62,289 @@ class SolverResult:
     selection: SelectionReport
     inventory_impact: list[InventoryImpactItem]
     shortages: list[ShortageItem]
+    # "FEASIBLE" when stopped by a limit; "HEURISTIC" for previews, and when a
+    # limit came before the engine beat its starting selection
+    status: str = "OPTIMAL"
+    engine: str = ""
+    progress: SolveProgress | None = None
+    presolve: PresolveStats | None = None
+    decomposition: DecompositionStats | None = None
+    warm_start: WarmStartReport | None = None
+    sensitivity: SensitivityReport | None = None
+    solve_seconds: float = 0.0
 
 
 def solve(
     profiles: dict[str, SchoolDemandProfile],
     inventory: dict[str, int],
+    max_workers: int | None = None,
+    warm_start: list[str] | None = None,
+    limits: SolveLimits | None = None,
+    on_incumbent: Callable[[SolverResult], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    engine: SolverEngine | None = None,
+    safety_factor: float = SAFETY_FACTOR,
+    matrix: DemandMatrix | None = None,
+    shortage_schools: int = SHORTAGE_SCHOOLS,
+    sensitivity: bool = False,
 ) -> SolverResult:
     """Run the ILP solver and produce all three output reports.
 
     Args:
         profiles: school_id → SchoolDemandProfile (from aggregate_demand)
         inventory: sku_id → total_stock_available
+        max_workers: process-pool size for independent components
+            (default: one per CPU)
+        warm_start: school_ids selected by a previous run, repaired and
+            passed to the solver as a starting solution when it serves at
+            least as many students as the preview's greedy selection, which
+            is the starting solution otherwise
+        limits: optional time and relative-gap limits
+        on_incumbent: called with a partial SolverResult (status
+            "FEASIBLE") whenever the incumbent or bound improves: during
+            the search with CP-SAT, once with the final result with SCIP
+        should_stop: returning True finishes early with the best incumbent
+            found so far; CP-SAT polls it during its search, SCIP cannot be
+            interrupted and ends at its limits
+        engine: ILP engine (default: ``get_engine()``)
+        safety_factor: share of each SKU's stock that may be allocated
+        matrix: prebuilt demand matrix for ``profiles``, when the caller
+            solves several scenarios over the same demand
+        shortage_schools: how many of the largest excluded schools the
+            shortage report covers
+        sensitivity: also report, per binding SKU, the extra stock that
+            unlocks the next excluded school (see ``sensitivity.py``)
     """
-    solver = pywraplp.Solver.CreateSolver("SCIP")
-    if solver is None:
-        raise RuntimeError("SCIP solver not available")
+    engine = engine or get_engine()
+
+    # --- Sparse School × SKU demand matrix → presolve → per-component ILPs ---
+    if matrix is None:
+        matrix = build_demand_matrix(profiles)
+    caps = matrix.caps(inventory, safety_factor)
+    reduced = presolve(matrix, caps)
+    fixed_in_students = int(matrix.students[reduced.fixed_in].sum())
+
+    # --- Starting solution: the preview's greedy, or the repaired warm start ---
+    # It is the fallback incumbent too: a time limit that comes before the
+    # engine finds anything returns it instead of an empty selection.
+    started = time.perf_counter()
+    _, lp_values, prices = lp_relaxation(reduced.matrix, reduced.caps, reduced.counts)
+    hint = greedy_selection(reduced.matrix, reduced.caps, reduced.counts, lp_values, prices)
+    warm_report = None
+    if warm_start is not None:
+        x0, warm_report = repair_selection(matrix, caps, warm_start)
+        x0 = reduced.compress(x0)
+        students = reduced.matrix.students
+        warm_report.used = warm_report.used and students @ x0 >= students @ hint
+        if warm_report.used:
+            hint = x0
+
+    def build(solution: Solution, status: str, **extra) -> SolverResult:
+        return _build_result(
+            matrix,
+            reduced.expand(solution.values),
+            inventory,
+            safety_factor,
+            shortage_schools,
+            status=status,
+            engine=engine.name,
+            progress=solution.progress.shifted(fixed_in_students),
+            presolve=reduced.stats,
+            warm_start=warm_report,
+            **extra,
+        )
 
-    school_ids = list(profiles.keys())
+    # --- Solve ---
+    solution, decomposition = solve_decomposed(
+        reduced.matrix,
+        reduced.caps,
+        upper=reduced.counts,
+        max_workers=max_workers,
+        hint=hint,
+        limits=limits,
+        on_incumbent=(
+            None
+            if on_incumbent is None
+            else lambda partial: on_incumbent(build(partial, "FEASIBLE"))
+        ),
+        should_stop=should_stop,
+        engine=engine,
+    )
+    solve_seconds = round(time.perf_counter() - started, 4)
+
+    if solution.progress.gap == 0:
+        status = "OPTIMAL"
+    else:
+        status = "FEASIBLE" if solution.improved else "HEURISTIC"
+    return build(
+        solution,
+        status,
+        decomposition=decomposition,
+        sensitivity=(
+            analyze_sensitivity(
+                matrix,
+                inventory,
+                safety_factor,
+                reduced.expand(solution.values),
+                engine=engine,
+                max_workers=max_workers,
+            )
+            if sensitivity
+            else None
+        ),
+        solve_seconds=solve_seconds,
+    )
 
-    # --- Decision variables: binary per school ---
-    x: dict[str, pywraplp.Variable] = {}
-    for sid in school_ids:
-        x[sid] = solver.BoolVar(sid)
 
-    # --- Objective: maximize total students served ---
-    solver.Maximize(
-        solver.Sum(profiles[sid].total_students * x[sid] for sid in school_ids)
-    )
+def preview(
+    profiles: dict[str, SchoolDemandProfile],
+    inventory: dict[str, int],
+    shortage_schools: int = SHORTAGE_SCHOOLS,
+) -> SolverResult:
+    """Heuristic answer in the same shape as ``solve``, without the ILP.
 
-    # --- Constraints: per-SKU demand ≤ 90% of stock ---
-    all_skus: set[str] = set()
-    for p in profiles.values():
-        all_skus.update(p.sku_demand.keys())
+    Selection comes from the LP-guided greedy; ``progress.best_bound`` is
+    the LP-relaxation bound and ``progress.gap`` how far the preview can be
+    from the true optimum at most.
+    """
+    started = time.perf_counter()
+    matrix = build_demand_matrix(profiles)
+    reduced = presolve(matrix, matrix.caps(inventory, SAFETY_FACTOR))
+    fixed_in_students = int(matrix.students[reduced.fixed_in].sum())
 
-    for sku in all_skus:
-        cap = int(inventory.get(sku, 0) * SAFETY_FACTOR)
-        solver.Add(
-            solver.Sum(
-                profiles[sid].sku_demand.get(sku, 0) * x[sid] for sid in school_ids
-            )
-            <= cap
-        )
+    lp_bound, lp_values, prices = lp_relaxation(
+        reduced.matrix, reduced.caps, reduced.counts
+    )
+    counts = greedy_selection(
+        reduced.matrix, reduced.caps, reduced.counts, lp_values, prices
+    )
 
-    # --- Solve ---
-    status = solver.Solve()
+    objective = int(reduced.matrix.students @ counts) + fixed_in_students
+    bound = max(int(np.floor(lp_bound + 1e-6)) + fixed_in_students, objective)
+    elapsed = round(time.perf_counter() - started, 4)
+
+    return _build_result(
+        matrix,
+        reduced.expand(counts),
+        inventory,
+        SAFETY_FACTOR,
+        shortage_schools,
+        status="HEURISTIC",
+        engine="greedy",
+        progress=SolveProgress(
+            objective=objective,
+            best_bound=bound,
+            gap=round((bound - objective) / bound if bound > 0 else 0.0, 6),
+            elapsed_seconds=elapsed,
+            rounds=0,
+        ),
+        presolve=reduced.stats,
+        solve_seconds=elapsed,
+    )
 
-    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
-        return SolverResult(
-            selection=SelectionReport(selected_school_ids=[], total_students_served=0),
-            inventory_impact=[],
-            shortages=_build_shortage_report([], profiles, inventory),
-        )
 
-    selected = [sid for sid in school_ids if x[sid].solution_value() > 0.5]
-    total_served = sum(profiles[sid].total_students for sid in selected)
-
-    # --- Inventory Impact Report ---
-    sku_allocated: dict[str, int] = {}
-    for sid in selected:
-        for sku, qty in profiles[sid].sku_demand.items():
-            sku_allocated[sku] = sku_allocated.get(sku, 0) + qty
-
-    impact: list[InventoryImpactItem] = []
-    for sku in sorted(inventory.keys()):
-        stock = inventory[sku]
-        alloc = sku_allocated.get(sku, 0)
-        remaining = stock - alloc
-        usage_pct = (alloc / stock * 100) if stock > 0 else 0.0
-        impact.append(
-            InventoryImpactItem(
-                sku_id=sku,
-                total_stock=stock,
-                allocated=alloc,
-                remaining=remaining,
-                usage_pct=round(usage_pct, 2),
-            )
-        )
+def _build_result(
+    matrix: DemandMatrix,
+    rows: np.ndarray,
+    inventory: dict[str, int],
+    safety_factor: float,
+    shortage_schools: int = SHORTAGE_SCHOOLS,
+    **extra,
+) -> SolverResult:
+    """Assemble the selection, inventory impact and shortage reports.
 
-    # --- Shortage Report ---
-    shortages = _build_shortage_report(selected, profiles, inventory)
+    ``rows`` are the selected row indices of ``matrix``. Usage per SKU is a
+    single sparse product over the selected rows, so report cost stays
+    proportional to the demand nonzeros.
+    """
+    selected = np.zeros(matrix.n_schools, dtype=bool)
+    selected[rows] = True
+    sku_used = matrix.demand.T @ selected.astype(np.int64)
 
     return SolverResult(
         selection=SelectionReport(
-            selected_school_ids=selected,
-            total_students_served=total_served,
+            selected_school_ids=[matrix.school_ids[j] for j in rows],
+            total_students_served=int(matrix.students[selected].sum()),
+        ),
+        inventory_impact=_build_impact_report(matrix, sku_used, inventory),
+        shortages=_build_shortage_report(
+            matrix, selected, sku_used, inventory, safety_factor, shortage_schools
         ),
-        inventory_impact=impact,
-        shortages=shortages,
+        **extra,
     )
 
 
+def _build_impact_report(
+    matrix: DemandMatrix,
+    sku_used: np.ndarray,
+    inventory: dict[str, int],
+) -> list[InventoryImpactItem]:
+    """Allocated vs. total stock for every inventory SKU."""
+    skus = sorted(inventory.keys())
+    stock = np.array([inventory[sku] for sku in skus], dtype=np.int64)
+    cols = np.array([matrix.sku_index.get(sku, -1) for sku in skus], dtype=np.int64)
+    known = cols >= 0
+    allocated = np.zeros(len(skus), dtype=np.int64)
+    allocated[known] = sku_used[cols[known]]
+    usage_pct = (
+        np.divide(allocated, stock, out=np.zeros(len(skus)), where=stock > 0) * 100
+    ).round(2)
+
+    return [
+        InventoryImpactItem(
+            sku_id=sku,
+            total_stock=total,
+            allocated=alloc,
+            remaining=total - alloc,
+            usage_pct=pct,
+        )
+        for sku, total, alloc, pct in zip(
+            skus, stock.tolist(), allocated.tolist(), usage_pct.tolist()
+        )
+    ]
+
+
 def _build_shortage_report(
-    selected: list[str],
-    profiles: dict[str, SchoolDemandProfile],
+    matrix: DemandMatrix,
+    selected: np.ndarray,
+    sku_used: np.ndarray,
     inventory: dict[str, int],
+    safety_factor: float = SAFETY_FACTOR,
+    shortage_schools: int = SHORTAGE_SCHOOLS,
 ) -> list[ShortageItem]:
-    """Find bottleneck SKUs for the largest excluded school."""
-    excluded = [
-        sid
-        for sid in profiles
-        if sid not in selected
-    ]
-    if not excluded:
-        return []
+    """Find bottleneck SKUs for the ``shortage_schools`` largest excluded schools.
 
-    # Sort excluded schools by total_students descending — report on the largest
-    excluded.sort(key=lambda sid: profiles[sid].total_students, reverse=True)
-    target = excluded[0]
-
-    # Compute remaining stock after serving selected schools
-    sku_used: dict[str, int] = {}
-    for sid in selected:
-        for sku, qty in profiles[sid].sku_demand.items():
-            sku_used[sku] = sku_used.get(sku, 0) + qty
-
-    shortages: list[ShortageItem] = []
-    for sku, demand in profiles[target].sku_demand.items():
-        stock = inventory.get(sku, 0)
-        cap = int(stock * SAFETY_FACTOR)
-        available = cap - sku_used.get(sku, 0)
-        if demand > available:
-            shortages.append(
-                ShortageItem(
-                    sku_id=sku,
-                    school_id=target,
-                    demand=demand,
-                    available_after_allocation=max(available, 0),
-                    deficit=demand - available,
-                )
-            )
+    Items are grouped by school (largest first) and sorted by deficit within
+    each school.
+    """
+    excluded = np.flatnonzero(~selected)
+    if len(excluded) == 0 or shortage_schools <= 0:
+        return []
 
-    shortages.sort(key=lambda s: s.deficit, reverse=True)
-    return shortages
+    # Largest excluded schools first; ties keep matrix (profile) order
+    order = np.argsort(-matrix.students[excluded], kind="stable")
+    targets = excluded[order[:shortage_schools]]
+
+    available = matrix.caps(inventory, safety_factor) - sku_used
+    block = matrix.demand[targets].tocoo()
+    short = block.data > available[block.col]
+    rank, cols, demand = block.row[short], block.col[short], block.data[short]
+    deficit = demand - available[cols]
+    order = np.lexsort((-deficit, rank))
+
+    return [
+        ShortageItem(
+            sku_id=matrix.sku_ids[col],
+            school_id=matrix.school_ids[targets[r]],
+            demand=qty,
+            available_after_allocation=max(avail, 0),
+            deficit=gap,
+        )
+        for r, col, qty, avail, gap in zip(
+            rank[order].tolist(),
+            cols[order].tolist(),
+            demand[order].tolist(),
+            available[cols[order]].tolist(),
+            deficit[order].tolist(),
+        )
+    ]
@@ -0,0 +1,129 @@
+"""Instance reduction before the ILP (presolve).
+
+Three reductions, applied in this order on the sparse demand matrix:
+
+  1. Fix to 0 every school that exceeds some SKU cap on its own — it can
+     never be served, whatever else is selected.
+  2. Drop every SKU constraint that cannot bind: the remaining schools'
+     total demand for it already fits under the cap. Schools left with no
+     binding SKU are fixed to 1.
+  3. Merge schools with identical (students, demand vector) rows into one
+     integer variable 0 ≤ y ≤ count. Real campaigns have many identical
+     small rural schools, so this is usually the largest reduction.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .matrix import DemandMatrix
+
+
+@dataclass
+class PresolveStats:
+    variables_removed: int
+    constraints_removed: int
+    schools_fixed_out: int
+    schools_fixed_in: int
+    schools_merged: int
+
+
+@dataclass
+class PresolvedInstance:
+    """Reduced model input plus the bookkeeping to map a solution back.
+
+    Row ``k`` of ``matrix`` stands for the schools in ``groups[k]`` (row
+    indices into the original matrix); its variable is an integer in
+    ``[0, counts[k]]``.
+    """
+
+    matrix: DemandMatrix
+    caps: np.ndarray
+    counts: np.ndarray
+    groups: list[list[int]]
+    fixed_in: list[int]
+    fixed_out: list[int]
+    stats: PresolveStats
+
+    def expand(self, group_values: np.ndarray) -> list[int]:
+        """Original row indices selected by a reduced solution, in row order."""
+        rows = list(self.fixed_in)
+        for members, value in zip(self.groups, group_values):
+            rows.extend(members[: int(round(value))])
+        return sorted(rows)
+
+    def compress(self, x: np.ndarray) -> np.ndarray:
+        """Map a 0/1 vector over original rows onto the reduced variables."""
+        return np.array([x[members].sum() for members in self.groups], dtype=np.int64)
+
+
+def presolve(matrix: DemandMatrix, caps: np.ndarray) -> PresolvedInstance:
+    """Reduce ``matrix`` under per-SKU ``caps`` (see module docstring)."""
+    demand = matrix.demand
+    n = matrix.n_schools
+
+    # 1. Schools that break a cap by themselves
+    over_cap = demand.data > caps[demand.indices]
+    row_of_nz = np.repeat(np.arange(n), np.diff(demand.indptr))
+    infeasible = np.zeros(n, dtype=bool)
+    infeasible[row_of_nz[over_cap]] = True
+    live_rows = np.flatnonzero(~infeasible)
+
+    # 2. SKUs whose total demand (over schools still in play) fits the cap
+    live = demand[live_rows]
+    column_totals = np.asarray(live.sum(axis=0)).ravel()
+    binding = (column_totals > caps) & (column_totals > 0)
+    binding_cols = np.flatnonzero(binding)
+    reduced = live[:, binding_cols].tocsr()
+    reduced.sort_indices()
+
+    touches_binding = np.diff(reduced.indptr) > 0
+    fixed_in = live_rows[~touches_binding].tolist()
+    candidate_rows = live_rows[touches_binding]
+    reduced = reduced[touches_binding]
+
+    # 3. Merge identical rows
+    group_index: dict[tuple, int] = {}
+    groups: list[list[int]] = []
+    keys: list[int] = []
+    for k, row in enumerate(candidate_rows):
+        start, end = reduced.indptr[k], reduced.indptr[k + 1]
+        key = (
+            int(matrix.students[row]),
+            reduced.indices[start:end].tobytes(),
+            reduced.data[start:end].tobytes(),
+        )
+        g = group_index.get(key)
+        if g is None:
+            g = group_index[key] = len(groups)
+            groups.append([])
+            keys.append(k)
+        groups[g].append(int(row))
+
+    representatives = [members[0] for members in groups]
+    sku_ids = [matrix.sku_ids[j] for j in binding_cols]
+    reduced_matrix = DemandMatrix(
+        school_ids=[matrix.school_ids[row] for row in representatives],
+        sku_ids=sku_ids,
+        sku_index={sku: j for j, sku in enumerate(sku_ids)},
+        students=matrix.students[representatives],
+        demand=reduced[np.asarray(keys, dtype=np.int64)],
+    )
+
+    stats = PresolveStats(
+        variables_removed=n - len(groups),
+        constraints_removed=matrix.n_skus - len(binding_cols),
+        schools_fixed_out=int(infeasible.sum()),
+        schools_fixed_in=len(fixed_in),
+        schools_merged=len(candidate_rows) - len(groups),
+    )
+
+    return PresolvedInstance(
+        matrix=reduced_matrix,
+        caps=caps[binding_cols],
+        counts=np.array([len(members) for members in groups], dtype=np.int64),
+        groups=groups,
+        fixed_in=fixed_in,
+        fixed_out=np.flatnonzero(infeasible).tolist(),
+        stats=stats,
+    )
@@ -0,0 +1,130 @@
+"""Batched what-if scenarios over one demand snapshot.
+
+Planners compare the same demand against several inventory variants and
+safety factors. Demand is aggregated and turned into a DemandMatrix once;
+the matrix is handed to each pool worker once (via the pool initializer)
+and every scenario then only differs in its caps.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from .decompose import SolveLimits
+from .demand import SchoolDemandProfile
+from .engines import SolverEngine, get_engine
+from .matrix import DemandMatrix, build_demand_matrix
+from .optimizer import SAFETY_FACTOR, SolverResult, solve
+
+
+@dataclass
+class Scenario:
+    name: str
+    safety_factor: float = SAFETY_FACTOR
+    inventory: dict[str, int] = field(default_factory=dict)  # absolute stock overrides
+    shipment: dict[str, int] = field(default_factory=dict)  # units added on top
+
+    def apply(self, inventory: dict[str, int]) -> dict[str, int]:
+        """Base inventory with this scenario's overrides and shipment applied."""
+        stock = {**inventory, **self.inventory}
+        for sku, qty in self.shipment.items():
+            stock[sku] = stock.get(sku, 0) + qty
+        return stock
+
+
+@dataclass
+class ScenarioSummary:
+    name: str
+    safety_factor: float
+    total_students_served: int
+    schools_selected: int
+    students_delta: int  # vs. the first scenario
+    status: str
+    gap: float
+    solve_seconds: float
+
+
+@dataclass
+class ScenarioBatchResult:
+    comparison: list[ScenarioSummary]
+    scenarios: dict[str, SolverResult]
+
+
+# Shared demand snapshot, installed once per pool worker by _init_worker
+_profiles: dict[str, SchoolDemandProfile] = {}
+_matrix: DemandMatrix | None = None
+
+
+def _init_worker(profiles: dict[str, SchoolDemandProfile], matrix: DemandMatrix) -> None:
+    global _profiles, _matrix
+    _profiles, _matrix = profiles, matrix
+
+
+def _solve_scenario(
+    inventory: dict[str, int],
+    safety_factor: float,
+    limits: SolveLimits | None,
+    engine: SolverEngine,
+) -> SolverResult:
+    return solve(
+        _profiles,
+        inventory,
+        max_workers=1,
+        limits=limits,
+        engine=engine,
+        safety_factor=safety_factor,
+        matrix=_matrix,
+    )
+
+
+def solve_scenarios(
+    profiles: dict[str, SchoolDemandProfile],
+    inventory: dict[str, int],
+    scenarios: list[Scenario],
+    limits: SolveLimits | None = None,
+    engine: SolverEngine | None = None,
+    max_workers: int | None = None,
+) -> ScenarioBatchResult:
+    """Solve every scenario against one shared demand matrix, in parallel."""
+    matrix = build_demand_matrix(profiles)
+    workers = min(len(scenarios), max_workers or os.cpu_count() or 1)
+    engine = (engine or get_engine()).split(max(workers, 1))
+    calls = [(s.apply(inventory), s.safety_factor, limits, engine) for s in scenarios]
+
+    results: dict[str, SolverResult] = {}
+    if workers <= 1:
+        for scenario, (stock, safety_factor, _, _) in zip(scenarios, calls):
+            results[scenario.name] = solve(
+                profiles,
+                stock,
+                max_workers=max_workers,
+                limits=limits,
+                engine=engine,
+                safety_factor=safety_factor,
+                matrix=matrix,
+            )
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(profiles, matrix),
+        ) as pool:
+            futures = [pool.submit(_solve_scenario, *call) for call in calls]
+            for scenario, future in zip(scenarios, futures):
+                results[scenario.name] = future.result()
+
+    baseline = results[scenarios[0].name].selection.total_students_served if scenarios else 0
+    comparison = [
+        ScenarioSummary(
+            name=s.name,
+            safety_factor=s.safety_factor,
+            total_students_served=results[s.name].selection.total_students_served,
+            schools_selected=len(results[s.name].selection.selected_school_ids),
+            students_delta=results[s.name].selection.total_students_served - baseline,
+            status=results[s.name].status,
+            gap=results[s.name].progress.gap,
+            solve_seconds=results[s.name].solve_seconds,
+        )
+        for s in scenarios
+    ]
+    return ScenarioBatchResult(comparison=comparison, scenarios=results)
@@ -0,0 +1,235 @@
+"""Marginal-stock sensitivity: how many units unlock the next school.
+
+When a school is excluded, procurement wants to know which SKU purchases
+would help most. For every binding SKU — one an excluded school needs more
+of than is left after the current selection — this stage reports:
+
+  - the LP shadow price of the SKU (students per extra usable unit), from
+    the duals of the LP relaxation;
+  - the extra stock needed to admit the next excluded school, found with
+    one vectorized scan: an excluded school that is short on that SKU
+    alone is admitted by buying exactly its deficit;
+  - the students that purchase would gain.
+
+The scan keeps the current selection fixed, so it only gives a lower bound
+on the gain. The most promising SKUs (by scan gain, then shadow price ×
+units) are re-solved incrementally: a small ILP over the schools around the
+SKU, with the cap raised, the rest of the selection fixed and the current
+selection as the hint. That also catches gains from swapping schools, and
+every reported gain stays achievable. Re-solves run side by side on a
+process pool with a time limit each, so hundreds of binding SKUs cost one
+scan plus ``resolve_top`` small ILPs instead of one full ILP per SKU.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engines import SolverEngine, get_engine
+from .heuristic import lp_relaxation
+from .matrix import DemandMatrix
+from .presolve import presolve
+
+RESOLVE_TOP = 20  # binding SKUs confirmed with an ILP re-solve
+RESOLVE_TIME_LIMIT = 0.5  # seconds per re-solve
+NEIGHBOURHOOD_SIZE = 300  # schools freed per re-solve (beyond the SKU's own users)
+
+
+@dataclass
+class SensitivityItem:
+    sku_id: str
+    stock: int
+    usable: int  # int(stock × safety_factor)
+    allocated: int
+    shadow_price: float  # LP dual: students per extra usable unit
+    units_needed: int  # extra stock to buy
+    next_school_id: str | None
+    students_gained: int
+    resolved: bool  # gain confirmed by an ILP re-solve, not just the scan
+
+
+@dataclass
+class SensitivityReport:
+    items: list[SensitivityItem]
+    binding_skus: int
+    resolves: int
+    elapsed_seconds: float
+
+
+def analyze_sensitivity(
+    matrix: DemandMatrix,
+    inventory: dict[str, int],
+    safety_factor: float,
+    selected_rows: list[int] | np.ndarray,
+    engine: SolverEngine | None = None,
+    resolve_top: int = RESOLVE_TOP,
+    resolve_time_limit: float = RESOLVE_TIME_LIMIT,
+    max_workers: int | None = None,
+) -> SensitivityReport:
+    """Marginal value of extra stock for every binding SKU.
+
+    Items are sorted by students gained, then by fewest units needed.
+    """
+    started = time.perf_counter()
+    stock = matrix.stock(inventory)
+    caps = matrix.caps(inventory, safety_factor)
+    selected = np.zeros(matrix.n_schools, dtype=bool)
+    selected[selected_rows] = True
+    used = matrix.demand.T @ selected.astype(np.int64)
+    available = caps - used
+
+    # --- Short entries of excluded schools: (school, SKU, missing units) ---
+    excluded = np.flatnonzero(~selected)
+    block = matrix.demand[excluded].tocoo()
+    short = block.data > available[block.col]
+    rows = excluded[block.row[short]]
+    cols = block.col[short].astype(np.int64)
+    missing = block.data[short] - available[cols]
+    binding = np.unique(cols)
+    if len(binding) == 0:
+        return SensitivityReport([], 0, 0, round(time.perf_counter() - started, 4))
+
+    # Minimal shortfall per binding SKU (what a re-solve gets to work with)
+    delta = np.full(matrix.n_skus, np.iinfo(np.int64).max)
+    np.minimum.at(delta, cols, missing)
+
+    # --- Scan: schools short on exactly one SKU are admitted by buying it ---
+    blockers = np.bincount(rows, minlength=matrix.n_schools)
+    single = blockers[rows] == 1
+    s_rows, s_cols, s_missing = rows[single], cols[single], missing[single]
+    order = np.lexsort((-matrix.students[s_rows], s_missing, s_cols))
+    s_cols, first = np.unique(s_cols[order], return_index=True)
+    next_school = np.full(matrix.n_skus, -1)
+    gained = np.zeros(matrix.n_skus, dtype=np.int64)
+    next_school[s_cols] = s_rows[order][first]
+    gained[s_cols] = matrix.students[next_school[s_cols]]
+    delta[s_cols] = s_missing[order][first]
+
+    prices = _shadow_prices(matrix, caps)
+
+    # --- Targeted re-solves for the most promising SKUs ---
+    resolved = np.zeros(matrix.n_skus, dtype=bool)
+    ranked = binding[
+        np.lexsort((-prices[binding] * delta[binding], -gained[binding]))
+    ][:resolve_top]
+    if len(ranked):
+        by_sku = matrix.demand.tocsc()
+        calls, bases, neighbourhoods = [], [], []
+        for k in ranked.tolist():
+            # Free every school that uses SKU k or another SKU of the
+            # excluded schools short on k; the rest of the selection stays
+            # fixed and only consumes capacity.
+            users = by_sku.indices[by_sku.indptr[k] : by_sku.indptr[k + 1]]
+            near = np.unique(matrix.demand[rows[cols == k]].indices)
+            second = np.concatenate(
+                [by_sku.indices[by_sku.indptr[c] : by_sku.indptr[c + 1]] for c in near]
+            )
+            second = second[~np.isin(second, users)][: max(NEIGHBOURHOOD_SIZE - len(users), 0)]
+            free = np.union1d(users, second)
+            free_cols = np.unique(matrix.demand[free].indices)
+            fixed = selected.copy()
+            fixed[free] = False
+            sub_caps = (caps - matrix.demand.T @ fixed.astype(np.int64))[free_cols]
+            sub_caps[np.searchsorted(free_cols, k)] += delta[k]
+            hint = selected[free].astype(np.int64)
+            bases.append(int(matrix.students[free] @ hint))
+            if next_school[k] >= 0:
+                hint[np.searchsorted(free, next_school[k])] = 1
+            neighbourhoods.append(free)
+            calls.append(
+                (matrix.take(free, free_cols), sub_caps, hint, resolve_time_limit)
+            )
+
+        workers = min(len(calls), max_workers or os.cpu_count() or 1)
+        engine = (engine or get_engine()).split(workers)
+        if workers <= 1:
+            results = [_resolve(*call, engine) for call in calls]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_resolve, *zip(*calls), [engine] * len(calls)))
+
+        for k, base, free, result in zip(ranked.tolist(), bases, neighbourhoods, results):
+            if result is None or result[0] - base < gained[k]:
+                continue
+            objective, new_rows = result
+            resolved[k] = True
+            if objective - base > gained[k] or next_school[k] < 0:
+                rows_now = free[new_rows]
+                added = rows_now[~selected[rows_now]]
+                if len(added):
+                    next_school[k] = added[np.argmax(matrix.students[added])]
+            gained[k] = objective - base
+
+    # --- Extra stock so that int(stock × safety_factor) grows by delta ---
+    target = caps[binding] + delta[binding]
+    extra = np.maximum(np.ceil(target / safety_factor) - stock[binding], 0).astype(np.int64)
+    while (low := np.floor((stock[binding] + extra) * safety_factor) < target).any():
+        extra[low] += 1
+    while (
+        high := (extra > 0)
+        & (np.floor((stock[binding] + extra - 1) * safety_factor) >= target)
+    ).any():
+        extra[high] -= 1
+
+    items = [
+        SensitivityItem(
+            sku_id=matrix.sku_ids[k],
+            stock=int(stock[k]),
+            usable=int(caps[k]),
+            allocated=int(used[k]),
+            shadow_price=round(float(prices[k]), 4),
+            units_needed=int(units),
+            next_school_id=matrix.school_ids[next_school[k]] if next_school[k] >= 0 else None,
+            students_gained=int(gained[k]),
+            resolved=bool(resolved[k]),
+        )
+        for k, units in zip(binding.tolist(), extra.tolist())
+    ]
+    items.sort(key=lambda item: (-item.students_gained, item.units_needed))
+    return SensitivityReport(
+        items=items,
+        binding_skus=len(binding),
+        resolves=len(ranked),
+        elapsed_seconds=round(time.perf_counter() - started, 4),
+    )
+
+
+def _shadow_prices(matrix: DemandMatrix, caps: np.ndarray) -> np.ndarray:
+    """LP duals of the SKU constraints, mapped back to ``matrix`` columns."""
+    prices = np.zeros(matrix.n_skus)
+    reduced = presolve(matrix, caps)
+    _, _, duals = lp_relaxation(reduced.matrix, reduced.caps, reduced.counts)
+    for sku, price in zip(reduced.matrix.sku_ids, duals.tolist()):
+        prices[matrix.sku_index[sku]] = price
+    return prices
+
+
+def _resolve(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    hint: np.ndarray,
+    time_limit: float,
+    engine: SolverEngine,
+) -> tuple[int, np.ndarray] | None:
+    """Best (students served, selected rows) for one component with raised caps."""
+    reduced = presolve(matrix, caps)
+    fixed_in = int(matrix.students[reduced.fixed_in].sum())
+    if reduced.matrix.n_schools == 0:
+        return fixed_in, np.asarray(reduced.expand([]), dtype=np.int64)
+    result = engine.solve(
+        reduced.matrix,
+        reduced.caps,
+        reduced.counts,
+        hint=reduced.compress(hint),
+        time_limit=time_limit,
+    )
+    if result.values is None:
+        return None
+    counts = np.round(result.values).astype(np.int64)
+    return (
+        int(reduced.matrix.students @ counts) + fixed_in,
+        np.asarray(reduced.expand(counts), dtype=np.int64),
+    )
@@ -0,0 +1,32 @@
+"""Version counters of the solver's input data.
+
+Every write that changes students or inventory bumps that table's counter
+in the same transaction. Equal versions therefore mean equal inputs, which
+a request can check with one small read instead of aggregating the data.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.data_version import DataVersion
+
+STUDENTS = "students"
+INVENTORY = "inventory"
+
+
+async def bump_data_version(session: AsyncSession, name: str) -> None:
+    """Record a change to table ``name`` (caller commits)."""
+    stmt = sqlite_insert(DataVersion).values(name=name, version=1)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DataVersion.name],
+            set_={"version": DataVersion.version + 1},
+        )
+    )
+
+
+async def data_versions(session: AsyncSession) -> dict[str, int]:
+    """Current version of every table that has changed at least once."""
+    rows = await session.execute(select(DataVersion.name, DataVersion.version))
+    return {name: version for name, version in rows}
@@ -0,0 +1,58 @@
+"""Warm starts from a previous selection.
+
+Daily re-runs usually differ from the last completed job by a handful of
+inventory corrections, so the previous selection is an excellent starting
+incumbent. It may no longer fit the new caps, though, so it is repaired
+first-fit (largest schools first) and then greedily extended with any other
+school that still fits. The result is always feasible and is handed to the
+solver as a solution hint.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .heuristic import first_fit
+from .matrix import DemandMatrix
+
+
+@dataclass
+class WarmStartReport:
+    used: bool
+    hinted_schools: int
+    dropped_schools: int
+    added_schools: int
+    hint_students: int
+    source_job_id: int | None = None
+    # Last full, cold solve of the same inputs, which the speedup is measured against
+    baseline_job_id: int | None = None
+    previous_solve_seconds: float | None = None
+    speedup: float | None = None
+
+
+def repair_selection(
+    matrix: DemandMatrix,
+    caps: np.ndarray,
+    previous: list[str],
+) -> tuple[np.ndarray, WarmStartReport]:
+    """Return a feasible 0/1 row vector seeded from ``previous`` school ids."""
+    row_of = {sid: j for j, sid in enumerate(matrix.school_ids)}
+    seeded = np.array([row_of[sid] for sid in previous if sid in row_of], dtype=np.int64)
+    others = np.setdiff1d(np.arange(matrix.n_schools), seeded)
+
+    def by_size(rows: np.ndarray) -> np.ndarray:
+        return rows[np.argsort(-matrix.students[rows], kind="stable")]
+
+    order = np.concatenate([by_size(seeded), by_size(others)])
+
+    x = first_fit(matrix, caps, order).astype(bool)
+
+    kept = int(x[seeded].sum())
+    report = WarmStartReport(
+        used=len(seeded) > 0,
+        hinted_schools=len(seeded),
+        dropped_schools=len(seeded) - kept,
+        added_schools=int(x.sum()) - kept,
+        hint_students=int(matrix.students[x].sum()),
+    )
+    return x, report
@@ -0,0 +1,44 @@
+"""Run solver jobs from the job queue, apart from the API.
+
+    python -m app.worker         # EQUIPROUTE_SOLVER_WORKERS solves at a time
+    python -m app.worker 4       # 4 solves at a time
+
+Start as many as the hardware allows, on any host that shares the
+database; each claims jobs while it has a free slot. With dedicated
+workers, set ``EQUIPROUTE_EMBEDDED_WORKER=0`` for the API so that its
+processes only serve requests. On SIGINT or SIGTERM the worker stops and
+its running jobs go back to the queue.
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+from app.jobs import SOLVER_WORKERS, SolverPool, Worker
+from app.models import init_db
+
+
+async def main(workers: int) -> None:
+    await init_db()
+
+    pool = SolverPool(workers=workers)
+    worker = Worker(pool)
+    running = asyncio.ensure_future(worker.run())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, running.cancel)
+
+    logging.info("%s: running %d solve(s) at a time", worker.worker_id, pool.workers)
+    try:
+        await running
+    except asyncio.CancelledError:
+        pass
+    finally:
+        pool.shutdown()
+    logging.info("%s: stopped", worker.worker_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else SOLVER_WORKERS))
@@ -0,0 +1,89 @@
+"""CSV parse + validation throughput, without database writes.
+
+Parses a generated student CSV (with 0.1% of rows missing a value) and
+reports rows/sec for:
+
+  - ``dict_rows``   — the old ``_parse_csv``: ``csv.DictReader`` over the
+                      whole decoded file, one stripped dict per row
+  - ``columnar/1``  — ``CSVRows`` parsing chunks in-process
+  - ``columnar/N``  — ``CSVRows`` parsing chunks on a pool of N processes
+
+The file is read from disk in ``CHUNK_SIZE`` pieces, as the spooled
+background uploads are.
+
+    python -m benchmarks.bench_csv_parse [n_rows ...]
+"""
+
+import asyncio
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.ingest import STUDENT_FIELDS, CSVRows, path_chunks
+
+from tests.instances import PANTS, SHIRTS, SHOES
+
+SIZES = [200_000, 1_000_000]
+BATCH_SIZE = 5_000
+
+
+def _write(path: Path, n_rows: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(STUDENT_FIELDS)
+        for i in range(n_rows):
+            school = "" if i % 1000 == 999 else f"SCHOOL-{rng.randrange(500):06d}"
+            writer.writerow(
+                [f"STU-{i:08d}", school, rng.choice(SHIRTS), rng.choice(PANTS), rng.choice(SHOES)]
+            )
+
+
+def _dict_rows(path: Path) -> int:
+    text = path.read_bytes().decode("utf-8-sig")
+    required = set(STUDENT_FIELDS)
+    reader = csv.DictReader(io.StringIO(text))
+    rows, errors = [], []
+    for i, raw_row in enumerate(reader, start=2):
+        row = {k.strip(): (v.strip() if v else "") for k, v in raw_row.items()}
+        blank = [c for c in required if not row.get(c)]
+        if blank:
+            errors.append(f"Row {i}: blank value(s) for {', '.join(sorted(blank))}")
+            continue
+        rows.append(row)
+    return len(rows)
+
+
+async def _columnar(path: Path, workers: int) -> int:
+    rows = CSVRows(path_chunks(path), set(STUDENT_FIELDS), workers=workers)
+    return sum([len(b["student_id"]) async for b in rows.batches(BATCH_SIZE)])
+
+
+def main(sizes: list[int]) -> None:
+    workers = os.cpu_count() or 1
+    methods = [
+        ("dict_rows", _dict_rows),
+        ("columnar/1", lambda p: asyncio.run(_columnar(p, 1))),
+    ]
+    if workers > 1:
+        methods.append((f"columnar/{workers}", lambda p: asyncio.run(_columnar(p, workers))))
+    print(f"{'rows':>10} {'method':>12} {'rows/s':>12} {'s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = Path(tmp) / f"{n}.csv"
+            _write(path, n)
+            for name, parse in methods:
+                started = time.perf_counter()
+                kept = parse(path)
+                elapsed = time.perf_counter() - started
+                assert kept == n - n // 1000, (name, kept)
+                print(f"{n:>10} {name:>12} {n / elapsed:12,.0f} {elapsed:7.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or SIZES)
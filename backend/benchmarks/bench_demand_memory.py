@@ -0,0 +1,104 @@
+"""Peak memory of demand aggregation as the students table grows.
+
+Each size gets a fresh SQLite file filled with generated students spread
+over a fixed set of schools; the table shows peak Python heap
+(tracemalloc) and wall time (measured in a separate untraced run) for:
+
+  - ``orm_all``  — the old path: ``select(Student)`` → ``scalars().all()``
+                   and counting in Python
+  - ``stream``   — ``stream_demand`` (server-side cursor, fixed batches)
+  - ``group_by`` — ``aggregate_students`` (GROUP BY in SQLite)
+
+    python -m benchmarks.bench_demand_memory [n_students ...]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Sku, Student
+from app.solver.demand import aggregate_students, stream_demand
+
+from tests.instances import PANTS, SHIRTS, SHOES
+
+SIZES = [10_000, 100_000, 1_000_000]
+N_SCHOOLS = 500
+INSERT_BATCH = 50_000
+
+
+async def _orm_all(session: AsyncSession) -> int:
+    students = (await session.execute(select(Student))).scalars().all()
+    demand: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    for s in students:
+        demand[s.school_id][s.shirt_sku_key] += 1
+        demand[s.school_id][s.pants_sku_key] += 1
+        demand[s.school_id][s.shoe_sku_key] += 1
+    return len(demand)
+
+
+async def _populate(engine, n_students: int) -> None:
+    skus = SHIRTS + PANTS + SHOES
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Sku), [{"sku_key": k, "sku_id": sku} for k, sku in enumerate(skus, 1)]
+        )
+    shirts, pants, shoes = (
+        [skus.index(sku) + 1 for sku in group] for group in (SHIRTS, PANTS, SHOES)
+    )
+    rng = random.Random(0)
+    for start in range(0, n_students, INSERT_BATCH):
+        rows = [
+            {
+                "student_id": f"STU-{i:08d}",
+                "school_id": f"SCHOOL-{rng.randrange(N_SCHOOLS):06d}",
+                "shirt_sku_key": rng.choice(shirts),
+                "pants_sku_key": rng.choice(pants),
+                "shoe_sku_key": rng.choice(shoes),
+            }
+            for i in range(start, min(start + INSERT_BATCH, n_students))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(Student), rows)
+
+
+async def _measure(engine, aggregate) -> tuple[float, float]:
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    async with session_factory() as session:
+        started = time.perf_counter()
+        await aggregate(session)
+        elapsed = time.perf_counter() - started
+    async with session_factory() as session:
+        tracemalloc.start()
+        await aggregate(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+
+async def main(sizes: list[int]) -> None:
+    methods = [("orm_all", _orm_all), ("stream", stream_demand), ("group_by", aggregate_students)]
+    print(f"{'students':>10} " + " ".join(f"{name + ' MiB':>14} {'s':>6}" for name, _ in methods))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / f'{n}.db'}")
+            await _populate(engine, n)
+            cells = []
+            for _, aggregate in methods:
+                peak, elapsed = await _measure(engine, aggregate)
+                cells.append(f"{peak:14.1f} {elapsed:6.2f}")
+            print(f"{n:>10} " + " ".join(cells))
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or SIZES))
@@ -0,0 +1,63 @@
+"""Benchmark the solver engines on generated instances.
+
+Each engine solves the same presolved instances under a common time limit;
+the table shows students served, the proven bound, the remaining gap and
+wall time.
+
+    python -m benchmarks.bench_engines [time_limit_seconds]
+"""
+
+import os
+import sys
+import time
+
+from app.solver.engines import CpSatEngine, ScipEngine
+from app.solver.decompose import SolveLimits
+from app.solver.optimizer import solve
+
+from tests.instances import generate_inventory, generate_profiles
+
+INSTANCES = [
+    (200, 1),
+    (1_000, 1),
+    (4_000, 1),
+    (4_000, 8),
+]
+
+
+def main() -> None:
+    time_limit = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    cores = os.cpu_count() or 1
+    engines = [ScipEngine(), CpSatEngine(num_workers=1)]
+    if cores > 1:
+        engines.append(CpSatEngine(num_workers=cores))
+
+    print(f"time limit {time_limit:.0f}s, {cores} cores")
+    print(
+        f"{'schools':>8} {'regions':>8} {'engine':>12} {'served':>8} "
+        f"{'bound':>8} {'gap %':>7} {'seconds':>8}"
+    )
+    for n_schools, regions in INSTANCES:
+        profiles = generate_profiles(n_schools, seed=1, regions=regions)
+        inventory = generate_inventory(profiles)
+        for engine in engines:
+            label = engine.name
+            if isinstance(engine, CpSatEngine):
+                label += f"×{engine.num_workers}"
+            start = time.perf_counter()
+            result = solve(
+                profiles,
+                inventory,
+                limits=SolveLimits(time_limit_seconds=time_limit),
+                engine=engine,
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{n_schools:>8} {regions:>8} {label:>12} "
+                f"{result.progress.objective:>8} {result.progress.best_bound:>8} "
+                f"{result.progress.gap * 100:7.2f} {elapsed:8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Student upload throughput: row-by-row upserts versus bulk batches.
+
+Each run gets a fresh SQLite file. It uploads ``n`` generated students into
+an empty table ("insert"), uploads them again with every row changed
+("update"), and then re-uploads that same file ("unchanged", the daily
+re-upload). One transaction covers each upload, as in the routes. Both
+methods maintain the demand tables.
+
+  - ``per_row``    — the old path: ``db.get`` per student, ORM updates and a
+                     ``DemandDelta``
+  - ``bulk/<n>``   — ``app.ingest.upsert_students`` with batch size n, which
+                     skips rows whose stored hash matches
+
+    python -m benchmarks.bench_ingest [n_students ...]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.ingest import STUDENT_FIELDS, to_columns, upsert_students
+from app.ingest.upsert import SKU_COLUMNS
+from app.models import Base, Student
+from app.solver.catalog import sku_keys
+from app.solver.demand import DemandDelta
+
+from tests.instances import PANTS, SHIRTS, SHOES
+
+SIZES = [10_000, 50_000]
+BATCH_SIZES = [500, 5_000, 20_000]
+N_SCHOOLS = 500
+
+
+def _rows(n_students: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "student_id": f"STU-{i:08d}",
+            "school_id": f"SCHOOL-{rng.randrange(N_SCHOOLS):06d}",
+            "shirt_sku": rng.choice(SHIRTS),
+            "pants_sku": rng.choice(PANTS),
+            "shoe_size_sku": rng.choice(SHOES),
+        }
+        for i in range(n_students)
+    ]
+
+
+async def _per_row(session: AsyncSession, rows: list[dict]) -> None:
+    keys = await sku_keys(session, {row[c] for row in rows for c in SKU_COLUMNS})
+    delta = DemandDelta()
+    for row in rows:
+        existing = await session.get(Student, row["student_id"])
+        if existing:
+            delta.remove(existing)
+            existing.school_id = row["school_id"]
+            existing.shirt_sku_key = keys[row["shirt_sku"]]
+            existing.pants_sku_key = keys[row["pants_sku"]]
+            existing.shoe_sku_key = keys[row["shoe_size_sku"]]
+            delta.add(existing)
+        else:
+            student = Student(
+                student_id=row["student_id"],
+                school_id=row["school_id"],
+                shirt_sku_key=keys[row["shirt_sku"]],
+                pants_sku_key=keys[row["pants_sku"]],
+                shoe_sku_key=keys[row["shoe_size_sku"]],
+            )
+            session.add(student)
+            delta.add(student)
+    await delta.apply(session)
+
+
+async def _bulk(session: AsyncSession, rows: list[dict], batch_size: int) -> None:
+    await upsert_students(session, to_columns(rows, STUDENT_FIELDS), batch_size=batch_size)
+
+
+async def _throughput(path: Path, upload, n_students: int) -> list[float]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    rates = []
+    for seed in (0, 1, 1):  # empty table, every row changed, nothing changed
+        rows = _rows(n_students, seed)
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await upload(session, rows)
+            await session.commit()
+            rates.append(n_students / (time.perf_counter() - started))
+    await engine.dispose()
+    return rates
+
+
+async def main(sizes: list[int]) -> None:
+    methods = [("per_row", _per_row)] + [
+        (f"bulk/{b}", partial(_bulk, batch_size=b)) for b in BATCH_SIZES
+    ]
+    print(
+        f"{'students':>10} {'method':>12} {'insert rows/s':>14} "
+        f"{'update rows/s':>14} {'unchanged rows/s':>17}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            for name, upload in methods:
+                path = Path(tmp) / f"{n}-{name.replace('/', '_')}.db"
+                inserted, updated, unchanged = await _throughput(path, upload, n)
+                print(
+                    f"{n:>10} {name:>12} {inserted:14,.0f} {updated:14,.0f} {unchanged:17,.0f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or SIZES))
@@ -0,0 +1,89 @@
+"""Event-loop responsiveness while solves are in flight.
+
+A ticker coroutine sleeps 10 ms at a time and records how late it wakes
+up. That lag is what every other request handled by the API process
+(``/health``, ``/jobs/{id}`` polling) waits on top of its own work. It
+is measured with no solve running, and with ``n`` solves of a generated
+instance in flight:
+
+  - ``thread``  — the old path: ``solve`` in ``asyncio.to_thread``, whose
+                  Python work holds the GIL against the event loop
+  - ``pool``    — ``SolverPool.run``, solving in worker processes
+
+    python -m benchmarks.bench_loop_latency [n_schools] [concurrent_solves]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from app.jobs import SolverPool
+from app.solver.decompose import SolveLimits
+from app.solver.optimizer import solve
+
+from tests.instances import generate_inventory, generate_profiles
+
+TICK_SECONDS = 0.01
+TIME_LIMIT_SECONDS = 10.0
+
+
+async def _lags(until: asyncio.Future | None, seconds: float = 2.0) -> list[float]:
+    """Wake-up lags in ms, until ``until`` is done (or for ``seconds``)."""
+    lags = []
+    deadline = time.perf_counter() + seconds
+    while (until is not None and not until.done()) or (
+        until is None and time.perf_counter() < deadline
+    ):
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+    return lags
+
+
+async def _in_threads(profiles, inventory, n: int, limits: SolveLimits) -> None:
+    await asyncio.gather(
+        *(asyncio.to_thread(solve, profiles, inventory, limits=limits) for _ in range(n))
+    )
+
+
+async def _in_pool(profiles, inventory, n: int, limits: SolveLimits) -> None:
+    pool = SolverPool(workers=n)
+
+    async def one(job_id: int) -> None:
+        async with pool.slot(job_id) as slot:
+            await pool.run(job_id, slot, solve, profiles, inventory, limits=limits)
+
+    try:
+        await asyncio.gather(*(one(i) for i in range(n)))
+    finally:
+        pool.shutdown()
+
+
+async def main(n_schools: int, n_solves: int) -> None:
+    profiles = generate_profiles(n_schools, seed=1)
+    inventory = generate_inventory(profiles)
+    limits = SolveLimits(time_limit_seconds=TIME_LIMIT_SECONDS)
+
+    print(f"{n_schools} schools, {n_solves} concurrent solve(s)")
+    print(f"{'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'seconds':>8}")
+    runs = [("idle", None), ("thread", _in_threads), ("pool", _in_pool)]
+    for name, run in runs:
+        started = time.perf_counter()
+        if run is None:
+            lags = await _lags(None)
+        else:
+            solving = asyncio.ensure_future(run(profiles, inventory, n_solves, limits))
+            lags = await _lags(solving)
+            await solving
+        lags.sort()
+        print(
+            f"{name:>8} {statistics.median(lags):8.2f} "
+            f"{lags[int(len(lags) * 0.99)]:8.2f} {lags[-1]:8.2f} "
+            f"{time.perf_counter() - started:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    asyncio.run(main(*(args + [4_000, 2][len(args):])))
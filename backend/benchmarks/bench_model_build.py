@@ -0,0 +1,71 @@
+"""Benchmark ILP model construction time against the number of nonzeros.
+
+Compares the sparse bulk builder (build_demand_matrix + build_model) with the
+legacy dense construction that emitted one pywraplp constraint per SKU over
+every school.
+
+    python -m benchmarks.bench_model_build
+"""
+
+import time
+
+from ortools.linear_solver import pywraplp
+
+from app.solver.matrix import build_demand_matrix
+from app.solver.model import build_model
+from app.solver.optimizer import SAFETY_FACTOR
+
+from tests.instances import generate_inventory, generate_profiles
+
+SIZES = [500, 1_000, 2_000, 4_000, 8_000, 16_000, 32_000]
+DENSE_MAX_SCHOOLS = 4_000
+
+
+def _sparse_build(profiles, inventory) -> float:
+    start = time.perf_counter()
+    matrix = build_demand_matrix(profiles)
+    build_model(matrix, matrix.caps(inventory, SAFETY_FACTOR))
+    return time.perf_counter() - start
+
+
+def _dense_build(profiles, inventory) -> float:
+    start = time.perf_counter()
+    solver = pywraplp.Solver.CreateSolver("SCIP")
+    school_ids = list(profiles.keys())
+    x = {sid: solver.BoolVar(sid) for sid in school_ids}
+    solver.Maximize(
+        solver.Sum(profiles[sid].total_students * x[sid] for sid in school_ids)
+    )
+    all_skus = {sku for p in profiles.values() for sku in p.sku_demand}
+    for sku in all_skus:
+        cap = int(inventory.get(sku, 0) * SAFETY_FACTOR)
+        solver.Add(
+            solver.Sum(
+                profiles[sid].sku_demand.get(sku, 0) * x[sid] for sid in school_ids
+            )
+            <= cap
+        )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    print(f"{'schools':>8} {'nnz':>8} {'sparse ms':>10} {'ns/nnz':>8} {'dense ms':>10}")
+    for n in SIZES:
+        profiles = generate_profiles(n)
+        inventory = generate_inventory(profiles)
+        nnz = sum(len(p.sku_demand) for p in profiles.values())
+
+        sparse_s = min(_sparse_build(profiles, inventory) for _ in range(3))
+        dense = (
+            f"{_dense_build(profiles, inventory) * 1e3:10.1f}"
+            if n <= DENSE_MAX_SCHOOLS
+            else f"{'-':>10}"
+        )
+        print(
+            f"{n:>8} {nnz:>8} {sparse_s * 1e3:10.1f} "
+            f"{sparse_s / nnz * 1e9:8.0f} {dense}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.models import Base
+from app.models.base import get_db
+from app.routes import upload
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Session on a fresh in-memory database with all tables created."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path):
+    """Session factory on a database file shared by the test and the code under test."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """HTTP client on a database file of its own, without the embedded worker.
+
+    Every request runs on an event loop of its own, hence no pooled
+    connections. Background tasks have finished when a request returns.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}", poolclass=NullPool)
+
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = session
+    monkeypatch.setattr(upload, "async_session", sessions)
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path / "uploads")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
@@ -0,0 +1,70 @@
+"""Demand profiles for the tests, and synthetic instances also used by the benchmarks.
+
+Instances mimic real campaigns: every student takes one shirt, one
+pants/skirt and one shoe SKU from the seed catalog, and each school draws
+its students from a few neighbouring sizes.
+"""
+
+import random
+
+from app.seed import INVENTORY_SEED
+from app.solver.demand import SchoolDemandProfile
+
+CATALOG = [sku for sku, _, _ in INVENTORY_SEED]
+SHIRTS = [sku for sku in CATALOG if sku.startswith(("BLANCA", "CELESTE"))]
+SHOES = [sku for sku in CATALOG if sku.startswith("ZAPATO")]
+PANTS = [sku for sku in CATALOG if sku not in SHIRTS and sku not in SHOES]
+
+
+def profile(school_id: str, total_students: int, sku_demand: dict[str, int]):
+    return SchoolDemandProfile(
+        school_id=school_id,
+        total_students=total_students,
+        sku_demand=sku_demand,
+    )
+
+
+def generate_profiles(
+    n_schools: int,
+    groups_per_school: int = 2,
+    seed: int = 0,
+    regions: int = 1,
+) -> dict[str, SchoolDemandProfile]:
+    """Return ``n_schools`` profiles, each with ``groups_per_school`` kits.
+
+    With ``regions`` > 1, schools are dealt round-robin into regions that
+    draw from disjoint slices of the catalog (no SKU is shared across them).
+    """
+    rng = random.Random(seed)
+    profiles: dict[str, SchoolDemandProfile] = {}
+    for i in range(n_schools):
+        sid = f"SCHOOL-{i:06d}"
+        region = i % regions
+        shirts, pants, shoes = (
+            SHIRTS[region::regions],
+            PANTS[region::regions],
+            SHOES[region::regions],
+        )
+        sku_demand: dict[str, int] = {}
+        total = 0
+        for _ in range(groups_per_school):
+            size = rng.randint(5, 40)
+            for sku in (rng.choice(shirts), rng.choice(pants), rng.choice(shoes)):
+                sku_demand[sku] = sku_demand.get(sku, 0) + size
+            total += size
+        profiles[sid] = SchoolDemandProfile(
+            school_id=sid, total_students=total, sku_demand=sku_demand
+        )
+    return profiles
+
+
+def generate_inventory(
+    profiles: dict[str, SchoolDemandProfile],
+    coverage: float = 0.6,
+) -> dict[str, int]:
+    """Stock each SKU at ``coverage`` × its total demand, so caps bind."""
+    totals: dict[str, int] = {sku: 0 for sku in CATALOG}
+    for p in profiles.values():
+        for sku, qty in p.sku_demand.items():
+            totals[sku] += qty
+    return {sku: int(qty * coverage) for sku, qty in totals.items()}
@@ -0,0 +1,100 @@
+"""HTTP routes end to end: background uploads and the solver job queue."""
+
+from app.jobs import SOLVER_QUEUE_SIZE
+from app.models import JobStatus
+from app.routes import upload
+
+HEADER = "sku_id,description,total_stock_available\n"
+ROWS = "".join(f"SKU-{i},Camisa {i},{10 * i}\n" for i in range(5))
+
+
+def _upload(client, content: bytes):
+    response = client.post(
+        "/upload/inventory?background=true",
+        files={"file": ("inventory.csv", content, "text/csv")},
+    )
+    assert response.status_code == 202
+    return client.get(f"/jobs/{response.json()['job_id']}").json()
+
+
+class TestBackgroundUpload:
+    def test_job_goes_through_processing_to_completed(self, client, monkeypatch, tmp_path):
+        monkeypatch.setattr(upload, "BATCH_SIZE", 2)
+        writes = []
+        update_job = upload._update_job
+
+        async def recording(db, job_id, expected, **values):
+            writes.append((expected, values.get("status")))
+            return await update_job(db, job_id, expected, **values)
+
+        monkeypatch.setattr(upload, "_update_job", recording)
+        job = _upload(client, (HEADER + ROWS).encode())
+
+        assert writes == [
+            (JobStatus.PENDING, JobStatus.PROCESSING),
+            *[(JobStatus.PROCESSING, None)] * 3,
+            (JobStatus.PROCESSING, JobStatus.COMPLETED),
+        ]
+        assert (job["status"], job["revision"]) == ("COMPLETED", 5)
+        result = job["result"]
+        assert (result["rows_processed"], result["inserted"]) == (5, 5)
+        assert result["percent_done"] == 100.0
+        assert {"rows_per_second", "elapsed_seconds"} <= result.keys()
+        assert list((tmp_path / "uploads").iterdir()) == []
+        assert len(client.get("/inventory").json()) == 5
+
+    def test_bad_encoding_fails_the_job(self, client, tmp_path):
+        job = _upload(client, (HEADER + "SKU-1,").encode() + b"\xff,1\n")
+
+        assert job["status"] == "FAILED"
+        assert "not valid UTF-8" in job["result"]["error"]
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+    def test_unexpected_error_fails_the_job(self, client, monkeypatch, tmp_path):
+        async def broken(*args, **kwargs):
+            raise RuntimeError("disk on fire")
+
+        monkeypatch.setattr(upload, "upsert_inventory", broken)
+        job = _upload(client, (HEADER + ROWS).encode())
+
+        assert job["status"] == "FAILED"
+        assert job["result"]["error"] == "RuntimeError: disk on fire"
+        assert list((tmp_path / "uploads").iterdir()) == []
+
+
+class TestSolverQueue:
+    def test_full_queue_answers_429(self, client):
+        for i in range(SOLVER_QUEUE_SIZE):
+            response = client.post("/optimize", json={"time_limit_seconds": i + 1})
+            assert response.status_code == 202
+            assert response.json()["queue_position"] == i + 1
+
+        response = client.post("/optimize", json={"time_limit_seconds": 100})
+
+        assert response.status_code == 429
+        assert response.json()["detail"] == (
+            f"Solver queue is full ({SOLVER_QUEUE_SIZE} jobs waiting)"
+        )
+        # Joining a waiting job takes no place in the queue
+        joined = client.post("/optimize", json={"time_limit_seconds": 1})
+        assert (joined.status_code, joined.json()["coalesced"]) == (202, True)
+
+    def test_coalesced_job_is_cancelled_by_its_last_request(self, client):
+        first = client.post("/optimize").json()
+        second = client.post("/optimize").json()
+        assert second["job_id"] == first["job_id"] and second["coalesced"]
+        job_id = first["job_id"]
+
+        response = client.post(f"/jobs/{job_id}/cancel")
+        assert response.status_code == 202
+        assert response.json() == {"job_id": job_id, "status": "PENDING", "requests": 1}
+        assert client.get(f"/jobs/{job_id}").json()["requests"] == 1
+
+        response = client.post(f"/jobs/{job_id}/cancel")
+        assert response.json() == {"job_id": job_id, "status": "CANCELLED", "requests": 0}
+
+        response = client.post(f"/jobs/{job_id}/cancel")
+        assert (response.status_code, response.json()["detail"]) == (
+            409, "Job is already CANCELLED",
+        )
+        assert client.post("/jobs/999/cancel").status_code == 404
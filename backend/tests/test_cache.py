@@ -0,0 +1,103 @@
+"""Unit tests for the content-addressed solver result cache."""
+
+from dataclasses import replace
+
+import pytest
+
+from app.jobs import cacheable, cached_job, optimize_inputs
+from app.models import SolverCacheEntry
+from app.models.job import JobStatus
+from app.schemas.job import OptimizeOptions
+from app.solver import cache
+from app.solver.decompose import SolveLimits
+from app.solver.engines import CpSatEngine, ScipEngine
+from app.solver.optimizer import solve
+from tests.instances import profile
+
+
+PROFILES = {
+    "S1": profile("S1", 50, {"SKU-A": 50, "SKU-B": 50}),
+    "S2": profile("S2", 30, {"SKU-A": 30}),
+}
+INVENTORY = {"SKU-A": 100, "SKU-B": 100}
+
+
+class TestCacheKey:
+    def test_independent_of_dict_order(self):
+        reordered = {
+            "S2": PROFILES["S2"],
+            "S1": profile("S1", 50, {"SKU-B": 50, "SKU-A": 50}),
+        }
+
+        assert cache.cache_key(PROFILES, INVENTORY, 0.9, ScipEngine()) == cache.cache_key(
+            reordered, dict(reversed(INVENTORY.items())), 0.9, ScipEngine()
+        )
+
+    def test_every_input_changes_the_key(self):
+        base = cache.cache_key(PROFILES, INVENTORY, 0.9, ScipEngine())
+
+        variants = [
+            cache.cache_key({"S1": PROFILES["S1"]}, INVENTORY, 0.9, ScipEngine()),
+            cache.cache_key(PROFILES, {**INVENTORY, "SKU-A": 99}, 0.9, ScipEngine()),
+            cache.cache_key(PROFILES, INVENTORY, 0.85, ScipEngine()),
+            cache.cache_key(PROFILES, INVENTORY, 0.9, CpSatEngine(num_workers=2)),
+            cache.cache_key(PROFILES, INVENTORY, 0.9, ScipEngine(), SolveLimits(time_limit_seconds=5)),
+        ]
+
+        assert len({base, *variants}) == len(variants) + 1
+
+
+def test_only_results_that_finished_by_themselves_are_cached():
+    optimal = solve(PROFILES, INVENTORY)
+    feasible = replace(optimal, status="FEASIBLE", progress=replace(optimal.progress, gap=0.05))
+
+    assert cacheable(optimal, SolveLimits(time_limit_seconds=5))
+    assert cacheable(feasible, SolveLimits(gap_limit=0.1))
+    assert not cacheable(feasible, SolveLimits(time_limit_seconds=5))
+    assert not cacheable(replace(feasible, status="HEURISTIC"), SolveLimits(gap_limit=0.1))
+
+
+@pytest.mark.asyncio
+class TestCacheStore:
+    async def test_hit_after_store(self, db):
+        assert await cache.lookup(db, "k1") is None
+
+        await cache.store(db, "k1", {"status": "OPTIMAL"}, source_job_id=7)
+
+        assert await cache.lookup(db, "k1") == {"status": "OPTIMAL"}
+        assert (await db.get(SolverCacheEntry, "k1")).hits == 1
+
+    async def test_least_recently_used_evicted_beyond_max_entries(self, db, monkeypatch):
+        monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+
+        await cache.store(db, "k1", {"n": 1})
+        await cache.store(db, "k2", {"n": 2})
+        await cache.lookup(db, "k1")
+        await cache.store(db, "k3", {"n": 3})
+
+        assert await cache.lookup(db, "k2") is None
+        assert await cache.lookup(db, "k1") == {"n": 1}
+        assert await cache.lookup(db, "k3") == {"n": 3}
+
+    async def test_expired_entries_miss(self, db, monkeypatch):
+        await cache.store(db, "k1", {"n": 1})
+        monkeypatch.setattr(cache, "MAX_AGE_SECONDS", -1)
+
+        assert await cache.lookup(db, "k1") is None
+        assert await db.get(SolverCacheEntry, "k1") is None
+
+
+@pytest.mark.asyncio
+class TestCachedJob:
+    async def test_hit_is_a_completed_job_without_queueing(self, db):
+        options = OptimizeOptions()
+        assert await cached_job(db, options) is None
+
+        key = (await optimize_inputs(db, options)).cache_key
+        await cache.store(db, key, {"status": "OPTIMAL"})
+        job = await cached_job(db, options)
+
+        assert (job.status, job.cache_hit, job.cache_key) == (JobStatus.COMPLETED, True, key)
+        assert job.result_json == {"status": "OPTIMAL"}
+        assert await cached_job(db, OptimizeOptions(use_cache=False)) is None
+        assert await cached_job(db, OptimizeOptions(time_limit_seconds=5)) is None
@@ -0,0 +1,148 @@
+"""Unit tests for component decomposition, parallel and anytime solving."""
+
+import numpy as np
+
+from app.solver.decompose import SolveLimits, find_components, solve_decomposed, solve_ilp
+from app.solver.engines import BlockSolution, CpSatEngine, ScipEngine
+from app.solver.matrix import build_demand_matrix
+from app.solver.optimizer import SAFETY_FACTOR, preview, solve
+from tests.instances import generate_inventory, generate_profiles, profile
+
+
+class TestFindComponents:
+    def test_disjoint_sku_groups_split(self):
+        profiles = {
+            "P1": profile("P1", 10, {"BLANCA-T6": 10, "ZAPATO-28": 10}),
+            "P2": profile("P2", 10, {"ZAPATO-28": 10}),
+            "S1": profile("S1", 10, {"CELESTE-T18": 10}),
+            "S2": profile("S2", 10, {"CELESTE-T18": 10, "ZAPATO-39": 10}),
+            "S3": profile("S3", 10, {"ZAPATO-39": 10}),
+        }
+        matrix = build_demand_matrix(profiles)
+
+        components = find_components(matrix)
+
+        groups = [sorted(matrix.school_ids[i] for i in c.rows) for c in components]
+        assert groups == [["S1", "S2", "S3"], ["P1", "P2"]]
+        sku_groups = [sorted(matrix.sku_ids[j] for j in c.cols) for c in components]
+        assert sku_groups == [["CELESTE-T18", "ZAPATO-39"], ["BLANCA-T6", "ZAPATO-28"]]
+
+    def test_empty_matrix(self):
+        assert find_components(build_demand_matrix({})) == []
+
+
+class TestSolveDecomposed:
+    def test_parallel_matches_single_model(self):
+        profiles = generate_profiles(80, groups_per_school=1, seed=3, regions=4)
+        inventory = generate_inventory(profiles, coverage=0.5)
+        matrix = build_demand_matrix(profiles)
+        caps = matrix.caps(inventory, SAFETY_FACTOR)
+
+        solution, stats = solve_decomposed(
+            matrix, caps, max_workers=4, parallel_min_variables=0
+        )
+        single = solve_ilp(matrix, caps)
+
+        assert stats.workers > 1
+        assert stats.components > 1
+        values = np.rint(solution.values)
+        assert np.all(matrix.demand.T @ values <= caps)
+        assert matrix.students @ values == matrix.students @ np.rint(single.values)
+        assert solution.progress.gap == 0
+
+
+class TestAnytime:
+    def test_incumbents_are_streamed(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+        partials = []
+
+        result = solve(profiles, inventory, on_incumbent=partials.append)
+
+        assert partials
+        assert all(p.status == "FEASIBLE" for p in partials)
+        assert partials[-1].progress.objective <= result.progress.objective
+        assert result.status == "OPTIMAL"
+        assert result.progress.gap == 0
+
+    def test_scip_solves_once_whoever_listens(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+        solves = []
+
+        class Recording(ScipEngine):
+            def solve(self, *args, time_limit=None, **kwargs):
+                solves.append(time_limit)
+                return super().solve(*args, time_limit=time_limit, **kwargs)
+
+        partials = []
+        result = solve(
+            profiles,
+            inventory,
+            engine=Recording(),
+            on_incumbent=partials.append,
+            should_stop=lambda: True,
+        )
+
+        assert solves == [None]
+        assert result.status == "OPTIMAL" and result.progress.rounds == 1
+        assert partials[-1].progress.objective == result.progress.objective
+
+    def test_gap_limit_is_reported(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+
+        result = solve(profiles, inventory, limits=SolveLimits(gap_limit=0.5))
+
+        assert result.progress.gap <= 0.5
+        assert result.progress.best_bound >= result.progress.objective
+
+    def test_without_listener_the_limits_go_to_one_solve(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+        time_limits = []
+
+        class Recording(ScipEngine):
+            def solve(self, *args, time_limit=None, **kwargs):
+                time_limits.append(time_limit)
+                return super().solve(*args, time_limit=time_limit, **kwargs)
+
+        result = solve(
+            profiles, inventory, limits=SolveLimits(time_limit_seconds=30), engine=Recording()
+        )
+
+        assert len(time_limits) == 1 and time_limits[0] > 29
+        assert result.progress.rounds == 1
+
+    def test_cp_sat_streams_incumbents_and_stops_within_one_search(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+        partials = []
+
+        result = solve(
+            profiles,
+            inventory,
+            engine=CpSatEngine(num_workers=1),
+            on_incumbent=partials.append,
+            should_stop=lambda: bool(partials),
+        )
+
+        assert partials and result.progress.rounds == 1
+        assert result.progress.objective >= partials[0].progress.objective
+        assert result.progress.objective == result.selection.total_students_served
+
+    def test_limit_before_any_incumbent_keeps_the_greedy_selection(self):
+        profiles = generate_profiles(100, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.5)
+
+        class Empty(ScipEngine):
+            def solve(self, *args, **kwargs):
+                return BlockSolution(values=None, objective=0.0, best_bound=np.inf)
+
+        result = solve(
+            profiles, inventory, limits=SolveLimits(time_limit_seconds=1), engine=Empty()
+        )
+
+        assert result.status == "HEURISTIC"
+        assert result.progress.objective == preview(profiles, inventory).progress.objective
+        assert result.progress.objective == result.selection.total_students_served > 0
@@ -0,0 +1,134 @@
+"""Unit tests for demand aggregation and the maintained demand tables."""
+
+import pytest
+
+from app.models import Student
+from app.solver.catalog import sku_keys, sku_names
+from app.solver.demand import (
+    DemandDelta,
+    aggregate_demand,
+    aggregate_students,
+    check_demand,
+    rebuild_demand,
+    stream_demand,
+)
+
+
+async def _student(db, student_id: str, school_id: str, shirt: str, pants: str, shoes: str):
+    keys = await sku_keys(db, [shirt, pants, shoes])
+    return Student(
+        student_id=student_id,
+        school_id=school_id,
+        shirt_sku_key=keys[shirt],
+        pants_sku_key=keys[pants],
+        shoe_sku_key=keys[shoes],
+    )
+
+
+STUDENTS = [
+    ("1", "S2", "BLANCA-T8", "PANTALON AZUL-T8", "ZAPATO-30"),
+    ("2", "S1", "BLANCA-T8", "FALDA AZUL-T8", "ZAPATO-30"),
+    ("3", "S1", "BLANCA-T8", "FALDA AZUL-T8", "ZAPATO-31"),
+    ("4", "S1", "CELESTE-T10", "PANTALON AZUL-T8", "ZAPATO-30"),
+]
+
+
+async def _insert(db, rows) -> list[Student]:
+    delta = DemandDelta()
+    students = [await _student(db, *row) for row in rows]
+    for student in students:
+        db.add(student)
+        delta.add(student)
+    await delta.apply(db)
+    await db.commit()
+    return students
+
+
+@pytest.mark.asyncio
+class TestAggregateDemand:
+    async def test_counts_per_school_and_sku(self, db):
+        await _insert(db, STUDENTS)
+
+        profiles = await aggregate_demand(db)
+
+        assert list(profiles) == ["S1", "S2"]
+        assert profiles["S1"].total_students == 3
+        assert profiles["S1"].sku_demand == {
+            "BLANCA-T8": 2,
+            "CELESTE-T10": 1,
+            "FALDA AZUL-T8": 2,
+            "PANTALON AZUL-T8": 1,
+            "ZAPATO-30": 2,
+            "ZAPATO-31": 1,
+        }
+        assert profiles["S2"].total_students == 1
+        assert profiles == await aggregate_students(db)
+
+    async def test_empty(self, db):
+        assert await aggregate_demand(db) == {}
+        assert await stream_demand(db) == {}
+
+    async def test_stream_matches_group_by_across_batches(self, db):
+        await _insert(db, STUDENTS)
+
+        assert await stream_demand(db, batch_size=3) == await aggregate_students(db)
+
+    async def test_stream_source(self, db, monkeypatch):
+        db.add(await _student(db, *STUDENTS[0]))  # not reflected in the demand tables
+        await db.commit()
+        monkeypatch.setattr("app.solver.demand.DEMAND_SOURCE", "stream")
+
+        assert (await aggregate_demand(db))["S2"].total_students == 1
+
+
+@pytest.mark.asyncio
+class TestSkuCatalog:
+    async def test_keys_are_stable_and_shared(self, db):
+        first = await sku_keys(db, ["ZAPATO-30", "BLANCA-T8"])
+        again = await sku_keys(db, ["BLANCA-T8", "ZAPATO-31"])
+
+        assert again["BLANCA-T8"] == first["BLANCA-T8"]
+        assert len({*first.values(), *again.values()}) == 3
+        assert await sku_names(db) == {
+            key: sku for sku, key in {**first, **again}.items()
+        }
+        assert await sku_keys(db, []) == {}
+
+
+@pytest.mark.asyncio
+class TestDemandDelta:
+    async def test_student_moved_between_schools(self, db):
+        students = await _insert(db, STUDENTS)
+
+        moved = students[0]
+        delta = DemandDelta()
+        delta.remove(moved)
+        moved.school_id = "S1"
+        moved.shoe_sku_key = (await sku_keys(db, ["ZAPATO-31"]))["ZAPATO-31"]
+        delta.add(moved)
+        await delta.apply(db)
+        await db.commit()
+
+        profiles = await aggregate_demand(db)
+        assert list(profiles) == ["S1"]  # S2 is gone, not left at zero
+        assert profiles["S1"].total_students == 4
+        assert profiles["S1"].sku_demand["ZAPATO-31"] == 2
+        assert await check_demand(db) == []
+
+
+@pytest.mark.asyncio
+class TestCheckAndRebuild:
+    async def test_drift_is_reported_and_repaired(self, db):
+        await _insert(db, STUDENTS)
+        db.add(await _student(db, "5", "S3", "BLANCA-T8", "FALDA AZUL-T8", "ZAPATO-30"))  # no delta
+        await db.commit()
+
+        problems = await check_demand(db)
+        assert "S3: 0 students stored, 1 actual" in problems
+        assert len(problems) == 4
+
+        await rebuild_demand(db)
+        await db.commit()
+
+        assert await check_demand(db) == []
+        assert (await aggregate_demand(db))["S3"].total_students == 1
@@ -0,0 +1,69 @@
+"""Unit tests for the pluggable solver engines."""
+
+import numpy as np
+import pytest
+
+from app.solver.decompose import SolveLimits, solve_ilp
+from app.solver.engines import CpSatEngine, ScipEngine, SolverEngine, get_engine
+from app.solver.matrix import build_demand_matrix
+from app.solver.optimizer import SAFETY_FACTOR, preview, solve
+from tests.instances import generate_inventory, generate_profiles
+
+
+class TestEngines:
+    @pytest.mark.parametrize("engine", [ScipEngine(), CpSatEngine(num_workers=2)])
+    def test_engines_agree_on_optimum(self, engine):
+        profiles = generate_profiles(80, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.6)
+
+        reference = solve(profiles, inventory, engine=ScipEngine())
+        result = solve(profiles, inventory, engine=engine)
+
+        assert result.engine == engine.name
+        assert result.status == "OPTIMAL"
+        assert result.selection.total_students_served == reference.selection.total_students_served
+
+    def test_cp_sat_respects_integer_upper_bounds(self):
+        profiles = generate_profiles(30, seed=2)
+        matrix = build_demand_matrix(profiles)
+        caps = matrix.caps(generate_inventory(profiles, coverage=0.8), SAFETY_FACTOR)
+        upper = np.full(matrix.n_schools, 2)
+
+        solution = solve_ilp(matrix, caps, upper, engine=CpSatEngine(num_workers=1))
+
+        assert np.all(solution.values <= 2)
+        assert np.all(matrix.demand.T @ solution.values <= caps)
+
+    def test_time_limited_cp_sat_serves_at_least_the_greedy(self):
+        profiles = generate_profiles(300, seed=3)
+        inventory = generate_inventory(profiles)
+
+        result = solve(
+            profiles,
+            inventory,
+            max_workers=1,
+            limits=SolveLimits(time_limit_seconds=0.2),
+            engine=CpSatEngine(num_workers=1),
+        )
+
+        greedy = preview(profiles, inventory)
+        assert result.progress.objective >= greedy.progress.objective
+        assert result.selection.total_students_served >= greedy.selection.total_students_served
+
+    def test_split_divides_cp_sat_workers(self):
+        assert CpSatEngine(num_workers=8).split(4).num_workers == 2
+        assert CpSatEngine(num_workers=2).split(4).num_workers == 1
+        assert ScipEngine().split(4) == ScipEngine()
+
+    def test_get_engine(self):
+        assert get_engine("cp-sat", num_workers=3) == CpSatEngine(num_workers=3)
+        assert isinstance(get_engine("scip"), ScipEngine)
+        with pytest.raises(ValueError):
+            get_engine("gurobi")
+
+    def test_engine_without_solve_cannot_be_created(self):
+        class Unfinished(SolverEngine):
+            name = "unfinished"
+
+        with pytest.raises(TypeError, match="abstract method"):
+            Unfinished()
@@ -0,0 +1,57 @@
+"""Unit tests for the greedy/LP heuristic preview."""
+
+import numpy as np
+
+from app.solver.heuristic import first_fit, lp_relaxation
+from app.solver.matrix import build_demand_matrix
+from app.solver.optimizer import preview, solve
+from tests.instances import generate_inventory, generate_profiles, profile
+
+
+class TestFirstFit:
+    def test_takes_as_many_copies_as_fit(self):
+        matrix = build_demand_matrix({
+            "R": profile("R", 10, {"SKU-A": 10}),
+            "S": profile("S", 5, {"SKU-A": 5}),
+        })
+
+        x = first_fit(matrix, np.array([35]), np.array([0, 1]), upper=np.array([5, 5]))
+
+        assert x.tolist() == [3, 1]
+
+
+class TestLpRelaxation:
+    def test_bound_is_lp_optimum(self):
+        matrix = build_demand_matrix({
+            "S1": profile("S1", 80, {"SKU-A": 80}),
+            "S2": profile("S2", 50, {"SKU-A": 50}),
+        })
+
+        bound, values, prices = lp_relaxation(matrix, np.array([90]), np.ones(2))
+
+        assert abs(bound - 90) < 1e-3
+        assert prices[0] > 0
+
+
+class TestPreview:
+    def test_preview_is_bracketed_by_optimum_and_bound(self):
+        profiles = generate_profiles(80, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.6)
+
+        quick = preview(profiles, inventory)
+        exact = solve(profiles, inventory)
+
+        assert quick.status == "HEURISTIC"
+        assert quick.selection.total_students_served == quick.progress.objective
+        assert quick.progress.objective <= exact.selection.total_students_served
+        assert exact.selection.total_students_served <= quick.progress.best_bound
+        assert 0 <= quick.progress.gap < 1
+
+    def test_preview_selection_respects_caps(self):
+        profiles = generate_profiles(300, seed=7)
+        inventory = generate_inventory(profiles)
+
+        result = preview(profiles, inventory)
+
+        for item in result.inventory_impact:
+            assert item.allocated <= int(item.total_stock * 0.9)
@@ -0,0 +1,136 @@
+"""Long-polls and event streams of jobs, woken by the notification hub."""
+
+import asyncio
+
+import pytest
+
+from app.jobs import JobHub, cancel, claim, enqueue, finish, job_changed, release
+from app.jobs.queue import save_progress
+from app.models import JobKind, JobStatus
+
+
+async def _job(sessions, payload: dict | None = None) -> int:
+    async with sessions() as db:
+        job, _ = await enqueue(db, JobKind.OPTIMIZE, payload or {})
+        return job.job_id
+
+
+@pytest.mark.asyncio
+class TestJobHub:
+    async def test_long_poll_returns_on_change_or_timeout(self, sessions):
+        hub = JobHub(sessions, poll_seconds=5)
+        job_id = await _job(sessions)
+
+        idle = await hub.next(job_id, None, timeout=0.05)
+        assert (idle.status, idle.revision) == ("PENDING", 0)
+        assert await hub.next(job_id + 1, None, timeout=0.05) is None
+
+        waiting = asyncio.ensure_future(hub.next(job_id, idle.revision, timeout=5))
+        await asyncio.sleep(0.05)
+        async with sessions() as db:
+            await claim(db, "w1")
+        # Writes in this process wake the hub without waiting for its poll
+        job_changed()
+        changed = await asyncio.wait_for(waiting, 1)
+        assert (changed.status, changed.revision) == ("PROCESSING", 1)
+
+        # A change the client has not seen yet is returned at once
+        assert (await hub.next(job_id, since=0, timeout=5)).revision == 1
+
+    async def test_waiters_share_one_poll_and_one_read(self, sessions):
+        hub = JobHub(sessions, poll_seconds=0.05)
+        job_id = await _job(sessions)
+        loads = 0
+        load = hub._load
+
+        async def counting_load(job_id):
+            nonlocal loads
+            loads += 1
+            return await load(job_id)
+
+        hub._load = counting_load
+        waiters = [asyncio.ensure_future(hub.next(job_id, 0, timeout=5)) for _ in range(500)]
+        await asyncio.sleep(0.1)
+        async with sessions() as db:
+            await claim(db, "w1")
+
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        assert {r.status for r in results} == {"PROCESSING"}
+        assert len({id(r) for r in results}) == 1
+        assert loads <= 3
+        # Nothing is kept once nobody waits
+        assert not hub._watchers and not hub._snapshots
+
+    async def test_event_stream_sends_each_change_and_the_result_once(self, sessions):
+        hub = JobHub(sessions, poll_seconds=0.05)
+        job_id = await _job(sessions)
+        received: asyncio.Queue = asyncio.Queue()
+
+        async def listen():
+            async for event in hub.events(job_id, keepalive=0.05):
+                if event is not None:
+                    await received.put(event)
+            await received.put(None)
+
+        async def next_event():
+            return await asyncio.wait_for(received.get(), 2)
+
+        listening = asyncio.ensure_future(listen())
+        first = await next_event()
+        assert (first.kind, first.data["status"], first.revision) == ("status", "PENDING", 0)
+        assert "result" not in first.data
+
+        async with sessions() as db:
+            leased = await claim(db, "w1")
+            assert (await next_event()).data["status"] == "PROCESSING"
+            await save_progress(db, leased, {"status": "FEASIBLE", "objective": 3})
+            progress = await next_event()
+            assert (progress.kind, progress.data["result"]["objective"]) == ("progress", 3)
+            await finish(db, leased, JobStatus.COMPLETED, result_json={"status": "OPTIMAL"})
+
+        result = await next_event()
+        assert (result.kind, result.data["status"]) == ("result", "COMPLETED")
+        assert result.data["result"] == {"status": "OPTIMAL"}
+        assert await next_event() is None
+        await listening
+
+        # Resuming after the result ends at once; from before it, sends only the result
+        assert [e async for e in hub.events(job_id, result.revision)] == []
+        resumed = [e async for e in hub.events(job_id, progress.revision)]
+        assert [e.kind for e in resumed] == ["result"]
+
+    async def test_stream_follows_the_queue_position(self, sessions):
+        hub = JobHub(sessions, poll_seconds=5)
+        await _job(sessions, {"n": 1})
+        second = await _job(sessions, {"n": 2})
+        third = await _job(sessions, {"n": 3})
+        stream = hub.events(third, keepalive=5)
+        assert (await anext(stream)).data["queue_position"] == 3
+
+        async with sessions() as db:
+            await claim(db, "w1")
+        job_changed()
+        moved = await asyncio.wait_for(anext(stream), 1)
+        assert (moved.kind, moved.data["status"], moved.data["queue_position"]) == (
+            "status", "PENDING", 2,
+        )
+
+        async with sessions() as db:
+            await cancel(db, second)
+        job_changed()
+        assert (await asyncio.wait_for(anext(stream), 1)).data["queue_position"] == 1
+
+        async with sessions() as db:
+            await release(db, "w1")
+        job_changed()
+        assert (await asyncio.wait_for(anext(stream), 1)).data["queue_position"] == 2
+        await stream.aclose()
+
+    async def test_idle_stream_yields_keepalives(self, sessions):
+        hub = JobHub(sessions, poll_seconds=0.05)
+        job_id = await _job(sessions)
+        stream = hub.events(job_id, keepalive=0.05)
+
+        assert (await anext(stream)).kind == "status"
+        assert await anext(stream) is None
+        await stream.aclose()
@@ -0,0 +1,328 @@
+"""Unit tests for the bulk upsert path shared by the JSON and CSV routes."""
+
+import gzip
+
+import pytest
+import zstandard
+from sqlalchemy import select, update
+
+from app.ingest import (
+    INVENTORY_FIELDS,
+    STUDENT_FIELDS,
+    CSVFormatError,
+    CSVRows,
+    Decompressed,
+    content_encoding,
+    delete_missing_inventory,
+    delete_missing_students,
+    text_chunks,
+    to_columns,
+    upsert_inventory,
+    upsert_students,
+)
+from app.ingest.reader import parse_chunk
+from app.models import Inventory, Student
+from app.solver.demand import aggregate_demand, check_demand
+from app.solver.versions import data_versions
+
+
+def _students(*rows: dict):
+    return to_columns(rows, STUDENT_FIELDS)
+
+
+def _student(student_id: str, school_id: str, shoes: str = "ZAPATO-30") -> dict:
+    return {
+        "student_id": student_id,
+        "school_id": school_id,
+        "shirt_sku": "BLANCA-T8",
+        "pants_sku": "FALDA AZUL-T8",
+        "shoe_size_sku": shoes,
+    }
+
+
+async def _byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):  # may split multi-byte characters
+        yield data[start : start + size]
+
+
+async def _read(
+    text: str, columns: set[str], chunk_size: int, batch_size: int = 100, workers: int = 1
+):
+    rows = CSVRows(_byte_chunks(text.encode(), chunk_size), columns, workers=workers)
+    batches = [batch async for batch in rows.batches(batch_size)]
+    return rows, batches
+
+
+@pytest.mark.asyncio
+class TestCSVRows:
+    CSV = (
+        "\ufeffsku_id,description,total_stock_available\r\n"
+        "A,\"Camisa, talla 8\",3\r\n"
+        "\r\n"
+        "B,\"Pantalón\nazul\",\r\n"
+        "C,Zapato ñ,5\r\n"
+        "D,x,1"
+    )
+    COLUMNS = {"sku_id", "description", "total_stock_available"}
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 20])
+    async def test_same_rows_whatever_the_chunking(self, chunk_size, workers):
+        rows, batches = await _read(self.CSV, self.COLUMNS, chunk_size, 2, workers)
+
+        assert [len(b["sku_id"]) for b in batches] == [2, 1]
+        assert [sku for b in batches for sku in b["sku_id"]] == ["A", "C", "D"]
+        assert batches[0]["description"] == ["Camisa, talla 8", "Zapato ñ"]
+        assert batches[0]["total_stock_available"] == ["3", "5"]
+        assert rows.errors == ["Row 3: blank value(s) for total_stock_available"]
+        assert rows.rows_read == 4
+
+    async def test_error_rows_numbered_across_chunks(self):
+        lines = ["student_id,school_id,shirt_sku,pants_sku,shoe_size_sku"]
+        lines += [f"{i},S{i},B,P,{'' if i % 50 == 0 else 'Z'}" for i in range(1, 201)]
+        rows, batches = await _read("\n".join(lines), set(STUDENT_FIELDS), 256, 64, workers=2)
+
+        assert sum(len(b["student_id"]) for b in batches) == 196
+        assert rows.errors == [
+            f"Row {i + 1}: blank value(s) for shoe_size_sku" for i in (50, 100, 150, 200)
+        ]
+
+    async def test_stray_quote_in_unquoted_field(self):
+        text = "sku_id,description,total_stock_available\n" + 'A,REGLA 12",1\n'
+        text += "".join(f"B{i},x,{i}\n" for i in range(50))
+        rows = CSVRows(_byte_chunks(text.encode(), 64), self.COLUMNS, workers=1)
+
+        # Records keep being cut chunk by chunk after the quote
+        assert max([len(piece) async for piece in rows._texts()]) < 2 * 64
+        rows, batches = await _read(text, self.COLUMNS, 64)
+        assert batches[0]["description"][0] == 'REGLA 12"'
+        assert sum(len(b["sku_id"]) for b in batches) == 51
+
+    async def test_unclosed_quote_is_not_buffered_to_the_end(self, monkeypatch):
+        monkeypatch.setattr("app.ingest.reader.MAX_RECORD_CHARS", 100)
+        text = 'sku_id,description,total_stock_available\nA,"open,1\n' + "B,x,1\n" * 50
+        with pytest.raises(CSVFormatError, match="longer than 100 characters"):
+            await _read(text, self.COLUMNS, 16)
+
+    async def test_missing_columns(self):
+        with pytest.raises(CSVFormatError, match="Missing required columns: total_stock_available"):
+            await _read("sku_id,description\nA,a\n", self.COLUMNS, 4)
+
+    async def test_empty(self):
+        with pytest.raises(CSVFormatError, match="no header"):
+            await _read("", self.COLUMNS, 4)
+
+    async def test_text_payload(self):
+        rows = CSVRows(text_chunks(self.CSV, chunk_size=5), self.COLUMNS)
+        assert [b["sku_id"] async for b in rows.batches(10)] == [["A", "C", "D"]]
+
+    async def test_invalid_utf8(self):
+        chunks = _byte_chunks(b"sku_id,description,total_stock_available\nA,\xff,1\n", 8)
+
+        with pytest.raises(CSVFormatError, match="not valid UTF-8"):
+            [batch async for batch in CSVRows(chunks, self.COLUMNS).batches(10)]
+
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "zstd": lambda data: zstandard.ZstdCompressor().compress(data),
+}
+
+
+@pytest.mark.asyncio
+class TestDecompressed:
+    CSV = TestCSVRows.CSV.encode()
+
+    @pytest.mark.parametrize("codec", ["gzip", "zstd"])
+    @pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+    async def test_rows_of_compressed_upload(self, codec, chunk_size):
+        # Two members/frames back to back, read in small output pieces
+        compress = COMPRESSORS[codec]
+        data = compress(self.CSV[:40]) + compress(self.CSV[40:])
+        source = Decompressed(_byte_chunks(data, chunk_size), chunk_size=8)
+        rows = CSVRows(source, TestCSVRows.COLUMNS)
+
+        assert [b["sku_id"] async for b in rows.batches(10)] == [["A", "C", "D"]]
+        assert rows.errors == ["Row 3: blank value(s) for total_stock_available"]
+        assert (source.codec, source.bytes_read) == (codec, len(data))
+
+    async def test_plain_upload_passes_through(self):
+        source = Decompressed(_byte_chunks(self.CSV, 3))
+        assert b"".join([chunk async for chunk in source]) == self.CSV
+        assert source.codec == "identity"
+
+    @pytest.mark.parametrize("codec", ["gzip", "zstd"])
+    async def test_truncated(self, codec):
+        data = COMPRESSORS[codec](self.CSV)[:-6]
+        with pytest.raises(CSVFormatError, match=f"not valid {codec}"):
+            [chunk async for chunk in Decompressed(_byte_chunks(data, 7))]
+
+    async def test_declared_encoding_must_match(self):
+        with pytest.raises(CSVFormatError, match="declared gzip"):
+            [chunk async for chunk in Decompressed(_byte_chunks(self.CSV, 7), "gzip")]
+
+
+def test_content_encoding():
+    assert content_encoding(None) is None
+    assert content_encoding(" X-GZIP ") == "gzip"
+    assert content_encoding("identity") == "identity"
+    with pytest.raises(CSVFormatError, match="Unsupported Content-Encoding: br"):
+        content_encoding("br")
+
+
+def test_parse_chunk_short_and_long_records():
+    parsed = parse_chunk("a, x ,1\nb\n\nc,y,2,extra\n", ["id", "name", "n"], ["id", "n"])
+
+    assert parsed.columns == {"id": ["a", "c"], "n": ["1", "2"]}
+    assert parsed.rows == 3
+    assert parsed.blank == [(1, ["n"])]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["a,x,1\r\n\r\nb, y ,\r\n", "a,x,1\nb,y\n", "a,x,1\rb,y,2\n", "\n\n", "a,,\n,,\n"],
+)
+def test_parse_chunk_plain_split_matches_csv_reader(text, monkeypatch):
+    fast = parse_chunk(text, ["id", "name", "n"], ["id", "n", "name"])
+    monkeypatch.setattr("app.ingest.reader._split_plain", lambda text, width: None)
+
+    assert parse_chunk(text, ["id", "name", "n"], ["id", "n", "name"]) == fast
+
+
+@pytest.mark.asyncio
+class TestUpsertStudents:
+    async def test_counts_inserts_and_updates_across_batches(self, db):
+        first = await upsert_students(
+            db, _students(*(_student(str(i), "S1") for i in range(5))), batch_size=2
+        )
+        await db.commit()
+        assert (first.inserted, first.updated) == (5, 0)
+
+        rows = _students(_student("3", "S2", "ZAPATO-31"), _student("4", "S2"), _student("9", "S2"))
+        second = await upsert_students(db, rows, batch_size=2)
+        await db.commit()
+        assert (second.inserted, second.updated, second.upserted) == (1, 2, 3)
+
+        profiles = await aggregate_demand(db)
+        assert profiles["S1"].total_students == 3
+        assert profiles["S2"].total_students == 3
+        assert profiles["S2"].sku_demand["ZAPATO-31"] == 1
+        assert await check_demand(db) == []
+
+    async def test_unchanged_rows_are_skipped(self, db):
+        rows = _students(*(_student(str(i), "S1") for i in range(4)))
+        await upsert_students(db, rows, batch_size=3)
+        await db.commit()
+
+        rows["school_id"][1] = "S2"
+        result = await upsert_students(db, rows, batch_size=3)
+        await db.commit()
+
+        assert (result.inserted, result.updated, result.unchanged) == (0, 1, 3)
+        profiles = await aggregate_demand(db)
+        assert (profiles["S1"].total_students, profiles["S2"].total_students) == (3, 1)
+        assert await check_demand(db) == []
+
+    async def test_rows_without_hash_are_rewritten(self, db):
+        await upsert_students(db, _students(_student("1", "S1")))
+        await db.execute(update(Student).values(row_hash=None))
+
+        result = await upsert_students(db, _students(_student("1", "S1")))
+
+        assert (result.updated, result.unchanged) == (1, 0)
+        assert (await db.get(Student, "1")).row_hash is not None
+
+    async def test_snapshot_deletes_missing_students(self, db):
+        await upsert_students(db, _students(*(_student(str(i), f"S{i % 2}") for i in range(5))))
+        await db.commit()
+
+        seen: set[str] = set()
+        rows = _students(_student("0", "S0"), _student("1", "S1"), _student("7", "S1"))
+        result = await upsert_students(db, rows, seen=seen)
+        batches: list[int] = []
+
+        async def on_batch(deleted: int) -> None:
+            batches.append(deleted)
+
+        deleted = await delete_missing_students(db, seen, batch_size=2, on_batch=on_batch)
+        await db.commit()
+
+        assert (result.inserted, result.unchanged, deleted) == (1, 2, 3)
+        assert batches == [2, 3]
+        assert seen == {"0", "1", "7"}
+        profiles = await aggregate_demand(db)
+        assert (profiles["S0"].total_students, profiles["S1"].total_students) == (1, 2)
+        assert await check_demand(db) == []
+
+    async def test_duplicate_key_last_row_wins(self, db):
+        rows = _students(_student("1", "S1"), _student("1", "S2", "ZAPATO-31"))
+
+        result = await upsert_students(db, rows)
+        await db.commit()
+
+        assert (result.inserted, result.updated) == (1, 1)
+        profiles = await aggregate_demand(db)
+        assert list(profiles) == ["S2"]
+        assert profiles["S2"].sku_demand["ZAPATO-31"] == 1
+        assert await check_demand(db) == []
+
+    async def test_only_changing_writes_bump_the_data_version(self, db):
+        rows = _students(_student("1", "S1"), _student("2", "S1"))
+        await upsert_students(db, rows)
+        await upsert_students(db, rows)
+        assert await data_versions(db) == {"students": 1}
+
+        rows["school_id"][0] = "S2"
+        seen: set[str] = set()
+        await upsert_students(db, rows, seen=seen)
+        await delete_missing_students(db, seen)
+        assert await data_versions(db) == {"students": 2}
+
+        await delete_missing_students(db, {"1"})
+        await upsert_inventory(
+            db, {"sku_id": ["A"], "description": ["a"], "total_stock_available": [1]}
+        )
+        assert await data_versions(db) == {"students": 3, "inventory": 1}
+
+
+@pytest.mark.asyncio
+class TestUpsertInventory:
+    async def test_insert_then_update(self, db):
+        await upsert_inventory(
+            db, {"sku_id": ["A"], "description": ["a"], "total_stock_available": [1]}
+        )
+        result = await upsert_inventory(
+            db,
+            to_columns(
+                [
+                    {"sku_id": "A", "description": "a2", "total_stock_available": 5},
+                    {"sku_id": "B", "description": "b", "total_stock_available": 2},
+                ],
+                INVENTORY_FIELDS,
+            ),
+        )
+        await db.commit()
+
+        assert (result.inserted, result.updated) == (1, 1)
+        rows = (await db.execute(select(Inventory).order_by(Inventory.sku_id))).scalars().all()
+        assert [(r.sku_id, r.description, r.total_stock_available) for r in rows] == [
+            ("A", "a2", 5),
+            ("B", "b", 2),
+        ]
+
+    async def test_unchanged_and_snapshot(self, db):
+        await upsert_inventory(
+            db, {"sku_id": ["A", "B"], "description": ["a", "b"], "total_stock_available": [1, 2]}
+        )
+        seen: set[str] = set()
+        result = await upsert_inventory(
+            db,
+            {"sku_id": ["A", "C"], "description": ["a", "c"], "total_stock_available": [1, 3]},
+            seen=seen,
+        )
+        deleted = await delete_missing_inventory(db, seen)
+        await db.commit()
+
+        assert (result.inserted, result.updated, result.unchanged, deleted) == (1, 0, 1, 1)
+        rows = (await db.execute(select(Inventory.sku_id).order_by(Inventory.sku_id))).scalars()
+        assert list(rows) == ["A", "C"]
@@ -0,0 +1,57 @@
+"""Unit tests for the sparse demand matrix and bulk model builder."""
+
+import numpy as np
+
+from app.solver.matrix import build_demand_matrix
+from app.solver.model import build_model
+from tests.instances import profile
+
+
+class TestDemandMatrix:
+    def test_only_nonzeros_are_stored(self):
+        profiles = {
+            "S1": profile("S1", 10, {"SKU-B": 10, "SKU-A": 10}),
+            "S2": profile("S2", 5, {"SKU-C": 5, "SKU-A": 0}),
+        }
+
+        matrix = build_demand_matrix(profiles)
+
+        assert matrix.school_ids == ["S1", "S2"]
+        assert matrix.sku_ids == ["SKU-A", "SKU-B", "SKU-C"]
+        assert matrix.nnz == 3
+        assert matrix.students.tolist() == [10, 5]
+        assert matrix.demand.toarray().tolist() == [[10, 10, 0], [0, 0, 5]]
+
+    def test_caps_apply_safety_factor(self):
+        profiles = {"S1": profile("S1", 1, {"SKU-A": 1, "SKU-B": 1})}
+        matrix = build_demand_matrix(profiles)
+
+        caps = matrix.caps({"SKU-A": 100}, 0.9)
+
+        assert caps.tolist() == [90, 0]
+
+    def test_empty_profiles(self):
+        matrix = build_demand_matrix({})
+
+        assert matrix.n_schools == 0
+        assert matrix.n_skus == 0
+        assert matrix.nnz == 0
+
+
+class TestBuildModel:
+    def test_model_dimensions(self):
+        profiles = {
+            "S1": profile("S1", 10, {"SKU-A": 10, "SKU-B": 10}),
+            "S2": profile("S2", 5, {"SKU-B": 5}),
+            "S3": profile("S3", 7, {"SKU-C": 7}),
+        }
+        matrix = build_demand_matrix(profiles)
+
+        model = build_model(matrix, np.array([9, 9, 9]))
+
+        assert model.num_variables() == 3
+        assert model.num_constraints() == 3
+        assert model.constraint_var_indices(1) == [0, 1]
+        assert model.constraint_coefficients(1) == [10.0, 5.0]
+        assert model.constraint_upper_bound(1) == 9.0
+        assert all(model.var_is_integral(j) for j in range(3))
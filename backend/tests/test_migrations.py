@@ -0,0 +1,79 @@
+"""Upgrading databases created by earlier versions in place."""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Base
+from app.models import migrations
+
+
+def _upgrade(conn) -> None:
+    migrations.before_create(conn)
+    Base.metadata.create_all(conn)
+    migrations.after_create(conn)
+
+
+def test_students_with_sku_strings_move_to_catalog_keys():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE students (student_id VARCHAR PRIMARY KEY, school_id VARCHAR NOT NULL, "
+            "shirt_sku VARCHAR NOT NULL, pants_sku VARCHAR NOT NULL, shoe_size_sku VARCHAR NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_students_school_id ON students (school_id)"))
+        conn.execute(text(
+            "INSERT INTO students VALUES "
+            "('1', 'S1', 'BLANCA-T8', 'FALDA AZUL-T8', 'ZAPATO-30'), "
+            "('2', 'S2', 'BLANCA-T8', 'PANTALON AZUL-T8', 'ZAPATO-31')"
+        ))
+
+        _upgrade(conn)
+
+        assert not inspect(conn).has_table("legacy_students")
+        rows = conn.execute(text(
+            "SELECT s.student_id, a.sku_id, b.sku_id, c.sku_id FROM students s "
+            "JOIN skus a ON a.sku_key = s.shirt_sku_key "
+            "JOIN skus b ON b.sku_key = s.pants_sku_key "
+            "JOIN skus c ON c.sku_key = s.shoe_sku_key ORDER BY s.student_id"
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            ("1", "BLANCA-T8", "FALDA AZUL-T8", "ZAPATO-30"),
+            ("2", "BLANCA-T8", "PANTALON AZUL-T8", "ZAPATO-31"),
+        ]
+        assert conn.execute(text("SELECT count(*) FROM skus")).scalar() == 5
+
+        _upgrade(conn)  # no-op on the new layout
+        assert conn.execute(text("SELECT count(*) FROM students")).scalar() == 2
+
+
+def test_jobs_gain_new_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE jobs (job_id INTEGER PRIMARY KEY, status VARCHAR(10) NOT NULL, "
+            "result_json JSON, created_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO jobs VALUES (1, 'COMPLETED', NULL, '2025-01-01')"))
+
+        _upgrade(conn)
+
+        assert conn.execute(text("SELECT kind, cache_hit FROM jobs")).one() == ("OPTIMIZE", None)
+        assert conn.execute(text("SELECT attempts, stop_requested, worker_id FROM jobs")).one() == (
+            0, 0, None,
+        )
+        assert conn.execute(text("SELECT input_key, requests, revision FROM jobs")).one() == (
+            None, 1, 0,
+        )
+
+
+def test_inventory_gains_row_hash():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE inventory (sku_id VARCHAR PRIMARY KEY, description VARCHAR NOT NULL, "
+            "total_stock_available INTEGER NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO inventory VALUES ('A', 'a', 3)"))
+
+        _upgrade(conn)
+
+        assert conn.execute(text("SELECT sku_id, row_hash FROM inventory")).one() == ("A", None)
@@ -0,0 +1,86 @@
+"""Slots, cancellation and incumbent delivery of the solver pool."""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.jobs import SolverPool
+
+
+def _count(n: int, on_incumbent, should_stop) -> int:
+    for i in range(n):
+        on_incumbent(i)
+    return n
+
+
+def _until_stopped(on_incumbent, should_stop) -> str:
+    deadline = time.monotonic() + 30
+    on_incumbent("started")
+    while not should_stop():
+        if time.monotonic() > deadline:
+            return "timed out"
+        time.sleep(0.01)
+    return "stopped"
+
+
+def _fail() -> None:
+    raise ValueError("no feasible selection")
+
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = SolverPool(workers=1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+class TestSolverPool:
+    async def test_slot_waits_until_one_is_free(self, pool):
+        seen = []
+
+        async def hold(job_id):
+            async with pool.slot(job_id) as slot:
+                seen.append((job_id, slot))
+                await asyncio.sleep(0.05)
+                seen.append(job_id)
+
+        await asyncio.gather(hold(1), hold(2))
+
+        assert seen == [(1, 0), 1, (2, 0), 2]
+
+    async def test_incumbents_arrive_in_order_before_the_result(self, pool):
+        seen = []
+
+        async def on_incumbent(partial):
+            seen.append(partial)
+
+        async with pool.slot(1) as slot:
+            result = await pool.run(1, slot, _count, 5, on_incumbent=on_incumbent)
+
+        assert (result, seen) == (5, [0, 1, 2, 3, 4])
+
+    async def test_cancel_running_job(self, pool):
+        started = asyncio.Event()
+
+        async def on_incumbent(partial):
+            started.set()
+
+        async with pool.slot(1) as slot:
+            run = asyncio.ensure_future(
+                pool.run(1, slot, _until_stopped, on_incumbent=on_incumbent)
+            )
+            await started.wait()
+            assert pool.cancel(1)
+
+            assert await run == "stopped"
+            assert pool.cancelled(1) and pool.stopped(1)
+        assert not pool.cancelled(1)
+        assert not pool.cancel(1)
+
+    async def test_worker_error_is_raised(self, pool):
+        async with pool.slot(1) as slot:
+            with pytest.raises(ValueError, match="no feasible selection"):
+                await pool.run(1, slot, _fail)
@@ -0,0 +1,88 @@
+"""Unit tests for the presolve / instance-reduction stage."""
+
+import numpy as np
+from ortools.linear_solver.python import model_builder_helper as mbh
+
+from app.solver.matrix import build_demand_matrix
+from app.solver.model import build_model
+from app.solver.optimizer import SAFETY_FACTOR, solve
+from app.solver.presolve import presolve
+from tests.instances import generate_inventory, generate_profiles, profile
+
+
+def _optimum(matrix, caps, upper=None) -> float:
+    solver = mbh.ModelSolverHelper("scip")
+    solver.solve(build_model(matrix, caps, upper=upper))
+    return solver.objective_value()
+
+
+class TestReductions:
+    def test_school_over_cap_is_fixed_out(self):
+        profiles = {
+            "S1": profile("S1", 95, {"SKU-A": 95}),
+            "S2": profile("S2", 50, {"SKU-A": 50}),
+            "S3": profile("S3", 50, {"SKU-A": 50}),
+        }
+        matrix = build_demand_matrix(profiles)
+
+        reduced = presolve(matrix, matrix.caps({"SKU-A": 100}, SAFETY_FACTOR))
+
+        assert reduced.fixed_out == [0]
+        assert reduced.stats.schools_fixed_out == 1
+
+    def test_slack_sku_is_dropped_and_its_schools_fixed_in(self):
+        profiles = {
+            "S1": profile("S1", 10, {"SKU-A": 10}),
+            "S2": profile("S2", 60, {"SKU-B": 60}),
+            "S3": profile("S3", 50, {"SKU-B": 50}),
+        }
+        matrix = build_demand_matrix(profiles)
+
+        reduced = presolve(matrix, matrix.caps({"SKU-A": 100, "SKU-B": 100}, SAFETY_FACTOR))
+
+        assert reduced.matrix.sku_ids == ["SKU-B"]
+        assert reduced.fixed_in == [0]
+        assert reduced.stats.constraints_removed == 1
+        assert reduced.stats.schools_fixed_in == 1
+
+    def test_identical_schools_are_merged(self):
+        profiles = {
+            f"R{i}": profile(f"R{i}", 10, {"SKU-A": 10, "SKU-B": 10}) for i in range(5)
+        }
+        profiles["BIG"] = profile("BIG", 40, {"SKU-A": 40})
+        matrix = build_demand_matrix(profiles)
+
+        reduced = presolve(matrix, matrix.caps({"SKU-A": 60, "SKU-B": 100}, 1.0))
+
+        assert reduced.matrix.n_schools == 2
+        assert sorted(reduced.counts.tolist()) == [1, 5]
+        assert reduced.stats.schools_merged == 4
+        assert reduced.stats.variables_removed == 4
+        assert reduced.expand(np.array([3, 0])) == [0, 1, 2]
+
+
+class TestEquivalence:
+    def test_presolved_optimum_matches_full_model(self):
+        for seed in range(5):
+            profiles = generate_profiles(60, groups_per_school=1, seed=seed)
+            inventory = generate_inventory(profiles, coverage=0.5)
+            matrix = build_demand_matrix(profiles)
+            caps = matrix.caps(inventory, SAFETY_FACTOR)
+
+            reduced = presolve(matrix, caps)
+            fixed_in = int(matrix.students[reduced.fixed_in].sum())
+            presolved = _optimum(reduced.matrix, reduced.caps, reduced.counts) + fixed_in
+
+            assert presolved == _optimum(matrix, caps)
+
+    def test_solve_reports_reduction(self):
+        profiles = {
+            "S1": profile("S1", 95, {"SKU-A": 95}),
+            "S2": profile("S2", 10, {"SKU-B": 10}),
+        }
+
+        result = solve(profiles, {"SKU-A": 100, "SKU-B": 100})
+
+        assert result.selection.selected_school_ids == ["S2"]
+        assert result.presolve.variables_removed == 2
+        assert result.presolve.constraints_removed == 2
@@ -0,0 +1,195 @@
+"""Claims, leases and recovery of the durable job queue, and the worker loop."""
+
+import asyncio
+
+import pytest
+
+from app.jobs import (
+    QueueFull,
+    SolverPool,
+    Worker,
+    cancel,
+    claim,
+    enqueue,
+    finish,
+    heartbeat,
+    queue_position,
+    recover_expired,
+    release,
+    request_stop,
+)
+from app.models import Job, JobKind, JobStatus
+from app.solver.versions import STUDENTS, bump_data_version
+
+
+async def _jobs(db, n: int, kind: JobKind = JobKind.OPTIMIZE) -> list[Job]:
+    """``n`` jobs with different requests."""
+    return [(await enqueue(db, kind, {"time_limit_seconds": i + 1}))[0] for i in range(n)]
+
+
+async def _status(db, job_id: int) -> JobStatus:
+    job = await db.get(Job, job_id)
+    await db.refresh(job)
+    return job.status
+
+
+@pytest.mark.asyncio
+class TestQueue:
+    async def test_enqueue_is_bounded_and_reports_positions(self, db):
+        first, second = await _jobs(db, 2)
+        assert [await queue_position(db, job) for job in (first, second)] == [1, 2]
+        with pytest.raises(QueueFull, match="2 jobs waiting"):
+            await enqueue(db, JobKind.OPTIMIZE, {"time_limit_seconds": 9}, max_waiting=2)
+
+        await claim(db, "w1")
+        await db.refresh(first)
+        await db.refresh(second)
+        assert await queue_position(db, first) is None
+        assert await queue_position(db, second) == 1
+
+    async def test_claims_oldest_solver_job_once(self, db):
+        db.add(Job(kind=JobKind.INGEST))
+        await db.commit()
+        first, second = await _jobs(db, 2, JobKind.SCENARIOS)
+
+        a = await claim(db, "w1")
+        b = await claim(db, "w2")
+        assert (a.job_id, a.kind, a.attempts, a.worker_id) == (
+            first.job_id, JobKind.SCENARIOS, 1, "w1",
+        )
+        assert b.job_id == second.job_id
+        assert await claim(db, "w3") is None
+
+    async def test_heartbeat_carries_stop_and_cancel(self, db):
+        (job,) = await _jobs(db, 1)
+        leased = await claim(db, "w1")
+
+        assert await heartbeat(db, leased) is False
+        assert await request_stop(db, job.job_id)
+        assert await heartbeat(db, leased) is True
+
+        assert await cancel(db, job.job_id) == 0
+        assert await heartbeat(db, leased) is None
+        # The worker lost the job: its result is dropped
+        assert not await finish(db, leased, JobStatus.COMPLETED, result_json={})
+        assert await _status(db, job.job_id) == JobStatus.CANCELLED
+        assert await cancel(db, job.job_id) is None
+
+    async def test_expired_lease_is_retried_then_failed(self, db):
+        (job,) = await _jobs(db, 1)
+
+        assert (await claim(db, "w1", lease_seconds=-1)).attempts == 1
+        assert await recover_expired(db, max_attempts=2) == 1
+        assert await _status(db, job.job_id) == JobStatus.PENDING
+
+        assert (await claim(db, "w2", lease_seconds=-1)).attempts == 2
+        assert await recover_expired(db, max_attempts=2) == 1
+        await db.refresh(job)
+        assert job.status == JobStatus.FAILED
+        assert "interrupted 2 times" in job.result_json["error"]
+
+    async def test_live_lease_is_not_recovered(self, db):
+        await _jobs(db, 1)
+        await claim(db, "w1")
+        assert await recover_expired(db) == 0
+
+    async def test_expired_ingest_job_fails(self, db):
+        job = Job(
+            kind=JobKind.INGEST, status=JobStatus.PROCESSING, result_json={"rows_processed": 5}
+        )
+        db.add(job)
+        await db.commit()
+
+        assert await recover_expired(db) == 1
+        await db.refresh(job)
+        assert job.status == JobStatus.FAILED
+        assert job.result_json["rows_processed"] == 5
+        assert "Ingest interrupted" in job.result_json["error"]
+
+    async def test_identical_requests_share_a_live_job(self, db):
+        first, position = await enqueue(db, JobKind.OPTIMIZE, {"gap_limit": 0.01})
+        # Joining adds no solve, so even a full queue accepts it
+        again, again_position = await enqueue(
+            db, JobKind.OPTIMIZE, {"gap_limit": 0.01}, max_waiting=0
+        )
+        assert (again.job_id, again.requests, again_position) == (first.job_id, 2, position)
+
+        other, _ = await enqueue(db, JobKind.OPTIMIZE, {"gap_limit": 0.02})
+        scenarios, _ = await enqueue(db, JobKind.SCENARIOS, {"gap_limit": 0.01})
+        assert len({first.job_id, other.job_id, scenarios.job_id}) == 3
+
+        await claim(db, "w1")
+        running, position = await enqueue(db, JobKind.OPTIMIZE, {"gap_limit": 0.01})
+        assert (running.job_id, running.requests, position) == (first.job_id, 3, 0)
+
+    async def test_changed_data_starts_a_new_run(self, db):
+        first, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        await bump_data_version(db, STUDENTS)
+        await db.commit()
+
+        second, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        assert second.job_id != first.job_id
+
+    async def test_finished_or_stopped_job_takes_no_new_requests(self, db):
+        first, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        await finish(db, await claim(db, "w1"), JobStatus.COMPLETED, result_json={})
+
+        second, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        assert second.job_id != first.job_id
+
+        await claim(db, "w1")
+        assert await request_stop(db, second.job_id)
+        third, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        assert third.job_id not in (first.job_id, second.job_id)
+        assert third.requests == 1
+
+    async def test_shared_job_is_cancelled_by_its_last_request(self, db):
+        job, _ = await enqueue(db, JobKind.OPTIMIZE, {})
+        await enqueue(db, JobKind.OPTIMIZE, {})
+
+        assert await cancel(db, job.job_id) == 1
+        assert await _status(db, job.job_id) == JobStatus.PENDING
+        assert await cancel(db, job.job_id) == 0
+        assert await _status(db, job.job_id) == JobStatus.CANCELLED
+
+    async def test_release_requeues_without_counting_an_attempt(self, db):
+        (job,) = await _jobs(db, 1)
+        await claim(db, "w1")
+
+        assert await release(db, "w1") == 1
+        await db.refresh(job)
+        assert (job.status, job.attempts, job.worker_id) == (JobStatus.PENDING, 0, None)
+
+
+async def _until_finished(sessions, job_id: int) -> Job:
+    for _ in range(600):
+        async with sessions() as db:
+            job = await db.get(Job, job_id)
+            if job.status not in (JobStatus.PENDING, JobStatus.PROCESSING):
+                return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_and_records_failures(sessions):
+    pool = SolverPool(workers=1)
+    worker = Worker(pool, sessions, poll_seconds=0.05, heartbeat_seconds=0.05)
+    async with sessions() as db:
+        solved, _ = await enqueue(db, JobKind.OPTIMIZE, {"use_cache": False})
+        broken, _ = await enqueue(db, JobKind.SCENARIOS, {"scenarios": []})
+
+    running = asyncio.ensure_future(worker.run())
+    try:
+        solved = await _until_finished(sessions, solved.job_id)
+        broken = await _until_finished(sessions, broken.job_id)
+    finally:
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+        pool.shutdown()
+
+    assert solved.status == JobStatus.COMPLETED
+    assert solved.worker_id == worker.worker_id and solved.lease_expires_at is None
+    assert solved.result_json["status"] == "OPTIMAL"
+    assert broken.status == JobStatus.FAILED
+    assert broken.result_json["error"].startswith("ValidationError")
@@ -0,0 +1,61 @@
+"""Unit tests for batched what-if scenarios."""
+
+from app.solver.scenarios import Scenario, solve_scenarios
+from tests.instances import generate_inventory, generate_profiles, profile
+
+
+PROFILES = {
+    "S1": profile("S1", 50, {"SKU-A": 50}),
+    "S2": profile("S2", 30, {"SKU-A": 30}),
+    "S3": profile("S3", 20, {"SKU-B": 20}),
+}
+INVENTORY = {"SKU-A": 100, "SKU-B": 100}
+
+
+class TestScenario:
+    def test_overrides_then_shipment_applied(self):
+        scenario = Scenario("s", inventory={"SKU-A": 10}, shipment={"SKU-A": 5, "SKU-C": 7})
+
+        assert scenario.apply(INVENTORY) == {"SKU-A": 15, "SKU-B": 100, "SKU-C": 7}
+        assert INVENTORY == {"SKU-A": 100, "SKU-B": 100}
+
+
+class TestSolveScenarios:
+    def test_comparison_against_first_scenario(self):
+        batch = solve_scenarios(
+            PROFILES,
+            INVENTORY,
+            [
+                Scenario("base"),
+                Scenario("tight", safety_factor=0.5),
+                Scenario("restock", inventory={"SKU-B": 0}, shipment={"SKU-B": 25}),
+            ],
+            max_workers=1,
+        )
+
+        rows = {row.name: row for row in batch.comparison}
+        assert [row.name for row in batch.comparison] == ["base", "tight", "restock"]
+        assert rows["base"].total_students_served == 100
+        assert rows["base"].students_delta == 0
+        # 0.5 × 100 = 50 units of SKU-A → only S1 fits next to S3
+        assert rows["tight"].total_students_served == 70
+        assert rows["tight"].students_delta == -30
+        # 25 × 0.9 = 22 units of SKU-B still cover S3
+        assert rows["restock"].total_students_served == 100
+        assert batch.scenarios["tight"].selection.selected_school_ids == ["S1", "S3"]
+
+    def test_pool_matches_inline(self):
+        profiles = generate_profiles(80, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.6)
+        scenarios = [
+            Scenario("base"),
+            Scenario("sf80", safety_factor=0.8),
+            Scenario("sf95", safety_factor=0.95),
+        ]
+
+        inline = solve_scenarios(profiles, inventory, scenarios, max_workers=1)
+        pooled = solve_scenarios(profiles, inventory, scenarios, max_workers=2)
+
+        served = lambda batch: [row.total_students_served for row in batch.comparison]
+        assert served(pooled) == served(inline)
+        assert served(inline)[1] <= served(inline)[0] <= served(inline)[2]
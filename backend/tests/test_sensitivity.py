@@ -0,0 +1,55 @@
+"""Unit tests for the marginal-stock sensitivity report."""
+
+from app.solver.matrix import build_demand_matrix
+from app.solver.optimizer import solve
+from app.solver.sensitivity import analyze_sensitivity
+from tests.instances import generate_inventory, generate_profiles, profile
+
+
+class TestAnalyzeSensitivity:
+    def test_units_to_unlock_single_blocked_school(self):
+        profiles = {
+            "S1": profile("S1", 100, {"SKU-A": 80}),
+            "S2": profile("S2", 60, {"SKU-A": 10, "SKU-B": 50}),
+        }
+        inventory = {"SKU-A": 100, "SKU-B": 50}
+
+        result = solve(profiles, inventory, sensitivity=True)
+
+        assert result.selection.selected_school_ids == ["S1"]
+        [item] = result.sensitivity.items
+        assert item.sku_id == "SKU-B"
+        assert item.usable == 45
+        # int((50 + 6) × 0.9) = 50 covers S2's 50 units; 5 more would give 49
+        assert item.units_needed == 6
+        assert item.next_school_id == "S2"
+        assert item.students_gained == 60
+        assert item.resolved
+
+    def test_nothing_binding_when_all_selected(self):
+        profiles = {"S1": profile("S1", 10, {"SKU-A": 10})}
+
+        result = solve(profiles, {"SKU-A": 100}, sensitivity=True)
+
+        assert result.sensitivity.items == []
+        assert result.sensitivity.binding_skus == 0
+
+    def test_reported_gains_are_achievable(self):
+        profiles = generate_profiles(80, seed=5)
+        inventory = generate_inventory(profiles, coverage=0.6)
+        matrix = build_demand_matrix(profiles)
+        base = solve(profiles, inventory)
+        rows = [matrix.school_ids.index(sid) for sid in base.selection.selected_school_ids]
+
+        report = analyze_sensitivity(matrix, inventory, 0.9, rows, resolve_top=5)
+
+        assert report.binding_skus == len(report.items) > 0
+        assert report.resolves == 5
+        for item in report.items[:3]:
+            restocked = {**inventory, item.sku_id: item.stock + item.units_needed}
+            gained = (
+                solve(profiles, restocked).selection.total_students_served
+                - base.selection.total_students_served
+            )
+            assert item.students_gained > 0
+            assert gained >= item.students_gained
@@ -1,15 +1,7 @@
 """Unit tests for the ILP solver with known-answer scenarios."""
 
-from app.solver.demand import SchoolDemandProfile
 from app.solver.optimizer import solve, SAFETY_FACTOR
-
-
-def _profile(school_id: str, total_students: int, sku_demand: dict[str, int]):
-    return SchoolDemandProfile(
-        school_id=school_id,
-        total_students=total_students,
-        sku_demand=sku_demand,
-    )
+from tests.instances import profile
 
 
 class TestSolverBasic:
@@ -18,7 +10,7 @@ class TestSolverBasic:
     def test_single_school_fits(self):
         """One school that easily fits within the 90% cap."""
         profiles = {
-            "S1": _profile("S1", 50, {"BLANCA-T8": 50, "PANTALON AZUL-T8": 50, "ZAPATO-30": 50}),
+            "S1": profile("S1", 50, {"BLANCA-T8": 50, "PANTALON AZUL-T8": 50, "ZAPATO-30": 50}),
         }
         inventory = {"BLANCA-T8": 100, "PANTALON AZUL-T8": 100, "ZAPATO-30": 100}
 
@@ -32,7 +24,7 @@ class TestSolverBasic:
         """One school whose demand exceeds the 90% cap on a SKU."""
         # Demand 95 but 90% of 100 = 90 → won't fit
         profiles = {
-            "S1": _profile("S1", 95, {"BLANCA-T8": 95}),
+            "S1": profile("S1", 95, {"BLANCA-T8": 95}),
         }
         inventory = {"BLANCA-T8": 100}
 
@@ -59,8 +51,8 @@ class TestSolverOptimality:
         """Given two schools competing for the same SKU, pick the larger one."""
         # 90% of 100 = 90.  S1 needs 80, S2 needs 50.  Both can't fit (130 > 90).
         profiles = {
-            "S1": _profile("S1", 80, {"BLANCA-T8": 80}),
-            "S2": _profile("S2", 50, {"BLANCA-T8": 50}),
+            "S1": profile("S1", 80, {"BLANCA-T8": 80}),
+            "S2": profile("S2", 50, {"BLANCA-T8": 50}),
         }
         inventory = {"BLANCA-T8": 100}
 
@@ -75,9 +67,9 @@ class TestSolverOptimality:
         # S1 needs 80, S2 needs 50, S3 needs 40 → S2+S3=90 students, demand 90 units
         # S1 alone = 80 students.  S2+S3 = 90 students → solver picks S2+S3
         profiles = {
-            "BIG": _profile("BIG", 80, {"BLANCA-T8": 150}),
-            "SM1": _profile("SM1", 50, {"BLANCA-T8": 50}),
-            "SM2": _profile("SM2", 40, {"BLANCA-T8": 40}),
+            "BIG": profile("BIG", 80, {"BLANCA-T8": 150}),
+            "SM1": profile("SM1", 50, {"BLANCA-T8": 50}),
+            "SM2": profile("SM2", 40, {"BLANCA-T8": 40}),
         }
         inventory = {"BLANCA-T8": 200}
         # cap = 180.  BIG alone = 150 (fits, 80 students)
@@ -93,8 +85,8 @@ class TestSolverOptimality:
         # S1 needs SKU-A and SKU-B, S2 only needs SKU-A
         # SKU-A cap = 90, SKU-B cap = 45
         profiles = {
-            "S1": _profile("S1", 60, {"SKU-A": 60, "SKU-B": 50}),
-            "S2": _profile("S2", 40, {"SKU-A": 40}),
+            "S1": profile("S1", 60, {"SKU-A": 60, "SKU-B": 50}),
+            "S2": profile("S2", 40, {"SKU-A": 40}),
         }
         inventory = {"SKU-A": 100, "SKU-B": 50}
         # SKU-B cap = 45 → S1 needs 50 → S1 excluded.  S2 fits.
@@ -110,7 +102,7 @@ class TestInventoryImpact:
 
     def test_impact_numbers(self):
         profiles = {
-            "S1": _profile("S1", 30, {"BLANCA-T8": 30, "ZAPATO-30": 30}),
+            "S1": profile("S1", 30, {"BLANCA-T8": 30, "ZAPATO-30": 30}),
         }
         inventory = {"BLANCA-T8": 100, "ZAPATO-30": 200}
 
@@ -129,15 +121,26 @@ class TestInventoryImpact:
         assert shoe.remaining == 170
         assert shoe.usage_pct == 15.0
 
+    def test_inventory_sku_without_demand(self):
+        profiles = {"S1": profile("S1", 10, {"SKU-A": 10})}
+        inventory = {"SKU-A": 100, "SKU-Z": 0}
+
+        result = solve(profiles, inventory)
+
+        impact_by_sku = {i.sku_id: i for i in result.inventory_impact}
+        assert [i.sku_id for i in result.inventory_impact] == ["SKU-A", "SKU-Z"]
+        assert impact_by_sku["SKU-Z"].allocated == 0
+        assert impact_by_sku["SKU-Z"].usage_pct == 0.0
+
 
 class TestShortageReport:
-    """Verify the shortage report targets the largest excluded school."""
+    """Verify the shortage report targets the largest excluded schools."""
 
     def test_shortage_identifies_bottleneck(self):
         # S1 (100 students) selected, S2 (60 students) excluded due to SKU-B
         profiles = {
-            "S1": _profile("S1", 100, {"SKU-A": 80}),
-            "S2": _profile("S2", 60, {"SKU-A": 10, "SKU-B": 50}),
+            "S1": profile("S1", 100, {"SKU-A": 80}),
+            "S2": profile("S2", 60, {"SKU-A": 10, "SKU-B": 50}),
         }
         inventory = {"SKU-A": 100, "SKU-B": 50}
         # SKU-A cap=90, SKU-B cap=45.  S1 uses 80 of SKU-A.
@@ -156,7 +159,7 @@ class TestShortageReport:
 
     def test_no_shortage_when_all_selected(self):
         profiles = {
-            "S1": _profile("S1", 10, {"SKU-A": 10}),
+            "S1": profile("S1", 10, {"SKU-A": 10}),
         }
         inventory = {"SKU-A": 100}
 
@@ -164,3 +167,26 @@ class TestShortageReport:
 
         assert result.selection.selected_school_ids == ["S1"]
         assert result.shortages == []
+
+    def test_top_n_excluded_schools(self):
+        # Only S1 fits; S2..S4 are excluded, largest first
+        profiles = {
+            "S1": profile("S1", 100, {"SKU-A": 90}),
+            "S2": profile("S2", 20, {"SKU-A": 20, "SKU-B": 20}),
+            "S3": profile("S3", 60, {"SKU-A": 5, "SKU-B": 60}),
+            "S4": profile("S4", 40, {"SKU-A": 40}),
+        }
+        inventory = {"SKU-A": 100, "SKU-B": 50}
+
+        result = solve(profiles, inventory, shortage_schools=2)
+
+        assert result.selection.selected_school_ids == ["S1"]
+        assert [(s.school_id, s.sku_id, s.deficit) for s in result.shortages] == [
+            ("S3", "SKU-B", 15),
+            ("S3", "SKU-A", 5),
+            ("S4", "SKU-A", 40),
+        ]
+
+        assert solve(profiles, inventory, shortage_schools=0).shortages == []
+        everyone = solve(profiles, inventory, shortage_schools=10)
+        assert {s.school_id for s in everyone.shortages} == {"S2", "S3", "S4"}
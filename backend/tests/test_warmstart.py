@@ -0,0 +1,84 @@
+"""Unit tests for warm-start repair and hinted solves."""
+
+import pytest
+
+from app.jobs.runner import solve_baseline
+from app.models import Job, JobKind, JobStatus
+from app.solver.matrix import build_demand_matrix
+from app.solver.optimizer import solve
+from app.solver.warmstart import repair_selection
+from tests.instances import profile
+
+
+PROFILES = {
+    "S1": profile("S1", 50, {"SKU-A": 50}),
+    "S2": profile("S2", 30, {"SKU-A": 30}),
+    "S3": profile("S3", 20, {"SKU-A": 20, "SKU-B": 20}),
+}
+
+
+class TestRepairSelection:
+    def test_previous_selection_kept_when_it_still_fits(self):
+        matrix = build_demand_matrix(PROFILES)
+
+        x, report = repair_selection(matrix, matrix.caps({"SKU-A": 100, "SKU-B": 100}, 1.0), ["S1", "S2"])
+
+        assert x.tolist() == [True, True, True]
+        assert report.dropped_schools == 0
+        assert report.added_schools == 1
+        assert report.hint_students == 100
+
+    def test_selection_repaired_after_stock_drop(self):
+        matrix = build_demand_matrix(PROFILES)
+
+        x, report = repair_selection(matrix, matrix.caps({"SKU-A": 60, "SKU-B": 100}, 1.0), ["S1", "S2"])
+
+        assert x.tolist() == [True, False, False]
+        assert report.hinted_schools == 2
+        assert report.dropped_schools == 1
+
+    def test_unknown_schools_are_ignored(self):
+        matrix = build_demand_matrix(PROFILES)
+
+        _, report = repair_selection(matrix, matrix.caps({"SKU-A": 100}, 1.0), ["GONE"])
+
+        assert not report.used
+
+
+class TestWarmStartedSolve:
+    def test_hint_does_not_change_optimum(self):
+        inventory = {"SKU-A": 60, "SKU-B": 100}
+
+        cold = solve(PROFILES, inventory)
+        warm = solve(PROFILES, inventory, warm_start=["S2", "S3"])
+
+        assert warm.warm_start.used
+        assert cold.warm_start is None
+        assert warm.selection.total_students_served == cold.selection.total_students_served
+
+
+@pytest.mark.asyncio
+class TestSolveBaseline:
+    async def test_only_full_cold_solves_of_the_same_inputs_count(self, db):
+        def job(key="k1", warm_start=None, **values):
+            values = {"status": JobStatus.COMPLETED, "cache_hit": False, **values}
+            result = {"solve_seconds": 1.0, "warm_start": warm_start}
+            return Job(kind=JobKind.OPTIMIZE, cache_key=key, result_json=result, **values)
+
+        solved = job(warm_start={"used": False})
+        cold = job()
+        db.add_all([
+            solved,
+            job(cache_hit=True),
+            job(stop_requested=True),
+            job(warm_start={"used": True}),
+            job(status=JobStatus.FAILED),
+        ])
+        await db.commit()
+
+        assert (await solve_baseline(db, "k1")).job_id == solved.job_id
+        assert await solve_baseline(db, "k2") is None
+
+        db.add(cold)
+        await db.commit()
+        assert (await solve_baseline(db, "k1")).job_id == cold.job_id